@@ -4,9 +4,29 @@ import asyncio
 import logging
 
 from homeassistant import config_entries, core
-
-from .const import DOMAIN
-from .sensor_manager import SensorManager
+from homeassistant.helpers.storage import Store
+
+from .const import (
+    CONF_ATTRIBUTE_BUDGET,
+    CONF_ATTRIBUTE_PAGES,
+    CONF_EXCLUDE_FROM_RECORDER,
+    CONF_MAX_WISHLIST_ITEMS,
+    CONF_REFRESH_METRICS,
+    CONF_SORT_ORDER,
+    DATA_CLIENT,
+    DEFAULT_ATTRIBUTE_BUDGET,
+    DEFAULT_ATTRIBUTE_PAGES,
+    DOMAIN,
+    SORT_WISHLIST,
+)
+from .price_history import PriceHistory
+from .sensor_manager import (
+    STORAGE_KEY,
+    STORAGE_VERSION,
+    WISHLIST_ID,
+    SensorManager,
+    get_price_history_path,
+)
 
 _LOGGER = logging.getLogger(__name__)
 DATA_CONFIGS = "steam_wishlist_config"
@@ -20,8 +40,21 @@ async def async_setup_entry(
     steam_id = entry.data["steam_id"]
     api_key = entry.data["key"]
     store_all_wishlist_items = entry.options.get("show_all_wishlist_items", False)
-    hass.data[DOMAIN][entry.entry_id] = SensorManager(
-        hass, store_all_wishlist_items, api_key, steam_id
+    hass.data[DOMAIN][entry.entry_id] = manager = SensorManager(
+        hass,
+        store_all_wishlist_items,
+        api_key,
+        steam_id,
+        max_wishlist_items=entry.options.get(CONF_MAX_WISHLIST_ITEMS, 0),
+        attribute_budget=entry.options.get(
+            CONF_ATTRIBUTE_BUDGET, DEFAULT_ATTRIBUTE_BUDGET
+        ),
+        attribute_pages=entry.options.get(
+            CONF_ATTRIBUTE_PAGES, DEFAULT_ATTRIBUTE_PAGES
+        ),
+        exclude_from_recorder=entry.options.get(CONF_EXCLUDE_FROM_RECORDER, False),
+        sort_order=entry.options.get(CONF_SORT_ORDER, SORT_WISHLIST),
+        refresh_metrics=entry.options.get(CONF_REFRESH_METRICS, False),
     )
 
     if not entry.unique_id:
@@ -31,6 +64,8 @@ async def async_setup_entry(
             title=f"Steam Wishlist ({steam_id})",
         )
 
+    # Stop writing the stored data before it may be removed with the entry.
+    entry.async_on_unload(manager.coordinator.async_unload)
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
     entry.async_on_unload(entry.add_update_listener(update_listener))
@@ -41,9 +76,32 @@ async def async_setup_entry(
 async def update_listener(
     hass: core.HomeAssistant, entry: config_entries.ConfigEntry
 ) -> None:
+    manager: SensorManager = hass.data[DOMAIN][entry.entry_id]
+    attribute_pages = entry.options.get(CONF_ATTRIBUTE_PAGES, DEFAULT_ATTRIBUTE_PAGES)
+    exclude_from_recorder = entry.options.get(CONF_EXCLUDE_FROM_RECORDER, False)
+    refresh_metrics = entry.options.get(CONF_REFRESH_METRICS, False)
+    if (
+        attribute_pages != manager.attribute_pages
+        or exclude_from_recorder != manager.exclude_from_recorder
+        or refresh_metrics != manager.refresh_metrics
+    ):
+        # The sensors themselves change, so set everything up again.
+        await hass.config_entries.async_reload(entry.entry_id)
+        return
+
     show_all = entry.options.get("show_all_wishlist_items", False)
-    hass.data[DOMAIN][entry.entry_id].store_all_wishlist_items = show_all
-    await hass.data[DOMAIN][entry.entry_id].coordinator.async_request_refresh()
+    manager.store_all_wishlist_items = show_all
+    manager.max_wishlist_items = entry.options.get(CONF_MAX_WISHLIST_ITEMS, 0)
+    manager.attribute_budget = entry.options.get(
+        CONF_ATTRIBUTE_BUDGET, DEFAULT_ATTRIBUTE_BUDGET
+    )
+    manager.sort_order = entry.options.get(CONF_SORT_ORDER, SORT_WISHLIST)
+    # The wishlist attributes depend on the options even if no game changed.
+    wishlist = manager.current_wishlist.get(WISHLIST_ID)
+    for entity in [wishlist, *manager.wishlist_pages]:
+        if entity is not None and entity.hass is not None:
+            entity.async_write_ha_state()
+    await manager.coordinator.async_request_refresh()
 
 
 async def async_unload_entry(
@@ -60,10 +118,23 @@ async def async_unload_entry(
     )
     if unload_ok:
         hass.data[DOMAIN].pop(entry.entry_id)
+        if not hass.data[DOMAIN] and (client := hass.data.pop(DATA_CLIENT, None)):
+            # The last entry is gone, so is the need for the shared client.
+            await client.async_close()
 
     return unload_ok
 
 
+async def async_remove_entry(
+    hass: core.HomeAssistant, entry: config_entries.ConfigEntry
+) -> None:
+    """Remove the data stored for a config entry."""
+    store = Store(hass, STORAGE_VERSION, STORAGE_KEY.format(entry.data["steam_id"]))
+    await store.async_remove()
+    price_history = PriceHistory(get_price_history_path(hass, entry.data["steam_id"]))
+    await price_history.async_remove(hass)
+
+
 async def async_setup(hass: core.HomeAssistant, config: dict) -> bool:
     """Set up the Steam wishlist component.
 
@@ -0,0 +1,547 @@
+"""Steam web API client shared by all config entries."""
+
+import asyncio
+import json
+import logging
+import random
+import time
+from collections import Counter
+from collections.abc import Awaitable, Callable, Iterable, Mapping, Sequence
+from datetime import timedelta
+from http import HTTPStatus
+from itertools import batched
+from typing import Any
+
+import aiohttp
+from aiohttp import hdrs
+from homeassistant import core
+from homeassistant.core import callback
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.util import dt as dt_util
+from homeassistant.util.json import json_loads
+
+from .const import DATA_CLIENT
+from .metrics import STAGE_DECODE, RefreshMetrics
+from .util import decode_store_items
+
+_LOGGER = logging.getLogger(__name__)
+GET_WISHLIST_URL = "https://api.steampowered.com/IWishlistService/GetWishlist/v1"
+GET_APPS_URL = "https://api.steampowered.com/IStoreBrowseService/GetItems/v1"
+# The GetItems data groups the entities need.  Pricing is always included, the
+# basic info (descriptions, publishers, franchises, ...) is never used.
+DATA_REQUEST = {"include_assets": True, "include_reviews": True}
+# The max amount of app ids to request data for in a single network request.
+BATCH_SIZE = 100
+# The max amount of GetItems requests that may be in flight at the same time.
+MAX_CONCURRENT_REQUESTS = 4
+# Seconds app ids that don't fill a batch wait for other entries' app ids.
+BATCH_WINDOW = 0.2
+# How long a fetched store item is handed out to other config entries.
+CACHE_TTL = timedelta(minutes=5)
+# How often a failed request is tried in total, and the base of the backoff
+# in seconds between attempts.
+RETRY_ATTEMPTS = 3
+RETRY_BACKOFF = 1.0
+# Errors worth trying a request again for.  Steam sometimes answers with an
+# empty `response`, which shows up as a KeyError while decoding.
+RETRY_EXCEPTIONS = (aiohttp.ClientError, TimeoutError, KeyError, ValueError)
+# So a single slow request doesn't hold up a refresh for long.
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=30)
+# The max amount of responses kept to make conditional requests with, and the
+# max size in bytes of their uncompressed bodies.  GetItems batches rarely
+# repeat, so they mustn't crowd the memory with store items.
+HTTP_CACHE_SIZE = 256
+HTTP_CACHE_MAX_BYTES = 2 * 1024 * 1024
+# The sustained rate and burst size of requests made to Steam.
+RATE_LIMIT = 2.0
+RATE_LIMIT_BURST = 20
+
+# A fetched store item and when it was fetched, as a unix timestamp.
+CachedItem = tuple[float, dict[str, Any]]
+# The api key, language and country code a batch of store items is requested
+# with.
+BatchContext = tuple[str, str, str]
+# An app id and the future its store item is handed to.
+QueuedApp = tuple[int, asyncio.Future[CachedItem | None]]
+
+
+class TokenBucket:
+    """Rate limiter allowing `rate` acquisitions a second with bursts of `capacity`."""
+
+    def __init__(self, rate: float, capacity: int) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def async_acquire(self) -> None:
+        """Wait until a request may be made."""
+        async with self._lock:
+            now = time.monotonic()
+            elapsed = max(0.0, now - self._updated)
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated = now
+            if self._tokens < 1:
+                delay = (1 - self._tokens) / self.rate
+                _LOGGER.debug("Rate limited, waiting %.2fs", delay)
+                await asyncio.sleep(delay)
+                self._tokens = 1.0
+                self._updated = now + delay
+            self._tokens -= 1
+
+
+class HttpCacheEntry:
+    """A decoded response and the validators to request it again with."""
+
+    __slots__ = ("etag", "last_modified", "decoded", "size", "decode_time")
+
+    def __init__(
+        self,
+        etag: str | None,
+        last_modified: str | None,
+        decoded: Any,
+        size: int,
+        decode_time: float,
+    ) -> None:
+        self.etag = etag
+        self.last_modified = last_modified
+        self.decoded = decoded
+        # The size of the uncompressed body in bytes.
+        self.size = size
+        # Seconds it took to decode the body.
+        self.decode_time = decode_time
+
+
+class HttpCacheStats:
+    """Counters of what the HTTP cache saved, reported in the diagnostics."""
+
+    def __init__(self) -> None:
+        self.requests = 0
+        self.not_modified = 0
+        # Uncompressed bytes received and not received thanks to a 304.
+        self.bytes_received = 0
+        self.bytes_saved = 0
+        # Seconds spent decoding responses and not spent thanks to a 304.
+        self.decode_time = 0.0
+        self.decode_time_saved = 0.0
+        # Requests and 304 answers by endpoint, e.g. `GetItems`.
+        self.endpoint_requests: Counter[str] = Counter()
+        self.endpoint_not_modified: Counter[str] = Counter()
+        # Uncompressed bytes of the responses currently kept.
+        self.cached_bytes = 0
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the counters as a dict."""
+        return {
+            "requests": self.requests,
+            "not_modified": self.not_modified,
+            "bytes_received": self.bytes_received,
+            "bytes_saved": self.bytes_saved,
+            "decode_time": round(self.decode_time, 6),
+            "decode_time_saved": round(self.decode_time_saved, 6),
+            # The share of the requests of each endpoint answered with a 304.
+            "hit_rates": {
+                endpoint: round(self.endpoint_not_modified[endpoint] / requests, 3)
+                for endpoint, requests in self.endpoint_requests.items()
+            },
+            "cached_bytes": self.cached_bytes,
+        }
+
+
+class SteamApiClient:
+    """Client for the Steam web API shared by every config entry.
+
+    Store items are the same for every wishlist with the same language and
+    country, so concurrent requests for the same app ids are merged into a
+    single request and fetched items are handed out to other entries for
+    `cache_ttl`.  All requests to Steam share one rate limit.
+
+    Responses with an ETag or Last-Modified header are kept along with their
+    decoded body, so the same request is sent again as a conditional request
+    and a 304 answer skips both the download and decoding.  The least recently
+    used responses are dropped once there are more than `HTTP_CACHE_SIZE` or
+    their bodies take more than `http_cache_max_bytes`.
+    """
+
+    def __init__(
+        self,
+        hass: core.HomeAssistant,
+        max_concurrent_requests: int = MAX_CONCURRENT_REQUESTS,
+        cache_ttl: timedelta = CACHE_TTL,
+        rate_limit: float = RATE_LIMIT,
+        rate_limit_burst: int = RATE_LIMIT_BURST,
+        batch_window: float = BATCH_WINDOW,
+        retry_attempts: int = RETRY_ATTEMPTS,
+        retry_backoff: float = RETRY_BACKOFF,
+        http_cache_max_bytes: int = HTTP_CACHE_MAX_BYTES,
+    ) -> None:
+        self.hass = hass
+        self.retry_attempts = retry_attempts
+        self.retry_backoff = retry_backoff
+        self.cache_ttl = cache_ttl
+        self.batch_window = batch_window
+        self.http_session = async_get_clientsession(hass)
+        self.rate_limiter = TokenBucket(rate_limit, rate_limit_burst)
+        self._semaphore = asyncio.Semaphore(max_concurrent_requests)
+        # Fetched store items keyed by (language, country code, app id).
+        self._cache: dict[tuple[str, str, int], CachedItem] = {}
+        # Store items being fetched and the api key they're fetched with, keyed
+        # by (language, country code, app id).
+        self._in_flight: dict[
+            tuple[str, str, int], tuple[str, asyncio.Future[CachedItem | None]]
+        ] = {}
+        # App ids waiting to fill a batch.  Each api key gets its own batches,
+        # so a rejected key doesn't fail the apps of other entries.
+        self._queued: dict[BatchContext, list[QueuedApp]] = {}
+        # The metrics of the refreshes waiting on the queued app ids.
+        self._queued_metrics: dict[BatchContext, list[RefreshMetrics]] = {}
+        self._flush_handles: dict[BatchContext, asyncio.Handle] = {}
+        # The batches being fetched.
+        self._batch_tasks: set[asyncio.Task[None]] = set()
+        # Decoded responses keyed by (url, query), least recently used first.
+        self._http_cache: dict[tuple[str, str], HttpCacheEntry] = {}
+        self.http_cache_max_bytes = http_cache_max_bytes
+        self.http_cache_stats = HttpCacheStats()
+
+    async def async_get_wishlist(
+        self, api_key: str, steam_id: str, metrics: RefreshMetrics | None = None
+    ) -> dict[str, Any]:
+        """Return the GetWishlist response for `steam_id`."""
+
+        async def async_get() -> dict[str, Any]:
+            return await self._async_get(
+                GET_WISHLIST_URL,
+                {"key": api_key, "steamid": steam_id},
+                json_loads,
+                () if metrics is None else (metrics,),
+            )
+
+        return await self._async_retry(async_get)
+
+    async def _async_get[T](
+        self,
+        url: str,
+        params: dict[str, str],
+        decode: Callable[[bytes], T],
+        metrics: Sequence[RefreshMetrics] = (),
+    ) -> T:
+        """Return the decoded body of a GET request, within the client's limits.
+
+        The body is decoded with `decode` in the executor, since large
+        responses take a while to decode.  When the server answers that a
+        response didn't change since it was last received, the response
+        decoded back then is returned instead.  The bytes received and the
+        decode time are added to the `metrics` of the refreshes waiting on it.
+        """
+        key = (url, json.dumps(params, sort_keys=True))
+        endpoint = url.rsplit("/", 2)[-2]
+        # Kept until a new response replaces it, so a failed request can be
+        # retried conditionally.
+        cached = self._http_cache.get(key)
+        # aiohttp asks for a compressed body and decompresses it.
+        headers: dict[str, str] = {}
+        if cached is not None:
+            if cached.etag is not None:
+                headers[hdrs.IF_NONE_MATCH] = cached.etag
+            if cached.last_modified is not None:
+                headers[hdrs.IF_MODIFIED_SINCE] = cached.last_modified
+
+        stats = self.http_cache_stats
+        async with self._semaphore:
+            await self.rate_limiter.async_acquire()
+            async with self.http_session.get(
+                url,
+                params=params,
+                headers=headers,
+                timeout=REQUEST_TIMEOUT,
+                raise_for_status=True,
+            ) as resp:
+                stats.requests += 1
+                stats.endpoint_requests[endpoint] += 1
+                if resp.status == HTTPStatus.NOT_MODIFIED and cached is not None:
+                    stats.not_modified += 1
+                    stats.endpoint_not_modified[endpoint] += 1
+                    stats.bytes_saved += cached.size
+                    stats.decode_time_saved += cached.decode_time
+                    self._cache_response(key, cached)
+                    return cached.decoded
+                body = await resp.read()
+                etag = resp.headers.get(hdrs.ETAG)
+                last_modified = resp.headers.get(hdrs.LAST_MODIFIED)
+
+        start = time.perf_counter()
+        decoded = await self.hass.async_add_executor_job(decode, body)
+        decode_time = time.perf_counter() - start
+        stats.bytes_received += len(body)
+        stats.decode_time += decode_time
+        for refresh_metrics in metrics:
+            refresh_metrics.bytes_received += len(body)
+            refresh_metrics.add_time(STAGE_DECODE, decode_time)
+        if etag is not None or last_modified is not None:
+            self._cache_response(
+                key,
+                HttpCacheEntry(etag, last_modified, decoded, len(body), decode_time),
+            )
+        elif (outdated := self._http_cache.pop(key, None)) is not None:
+            stats.cached_bytes -= outdated.size
+        return decoded
+
+    @callback
+    def _cache_response(self, key: tuple[str, str], entry: HttpCacheEntry) -> None:
+        """Keep a response, dropping the least recently used ones over the limits.
+
+        A response already kept for `key` is replaced.
+        """
+        stats = self.http_cache_stats
+        if (replaced := self._http_cache.pop(key, None)) is not None:
+            stats.cached_bytes -= replaced.size
+        self._http_cache[key] = entry
+        stats.cached_bytes += entry.size
+        while self._http_cache and (
+            len(self._http_cache) > HTTP_CACHE_SIZE
+            or stats.cached_bytes > self.http_cache_max_bytes
+        ):
+            stats.cached_bytes -= self._http_cache.pop(
+                next(iter(self._http_cache))
+            ).size
+
+    async def _async_retry[T](self, request: Callable[[], Awaitable[T]]) -> T:
+        """Await `request`, trying again with jittered exponential backoff."""
+        for attempt in range(1, self.retry_attempts):
+            try:
+                return await request()
+            except RETRY_EXCEPTIONS as err:
+                delay = random.uniform(0, self.retry_backoff * 2 ** (attempt - 1))
+                _LOGGER.debug(
+                    "Steam request failed (%s), attempt %s of %s in %.2fs",
+                    err or type(err).__name__,
+                    attempt + 1,
+                    self.retry_attempts,
+                    delay,
+                )
+                await asyncio.sleep(delay)
+        return await request()
+
+    async def async_get_store_items(
+        self,
+        api_key: str,
+        app_ids: Iterable[int],
+        fetched_after: Mapping[int, float] | None = None,
+        metrics: RefreshMetrics | None = None,
+    ) -> tuple[dict[int, CachedItem], set[int]]:
+        """Return the store items of `app_ids` and when they were fetched.
+
+        Cached items are only used if they were fetched after the time given
+        for their app id in `fetched_after`, so a caller never gets back a copy
+        that is older than the one it already has.  Apps Steam returned no
+        store item for are left out.  The ids of apps whose batch still
+        failed after retrying are returned as well, the rest of the apps are
+        returned regardless.  The batches sent for the apps are recorded in
+        `metrics`.
+
+        Apps another entry is already fetching are waited for, if that fails
+        while using another api key they're fetched again with `api_key`.
+        """
+        language = self.hass.config.language or "en"
+        country = self.hass.config.country or "US"
+        fetched_after = fetched_after or {}
+        now = dt_util.utcnow().timestamp()
+        self._prune_cache(now)
+
+        context = (api_key, language, country)
+        results: dict[int, CachedItem] = {}
+        pending: dict[int, asyncio.Future[CachedItem | None]] = {}
+        # Apps another entry is fetching with another api key.
+        borrowed: set[int] = set()
+        to_fetch: list[QueuedApp] = []
+        for app_id in app_ids:
+            key = (language, country, app_id)
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] > fetched_after.get(app_id, -1):
+                results[app_id] = cached
+            elif (in_flight := self._in_flight.get(key)) is not None:
+                # Another entry is already fetching this app.
+                fetching_key, pending[app_id] = in_flight
+                if fetching_key != api_key:
+                    borrowed.add(app_id)
+            else:
+                future = self.hass.loop.create_future()
+                self._in_flight[key] = (api_key, future)
+                pending[app_id] = future
+                to_fetch.append((app_id, future))
+
+        if to_fetch:
+            self._enqueue(context, to_fetch, metrics)
+
+        failed: set[int] = set()
+        while pending:
+            outcomes = await asyncio.gather(*pending.values(), return_exceptions=True)
+            retry: list[QueuedApp] = []
+            for app_id, outcome in zip(pending, outcomes):
+                if isinstance(outcome, BaseException):
+                    if app_id in borrowed:
+                        # The other entry's api key may be the one that failed.
+                        retry.append((app_id, self.hass.loop.create_future()))
+                    else:
+                        failed.add(app_id)
+                elif outcome is not None:
+                    results[app_id] = outcome
+            borrowed.clear()
+            pending = dict(retry)
+            if retry:
+                self._enqueue(context, retry, metrics)
+        return results, failed
+
+    @callback
+    def _enqueue(
+        self,
+        context: BatchContext,
+        apps: list[QueuedApp],
+        metrics: RefreshMetrics | None = None,
+    ) -> None:
+        """Queue apps to be fetched with those of other entries.
+
+        Full batches are sent right away.  The rest wait up to `batch_window`
+        for app ids of other entries with the same api key refreshing at about
+        the same time, so the requests made approach one per `BATCH_SIZE`
+        unique app ids.
+        """
+        queued = self._queued.setdefault(context, [])
+        queued.extend(apps)
+        waiting = self._queued_metrics.setdefault(context, [])
+        if metrics is not None and metrics not in waiting:
+            waiting.append(metrics)
+        while len(queued) >= BATCH_SIZE:
+            self._send_batch(context, queued[:BATCH_SIZE], tuple(waiting))
+            del queued[:BATCH_SIZE]
+        if not queued:
+            self._queued.pop(context)
+            self._queued_metrics.pop(context)
+        elif context not in self._flush_handles:
+            if self.batch_window:
+                handle = self.hass.loop.call_later(
+                    self.batch_window, self._flush, context
+                )
+            else:
+                handle = self.hass.loop.call_soon(self._flush, context)
+            self._flush_handles[context] = handle
+
+    @callback
+    def _flush(self, context: BatchContext) -> None:
+        """Send the apps still queued for `context`."""
+        self._flush_handles.pop(context, None)
+        if (queued := self._queued.pop(context, None)) is None:
+            return
+        metrics = tuple(self._queued_metrics.pop(context, ()))
+        for batch in batched(queued, BATCH_SIZE):
+            self._send_batch(context, list(batch), metrics)
+
+    @callback
+    def _send_batch(
+        self,
+        context: BatchContext,
+        apps: list[QueuedApp],
+        metrics: tuple[RefreshMetrics, ...] = (),
+    ) -> None:
+        task = self.hass.async_create_task(
+            self._async_fetch_batch(*context, apps, metrics),
+            "steam_wishlist fetch store items",
+        )
+        self._batch_tasks.add(task)
+        task.add_done_callback(self._batch_tasks.discard)
+
+    async def _async_fetch_batch(
+        self,
+        api_key: str,
+        language: str,
+        country: str,
+        apps: list[QueuedApp],
+        metrics: tuple[RefreshMetrics, ...] = (),
+    ) -> None:
+        """Fetch a single batch of store items and resolve their futures.
+
+        The batch is recorded in the `metrics` of every refresh waiting on it.
+        """
+        app_ids = [app_id for app_id, _ in apps]
+        input_json = {
+            "ids": [{"appid": str(app_id)} for app_id in app_ids],
+            "context": {"language": language, "country_code": country},
+            "data_request": DATA_REQUEST,
+        }
+        error: Exception | None = None
+        fetched = False
+        params = {"key": api_key, "input_json": json.dumps(input_json)}
+
+        async def async_get() -> dict[int, dict[str, Any]]:
+            # Only the fields that are used are kept, not the whole store items.
+            return await self._async_get(
+                GET_APPS_URL, params, decode_store_items, metrics
+            )
+
+        start = time.perf_counter()
+        try:
+            store_items = await self._async_retry(async_get)
+            fetched_at = dt_util.utcnow().timestamp()
+            for app_id, item in store_items.items():
+                self._cache[(language, country, app_id)] = (fetched_at, item)
+            fetched = True
+        except Exception as err:  # noqa: BLE001
+            _LOGGER.warning(
+                "Failed to fetch the store items of %s apps: %s",
+                len(app_ids),
+                err or type(err).__name__,
+            )
+            # Handed to every entry waiting for these apps.
+            error = err
+        finally:
+            for refresh_metrics in metrics:
+                refresh_metrics.add_batch(
+                    len(app_ids), time.perf_counter() - start, fetched
+                )
+            for app_id, future in apps:
+                key = (language, country, app_id)
+                if (in_flight := self._in_flight.get(key)) and in_flight[1] is future:
+                    del self._in_flight[key]
+                if future.done():
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                elif fetched:
+                    future.set_result(self._cache.get(key))
+                else:
+                    future.cancel()
+
+    async def async_close(self) -> None:
+        """Stop the queued and running batches once no entry uses the client.
+
+        Everything still waiting for their apps is handed them as failed.
+        """
+        for handle in self._flush_handles.values():
+            handle.cancel()
+        self._flush_handles.clear()
+        for queued in self._queued.values():
+            for _, future in queued:
+                future.cancel()
+        self._queued.clear()
+        self._queued_metrics.clear()
+        tasks = list(self._batch_tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._in_flight.clear()
+
+    @callback
+    def _prune_cache(self, now: float) -> None:
+        """Forget cached store items older than `cache_ttl`."""
+        expired_before = now - self.cache_ttl.total_seconds()
+        for key in [key for key, (at, _) in self._cache.items() if at < expired_before]:
+            del self._cache[key]
+
+
+@callback
+def async_get_client(hass: core.HomeAssistant) -> SteamApiClient:
+    """Return the Steam client shared by all config entries."""
+    if (client := hass.data.get(DATA_CLIENT)) is None:
+        client = hass.data[DATA_CLIENT] = SteamApiClient(hass)
+    return client
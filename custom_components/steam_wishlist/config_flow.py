@@ -2,13 +2,26 @@
 
 import logging
 
-import aiohttp
 import voluptuous as vol
-from homeassistant import config_entries
+from homeassistant import config_entries, core
 from homeassistant.core import callback
 from homeassistant.data_entry_flow import FlowResult
-
-from .const import DOMAIN
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+
+from .const import (
+    CONF_ATTRIBUTE_BUDGET,
+    CONF_ATTRIBUTE_PAGES,
+    CONF_EXCLUDE_FROM_RECORDER,
+    CONF_MAX_WISHLIST_ITEMS,
+    CONF_REFRESH_METRICS,
+    CONF_SORT_ORDER,
+    DEFAULT_ATTRIBUTE_BUDGET,
+    DEFAULT_ATTRIBUTE_PAGES,
+    DOMAIN,
+    MAX_ATTRIBUTE_PAGES,
+    SORT_ORDERS,
+    SORT_WISHLIST,
+)
 
 _LOGGER = logging.getLogger(__name__)
 PROFILE_ID_URL = "http://api.steampowered.com/ISteamUser/GetPlayerSummaries/v0002/"
@@ -25,14 +38,14 @@ class InvalidSteamID(Exception):
     """Exception raised when steam id is invalid."""
 
 
-async def async_verify_steam_id(api_key: str, steam_id: str) -> None:
+async def async_verify_steam_id(
+    hass: core.HomeAssistant, api_key: str, steam_id: str
+) -> None:
     """Verify the provided steam id is valid."""
-    async with (
-        aiohttp.ClientSession() as session,
-        session.get(
-            PROFILE_ID_URL, params={"key": api_key, "steamids": steam_id}
-        ) as resp,
-    ):
+    session = async_get_clientsession(hass)
+    async with session.get(
+        PROFILE_ID_URL, params={"key": api_key, "steamids": steam_id}
+    ) as resp:
         if resp.status == 403:
             raise InvalidAPIKey
         data = await resp.json()
@@ -53,7 +66,7 @@ class SteamWishlistConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             steam_id = user_input["steam_id"]
             api_key = user_input["steam_web_api_key"]
             try:
-                await async_verify_steam_id(api_key, steam_id)
+                await async_verify_steam_id(self.hass, api_key, steam_id)
             except InvalidSteamID:
                 errors["base"] = "invalid_steam_id"
             except InvalidAPIKey:
@@ -89,16 +102,45 @@ class OptionsFlowHandler(config_entries.OptionsFlow):
         """Manage the options."""
         if user_input is not None:
             return self.async_create_entry(title="", data=user_input)
+        options = self.config_entry.options
         return self.async_show_form(
             step_id="init",
             data_schema=vol.Schema(
                 {
                     vol.Required(
                         "show_all_wishlist_items",
-                        default=self.config_entry.options.get(
-                            "show_all_wishlist_items", False
+                        default=options.get("show_all_wishlist_items", False),
+                    ): bool,
+                    vol.Required(
+                        CONF_MAX_WISHLIST_ITEMS,
+                        default=options.get(CONF_MAX_WISHLIST_ITEMS, 0),
+                    ): vol.All(vol.Coerce(int), vol.Range(min=0)),
+                    vol.Required(
+                        CONF_ATTRIBUTE_BUDGET,
+                        default=options.get(
+                            CONF_ATTRIBUTE_BUDGET, DEFAULT_ATTRIBUTE_BUDGET
                         ),
-                    ): bool
+                    ): vol.All(vol.Coerce(int), vol.Range(min=2048)),
+                    vol.Required(
+                        CONF_ATTRIBUTE_PAGES,
+                        default=options.get(
+                            CONF_ATTRIBUTE_PAGES, DEFAULT_ATTRIBUTE_PAGES
+                        ),
+                    ): vol.All(
+                        vol.Coerce(int), vol.Range(min=1, max=MAX_ATTRIBUTE_PAGES)
+                    ),
+                    vol.Required(
+                        CONF_EXCLUDE_FROM_RECORDER,
+                        default=options.get(CONF_EXCLUDE_FROM_RECORDER, False),
+                    ): bool,
+                    vol.Required(
+                        CONF_SORT_ORDER,
+                        default=options.get(CONF_SORT_ORDER, SORT_WISHLIST),
+                    ): vol.In(SORT_ORDERS),
+                    vol.Required(
+                        CONF_REFRESH_METRICS,
+                        default=options.get(CONF_REFRESH_METRICS, False),
+                    ): bool,
                 }
             ),
         )
@@ -1,4 +1,26 @@
 from datetime import timedelta
 
 DOMAIN = "steam_wishlist"
+# The Steam client shared by all config entries in `hass.data`.
+DATA_CLIENT = "steam_wishlist_client"
 SCAN_INTERVAL = timedelta(hours=1)
+# Bounds of the time between refreshes picked by the scheduler.
+MIN_SCAN_INTERVAL = timedelta(minutes=5)
+MAX_SCAN_INTERVAL = timedelta(hours=4)
+
+CONF_MAX_WISHLIST_ITEMS = "max_wishlist_items"
+CONF_ATTRIBUTE_BUDGET = "attribute_budget"
+CONF_ATTRIBUTE_PAGES = "attribute_pages"
+CONF_EXCLUDE_FROM_RECORDER = "exclude_attributes_from_recorder"
+CONF_SORT_ORDER = "sort_order"
+CONF_REFRESH_METRICS = "refresh_metrics"
+# The recorder doesn't store state attributes over 16KiB, this leaves room for
+# the attributes Home Assistant adds to the wishlist sensor itself.
+DEFAULT_ATTRIBUTE_BUDGET = 15 * 1024
+DEFAULT_ATTRIBUTE_PAGES = 1
+MAX_ATTRIBUTE_PAGES = 10
+# The orders the games in the wishlist sensor attributes can be sorted in.
+SORT_WISHLIST = "wishlist"
+SORT_DISCOUNT = "discount"
+SORT_PRICE = "price"
+SORT_ORDERS = (SORT_WISHLIST, SORT_DISCOUNT, SORT_PRICE)
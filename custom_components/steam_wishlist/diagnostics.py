@@ -0,0 +1,22 @@
+"""Diagnostics support for the Steam Wishlist integration."""
+
+from typing import Any
+
+from homeassistant import config_entries, core
+
+from .const import DOMAIN
+
+
+async def async_get_config_entry_diagnostics(
+    hass: core.HomeAssistant, entry: config_entries.ConfigEntry
+) -> dict[str, Any]:
+    """Return diagnostics for a config entry."""
+    manager = hass.data[DOMAIN][entry.entry_id]
+    # Diagnostics may be downloaded before the first refresh imported the client.
+    client = await manager.coordinator.async_get_client()
+    return {
+        "options": dict(entry.options),
+        # Shared by every config entry.
+        "http_cache": client.http_cache_stats.as_dict(),
+        "refresh_metrics": manager.coordinator.refresh_stats.as_dict(),
+    }
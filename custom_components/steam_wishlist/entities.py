@@ -1,42 +1,60 @@
 import logging
 from typing import Any
 
+from homeassistant.components.binary_sensor import BinarySensorEntity
+from homeassistant.const import EntityCategory
+from homeassistant.core import callback
+from homeassistant.helpers.entity import Entity
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.util import slugify
 
-from .types import SteamGame
-from .util import get_steam_game
+from .metrics import STAGE_TOTAL
+from .types import SteamGame, SteamGameRecord
+from .util import PLACEHOLDERS
 
-try:
-    from homeassistant.components.binary_sensor import BinarySensorEntity
-except ImportError:
-    # Prior to HA v0.110
-    from homeassistant.components.binary_sensor import (
-        BinarySensorDevice as BinarySensorEntity,
-    )
+_LOGGER = logging.getLogger(__name__)
 
 
-_LOGGER = logging.getLogger(__name__)
+def get_game_unique_id(steam_id: str, slug: str) -> str:
+    """Return the unique id of the entity of a game."""
+    return f"steam_wishlist_{steam_id}_{slug}"
 
 
 class SteamWishlistEntity(CoordinatorEntity):
     """Representation of a Steam wishlist."""
 
-    def __init__(self, manager) -> None:
+    def __init__(self, manager, page: int = 1) -> None:
         super().__init__(coordinator=manager.coordinator)
         self.manager = manager
+        # Page 1 is the main wishlist sensor, the other pages hold the games
+        # that didn't fit in the attributes of the pages before them.
+        self.page = page
         self._attrs = {}
 
         self._attr_device_info = manager.coordinator.device_info
 
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Write the state, counting the write in the refresh metrics."""
+        if (metrics := self.coordinator.refresh_stats.current) is not None:
+            metrics.entities_written += 1
+        super()._handle_coordinator_update()
+
     @property
     def unique_id(self) -> str:
+        if self.page > 1:
+            return f"steam_wishlist_{self.coordinator.steam_id}_page_{self.page}"
         return f"steam_wishlist_{self.coordinator.steam_id}"
 
     @property
-    def on_sale(self) -> list[SteamGame]:
-        """Return all games on sale."""
-        return [game for game in self.games if game["percent_off"] > 0]
+    def on_sale(self) -> list[SteamGameRecord]:
+        """Return all games on sale, biggest discount first."""
+        snapshot = self.coordinator.snapshot
+        indexes = snapshot.indexes
+        return [
+            snapshot.games[key[-1]]
+            for key in indexes.by_discount[: len(indexes.on_sale)]
+        ]
 
     def _is_price_valid(self, price):
         # Ensures compatibility with 'sale_price' being dynamically typed as string or numeric
@@ -49,19 +67,27 @@ class SteamWishlistEntity(CoordinatorEntity):
             return False
 
     @property
-    def games(self) -> list[SteamGame]:
+    def games(self) -> list[SteamGameRecord]:
         """Return all games on the Steam wishlist."""
-        games: list[SteamGame] = []
-        for game_id, game in self.coordinator.data.items():
-            # This indicates an empty wishlist, just return an empty list.
-            if game_id == "success":
-                break
-            games.append(get_steam_game(game_id, game))
-        return games
+        return list(self.coordinator.snapshot.games.values())
+
+    @property
+    def page_games(self) -> list[SteamGame]:
+        """Return the rendered games in this sensor's attributes."""
+        pages = self.coordinator.snapshot.get_wishlist_pages(
+            self.manager.store_all_wishlist_items,
+            self.manager.max_wishlist_items,
+            self.manager.attribute_budget,
+            self.manager.attribute_pages,
+            self.manager.sort_order,
+        )
+        return pages[self.page - 1] if self.page <= len(pages) else []
 
     @property
     def name(self) -> str:
         """Return the name of the sensor."""
+        if self.page > 1:
+            return f"Steam Wishlist ({self.coordinator.steam_id}) page {self.page}"
         return f"Steam Wishlist ({self.coordinator.steam_id})"
 
     @property
@@ -77,25 +103,68 @@ class SteamWishlistEntity(CoordinatorEntity):
     @property
     def state(self) -> int:
         """Return the state of the sensor."""
-        return len(self.on_sale)
+        if self.page > 1:
+            return sum(1 for game in self.page_games if game["percent_off"] > 0)
+        return len(self.coordinator.snapshot.indexes.on_sale)
+
+    @property
+    def extra_state_attributes(self) -> dict[str, Any]:
+        games = self.page_games
+        on_sale = [game for game in games if game["percent_off"] > 0]
+        return {"data": [PLACEHOLDERS, *games], "on_sale": on_sale}
+
+
+class UnrecordedSteamWishlistEntity(SteamWishlistEntity):
+    """A Steam wishlist sensor whose game attributes are not recorded."""
+
+    _unrecorded_attributes = frozenset({"data", "on_sale"})
+
+
+class SteamRefreshMetricsEntity(Entity):
+    """Diagnostic sensor of how long the refreshes of a wishlist take.
+
+    The state is the duration of the last refresh in seconds, the attributes
+    hold the percentiles of each stage over the last refreshes.
+    """
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_should_poll = False
+    _attr_icon = "mdi:timer-outline"
+    _attr_unit_of_measurement = "s"
+
+    def __init__(self, manager) -> None:
+        self.manager = manager
+        self.refresh_stats = manager.coordinator.refresh_stats
+        steam_id = manager.coordinator.steam_id
+        self._attr_unique_id = f"steam_wishlist_{steam_id}_refresh_time"
+        self._attr_name = f"Steam Wishlist ({steam_id}) refresh time"
+        self._attr_device_info = manager.coordinator.device_info
+
+    async def async_added_to_hass(self) -> None:
+        """Write the state after every recorded refresh."""
+        await super().async_added_to_hass()
+        self.async_on_remove(
+            self.refresh_stats.async_add_listener(self.async_write_ha_state)
+        )
+
+    @property
+    def state(self) -> float | None:
+        """Return the duration of the last refresh."""
+        if (last := self.refresh_stats.last) is None:
+            return None
+        return round(last.stages[STAGE_TOTAL], 3)
 
     @property
     def extra_state_attributes(self) -> dict[str, Any]:
-        # Added Upcoming Media Card compatibility
-        placeholders = {
-            "title_default": "$title",
-            "line1_default": "$rating",
-            "line2_default": "$price",
-            "line3_default": "$release",
-            "line4_default": "$genres",
-            "icon": "mdi:arrow-down-bold",
+        last = self.refresh_stats.last
+        return {
+            "refreshes": len(self.refresh_stats.history),
+            "percentiles": self.refresh_stats.get_percentiles(),
+            "batches": 0 if last is None else len(last.batches),
+            "bytes_received": 0 if last is None else last.bytes_received,
+            "items_parsed": 0 if last is None else last.items_parsed,
+            "entities_written": 0 if last is None else last.entities_written,
         }
-        if self.manager.store_all_wishlist_items:
-            games = self.games
-        else:
-            games = [game for game in self.games if game["sale_price"] is not None]
-        data_list = [placeholders, *games]
-        return {"data": data_list, "on_sale": self.on_sale}
 
 
 class SteamGameEntity(CoordinatorEntity, BinarySensorEntity):
@@ -103,16 +172,36 @@ class SteamGameEntity(CoordinatorEntity, BinarySensorEntity):
 
     entity_id = None
 
-    def __init__(self, manager, game: SteamGame) -> None:
-        super().__init__(coordinator=manager.coordinator)
+    def __init__(
+        self,
+        manager,
+        game: SteamGameRecord,
+        slug: str | None = None,
+        entity_id: str | None = None,
+    ) -> None:
+        self.app_id = int(game["steam_id"])
+        # Using the app id as the context means the coordinator only updates
+        # this entity when this game changed.
+        super().__init__(coordinator=manager.coordinator, context=self.app_id)
         self.game = game
         self.manager = manager
-        self.slug = slugify(self.game["title"])
+        # The manager resolves the slug and entity id when it creates the
+        # entities of many games at once, see `get_game_slugs`.
+        self.slug = slugify(self.game["title"]) if slug is None else slug
 
-        self._attr_unique_id = f"steam_wishlist_{self.coordinator.steam_id}_{self.slug}"
+        self._attr_unique_id = get_game_unique_id(self.coordinator.steam_id, self.slug)
         self._attr_device_info = manager.coordinator.device_info
 
-        self.entity_id = f"binary_sensor.{self._attr_unique_id}"
+        self.entity_id = entity_id or f"binary_sensor.{self._attr_unique_id}"
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Refresh the game from the latest snapshot and write its state."""
+        if (game := self.coordinator.snapshot.games.get(self.app_id)) is not None:
+            self.game = game
+        if (metrics := self.coordinator.refresh_stats.current) is not None:
+            metrics.entities_written += 1
+        super()._handle_coordinator_update()
 
     @property
     def is_on(self):
@@ -135,5 +224,9 @@ class SteamGameEntity(CoordinatorEntity, BinarySensorEntity):
         return self.is_on
 
     @property
-    def extra_state_attributes(self):
-        return self.game
+    def extra_state_attributes(self) -> dict[str, Any]:
+        attributes: dict[str, Any] = self.game.as_dict()
+        price_history = self.coordinator.price_history
+        if (price_attributes := price_history.get_attributes(self.app_id)) is not None:
+            attributes.update(price_attributes)
+        return attributes
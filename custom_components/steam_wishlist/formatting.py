@@ -0,0 +1,100 @@
+"""Rendering of the price and rating strings of games.
+
+A wishlist holds thousands of games but only a few distinct prices and review
+scores, so each string is only rendered once for the same inputs and then
+reused from a bounded LRU cache, which also makes every game with the same
+price share a single string.
+"""
+
+from functools import lru_cache
+
+# The max amount of distinct inputs each renderer remembers.
+FORMAT_CACHE_SIZE = 1024
+# A combining long stroke overlay.
+STRIKETHROUGH = "\u0336"
+
+
+class CurrencyFormat:
+    """How Steam writes amounts of a currency."""
+
+    __slots__ = ("symbol", "symbol_after", "decimals", "thousands", "decimal")
+
+    def __init__(
+        self,
+        symbol: str,
+        symbol_after: bool = False,
+        decimals: bool = True,
+        thousands: str = ",",
+        decimal: str = ".",
+    ) -> None:
+        self.symbol = symbol
+        self.symbol_after = symbol_after
+        # Whether the amounts are written with cents.
+        self.decimals = decimals
+        # The thousands and decimal separators.
+        self.thousands = thousands
+        self.decimal = decimal
+
+    def format(self, cents: int) -> str:
+        """Write an amount given in cents."""
+        units, fraction = divmod(abs(cents), 100)
+        amount = f"{units:,}".replace(",", self.thousands)
+        if self.decimals:
+            amount = f"{amount}{self.decimal}{fraction:02d}"
+        sign = "-" if cents < 0 else ""
+        if self.symbol_after:
+            return f"{sign}{amount}{self.symbol}"
+        return f"{sign}{self.symbol}{amount}"
+
+
+# Formats of common store currencies keyed by ISO 4217 code.
+CURRENCY_FORMATS = {
+    "USD": CurrencyFormat("$"),
+    "EUR": CurrencyFormat("€", symbol_after=True, thousands=".", decimal=","),
+    "GBP": CurrencyFormat("£"),
+    "CAD": CurrencyFormat("CDN$ "),
+    "AUD": CurrencyFormat("A$ "),
+    "NZD": CurrencyFormat("NZ$ "),
+    "BRL": CurrencyFormat("R$ ", thousands=".", decimal=","),
+    "PLN": CurrencyFormat("zł", symbol_after=True, thousands=" ", decimal=","),
+    "CHF": CurrencyFormat("CHF ", thousands="'"),
+    "JPY": CurrencyFormat("¥ ", decimals=False),
+    "KRW": CurrencyFormat("₩ ", decimals=False),
+    "CNY": CurrencyFormat("¥ "),
+}
+
+
+@lru_cache(maxsize=FORMAT_CACHE_SIZE)
+def format_cents(cents: int, currency: str) -> str:
+    """Write a price given in cents of `currency` the way Steam does."""
+    if (currency_format := CURRENCY_FORMATS.get(currency)) is None:
+        units, fraction = divmod(cents, 100)
+        return f"{units}.{fraction:02d} {currency}"
+    return currency_format.format(cents)
+
+
+@lru_cache(maxsize=FORMAT_CACHE_SIZE)
+def strikethrough(text: str) -> str:
+    """Strike through `text`, with an overlay after every character but the last."""
+    return STRIKETHROUGH.join(text)
+
+
+@lru_cache(maxsize=FORMAT_CACHE_SIZE)
+def format_price_info(
+    normal_price: str | None, sale_price: str | None, discount_pct: float
+) -> str:
+    """Render the price description of a game."""
+    if normal_price is None:
+        return "Price:&nbsp;&nbsp;TBD"
+    if sale_price is not None:
+        return (
+            f"{strikethrough(normal_price)} {sale_price} ({discount_pct}% off)"
+            "&nbsp;&nbsp;🎫"
+        )
+    return f"Price:&nbsp;&nbsp;{normal_price}"
+
+
+@lru_cache(maxsize=FORMAT_CACHE_SIZE)
+def format_rating(reviews_percent: int | str, review_desc: str) -> str:
+    """Render the review description of a game."""
+    return f"Reviews:&nbsp;&nbsp;{reviews_percent}% ({review_desc})"
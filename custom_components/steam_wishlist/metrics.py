@@ -0,0 +1,182 @@
+"""Timings of the refresh pipeline.
+
+When enabled, every refresh of a coordinator records how long each of its
+stages took, the store item batches it waited on, the bytes it received and
+the amount of games parsed and entities written.  The last `METRICS_WINDOW`
+refreshes are kept to report percentiles over.
+
+When disabled no refresh is recorded, each stage only checks whether there is
+a refresh to record into.
+"""
+
+from collections import deque
+from collections.abc import Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+import math
+import time
+from typing import Any
+
+from homeassistant.core import CALLBACK_TYPE, callback
+
+# The amount of refreshes percentiles are reported over.
+METRICS_WINDOW = 50
+PERCENTILES = (50, 90, 99)
+
+# The stages of a refresh.  `decode` is part of `wishlist` and `store_items`,
+# `update_items` and the entity writes are part of `listeners`.
+STAGE_WISHLIST = "wishlist"
+STAGE_STORE_ITEMS = "store_items"
+STAGE_DECODE = "decode"
+STAGE_PRICE_HISTORY = "price_history"
+STAGE_PARSE = "parse"
+STAGE_LISTENERS = "listeners"
+STAGE_UPDATE_ITEMS = "update_items"
+STAGE_TOTAL = "total"
+# The percentiles of the store item batches are reported as this stage.
+STAGE_BATCH = "batch"
+
+# Reused for every stage of a refresh that isn't recorded.
+_NOT_RECORDED = nullcontext()
+
+
+class RefreshMetrics:
+    """What a single refresh spent its time on."""
+
+    __slots__ = (
+        "started",
+        "stages",
+        "batches",
+        "bytes_received",
+        "items_parsed",
+        "entities_written",
+    )
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        # Seconds spent in each stage.
+        self.stages: dict[str, float] = {}
+        # The amount of apps, the seconds and whether it succeeded of each
+        # store item batch.
+        self.batches: list[tuple[int, float, bool]] = []
+        # Uncompressed bytes of the responses, 304 answers are free.
+        self.bytes_received = 0
+        self.items_parsed = 0
+        self.entities_written = 0
+
+    def add_time(self, stage: str, seconds: float) -> None:
+        """Add `seconds` to the time spent in `stage`."""
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def measure(self, stage: str) -> Iterator[None]:
+        """Add the time spent in the `with` block to `stage`."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(stage, time.perf_counter() - start)
+
+    def add_batch(self, app_count: int, seconds: float, success: bool) -> None:
+        """Record a store item batch the refresh waited on."""
+        self.batches.append((app_count, seconds, success))
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the metrics as a dict, times in seconds."""
+        return {
+            "stages": {stage: round(value, 6) for stage, value in self.stages.items()},
+            "batches": [
+                {"apps": app_count, "time": round(seconds, 6), "success": success}
+                for app_count, seconds, success in self.batches
+            ],
+            "bytes_received": self.bytes_received,
+            "items_parsed": self.items_parsed,
+            "entities_written": self.entities_written,
+        }
+
+
+def time_stage(
+    metrics: RefreshMetrics | None, stage: str
+) -> AbstractContextManager[None]:
+    """Return a context manager that adds its time to `stage` of `metrics`.
+
+    Nothing is timed when the refresh isn't recorded.
+    """
+    return _NOT_RECORDED if metrics is None else metrics.measure(stage)
+
+
+def get_percentile(values: list[float], percent: float) -> float:
+    """Return the nearest-rank percentile of sorted `values`."""
+    return values[max(0, math.ceil(percent / 100 * len(values)) - 1)]
+
+
+class RefreshStats:
+    """The metrics of the last refreshes of a coordinator."""
+
+    def __init__(self, enabled: bool = False, window: int = METRICS_WINDOW) -> None:
+        self.enabled = enabled
+        self.history: deque[RefreshMetrics] = deque(maxlen=window)
+        # The refresh being recorded, if any.
+        self.current: RefreshMetrics | None = None
+        self._listeners: set[CALLBACK_TYPE] = set()
+
+    @property
+    def last(self) -> RefreshMetrics | None:
+        """Return the metrics of the last recorded refresh."""
+        return self.history[-1] if self.history else None
+
+    @callback
+    def async_add_listener(self, update_callback: CALLBACK_TYPE) -> CALLBACK_TYPE:
+        """Call `update_callback` after each recorded refresh."""
+        self._listeners.add(update_callback)
+        return lambda: self._listeners.discard(update_callback)
+
+    @callback
+    def start(self) -> RefreshMetrics | None:
+        """Start recording a refresh, if enabled."""
+        if not self.enabled:
+            return None
+        self.current = RefreshMetrics()
+        return self.current
+
+    @callback
+    def finish(self) -> None:
+        """Finish recording the current refresh."""
+        if (metrics := self.current) is None:
+            return
+        self.current = None
+        metrics.add_time(STAGE_TOTAL, time.perf_counter() - metrics.started)
+        self.history.append(metrics)
+        for update_callback in list(self._listeners):
+            update_callback()
+
+    def get_percentiles(self) -> dict[str, dict[str, float]]:
+        """Return the percentiles of the time of each stage, in seconds.
+
+        The time of every store item batch of the recorded refreshes is
+        reported as the `batch` stage.
+        """
+        times: dict[str, list[float]] = {}
+        for metrics in self.history:
+            for stage, seconds in metrics.stages.items():
+                times.setdefault(stage, []).append(seconds)
+            for _, seconds, _ in metrics.batches:
+                times.setdefault(STAGE_BATCH, []).append(seconds)
+        percentiles: dict[str, dict[str, float]] = {}
+        for stage, values in times.items():
+            values.sort()
+            percentiles[stage] = {
+                f"p{percent}": round(get_percentile(values, percent), 6)
+                for percent in PERCENTILES
+            }
+        return percentiles
+
+    def as_dict(self) -> dict[str, Any]:
+        """Return the recorded refreshes as a dict, times in seconds."""
+        last = self.last
+        return {
+            "enabled": self.enabled,
+            "window": self.history.maxlen,
+            "refreshes": len(self.history),
+            "percentiles": self.get_percentiles(),
+            "last_refresh": None if last is None else last.as_dict(),
+        }
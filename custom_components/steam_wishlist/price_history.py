@@ -0,0 +1,399 @@
+"""Price history of the games on a wishlist.
+
+The history is kept in a compact, append-only file next to the other stored
+data.  Each refresh that saw a price change appends one block: a header with
+the time of the refresh and the amount of samples in it, followed by the
+samples laid out in columns (app ids, final prices, original prices and
+discounts).  Only prices that differ from the last sample of an app are
+written, a price holds until the next sample of its app.
+
+The file is read once, into an index of the samples of each app with running
+statistics, so reading the statistics of a game takes constant time and
+looking up its price at some point in time takes O(log n).
+"""
+
+import logging
+import operator
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_right
+from collections.abc import Mapping
+from itertools import compress
+from typing import Any
+
+from homeassistant import core
+from homeassistant.util import dt as dt_util
+
+_LOGGER = logging.getLogger(__name__)
+# The file starts with a magic number and the version of the format.
+FILE_HEADER = struct.Struct("<4sH")
+MAGIC = b"SWPH"
+VERSION = 1
+# A file with another header, e.g. written by a newer version, is moved here.
+UNSUPPORTED_SUFFIX = ".unsupported"
+# Each block starts with the unix timestamp of its samples and their amount.
+BLOCK_HEADER = struct.Struct("<dI")
+# The array type codes of the app id, final price, original price and discount
+# columns, the prices are in cents.
+COLUMNS = ("I", "i", "i", "B")
+SAMPLE_SIZE = sum(array(code).itemsize for code in COLUMNS)
+
+PriceSample = tuple[int, int, int]
+# The lowest and highest price in cents, the average price in currency units,
+# the percentage of the time on sale and when the last sale started.
+Statistics = tuple[int, int, float, float, float | None]
+
+
+def get_price_sample(store_item: dict[str, Any]) -> PriceSample | None:
+    """Return the final price, original price and discount of a store item."""
+    pricing = store_item.get("best_purchase_option") or {}
+    if (final_price := pricing.get("final_price_in_cents")) is None:
+        return None
+    original_price = pricing.get("original_price_in_cents", final_price)
+    return int(final_price), int(original_price), int(pricing.get("discount_pct", 0))
+
+
+class AppPriceHistory:
+    """The price samples of a single app and statistics about them."""
+
+    __slots__ = (
+        "times",
+        "final_prices",
+        "original_prices",
+        "discounts",
+        "min_price",
+        "max_price",
+        "last_sale",
+        "_closed_total",
+        "_closed_time",
+        "_closed_sale_time",
+    )
+
+    def __init__(self) -> None:
+        self.times = array("d")
+        self.final_prices = array("i")
+        self.original_prices = array("i")
+        self.discounts = array("B")
+        # The lowest and highest final price ever seen, in cents.
+        self.min_price = 0
+        self.max_price = 0
+        # When the most recent sale started, as a unix timestamp.
+        self.last_sale: float | None = None
+        # The final prices times the seconds they held, the seconds they held
+        # and the seconds on sale, for every sample but the last one.
+        self._closed_total = 0.0
+        self._closed_time = 0.0
+        self._closed_sale_time = 0.0
+
+    def append(self, timestamp: float, sample: PriceSample) -> None:
+        """Add a sample that was taken at `timestamp`."""
+        self.extend(timestamp, sample)
+        self.update_statistics(len(self.times) - 1)
+
+    def extend(self, timestamp: float, sample: PriceSample) -> None:
+        """Add a sample without updating the statistics."""
+        if self.times and timestamp < self.times[-1]:
+            # Clocks may go back, keep the samples sorted.
+            timestamp = self.times[-1]
+        self.times.append(timestamp)
+        self.final_prices.append(sample[0])
+        self.original_prices.append(sample[1])
+        self.discounts.append(sample[2])
+
+    def update_statistics(self, start: int) -> None:
+        """Account for the samples from index `start` on in the statistics.
+
+        The samples are summed up column by column, so loading a long history
+        doesn't take a pass through every sample in Python code.
+        """
+        times, final_prices, discounts = self.times, self.final_prices, self.discounts
+        new_prices = final_prices[start:]
+        if start == 0:
+            self.min_price, self.max_price = min(new_prices), max(new_prices)
+        else:
+            self.min_price = min(self.min_price, min(new_prices))
+            self.max_price = max(self.max_price, max(new_prices))
+
+        # The samples that now have a next sample they held until.
+        closed = slice(max(start - 1, 0), len(times) - 1)
+        durations = array(
+            "d", map(operator.sub, times[closed.start + 1 :], times[closed])
+        )
+        self._closed_total += sum(map(operator.mul, final_prices[closed], durations))
+        self._closed_time += sum(durations)
+        self._closed_sale_time += sum(compress(durations, discounts[closed]))
+
+        for index in range(len(times) - 1, start - 1, -1):
+            if discounts[index] and (index == 0 or not discounts[index - 1]):
+                self.last_sale = times[index]
+                break
+
+    @property
+    def last_sample(self) -> PriceSample:
+        """Return the most recent sample."""
+        return self.final_prices[-1], self.original_prices[-1], self.discounts[-1]
+
+    def get_sample(self, timestamp: float) -> PriceSample | None:
+        """Return the sample that held at `timestamp`, if there was one yet."""
+        if (index := bisect_right(self.times, timestamp) - 1) < 0:
+            return None
+        return (
+            self.final_prices[index],
+            self.original_prices[index],
+            self.discounts[index],
+        )
+
+    def get_average_price(self, now: float) -> float:
+        """Return the final price averaged over the time each price held."""
+        duration = max(0.0, now - self.times[-1])
+        if not (total_time := self._closed_time + duration):
+            return float(self.final_prices[-1])
+        return (self._closed_total + self.final_prices[-1] * duration) / total_time
+
+    def get_time_on_sale(self, now: float) -> float:
+        """Return the share of the time the app was on sale, from 0 to 1."""
+        duration = max(0.0, now - self.times[-1])
+        if not (total_time := self._closed_time + duration):
+            return float(self.discounts[-1] > 0)
+        sale_time = self._closed_sale_time + (duration if self.discounts[-1] else 0)
+        return sale_time / total_time
+
+    def get_statistics(self, now: float) -> Statistics:
+        """Return the statistics at the precision they are rendered with."""
+        return (
+            self.min_price,
+            self.max_price,
+            round(self.get_average_price(now) / 100, 2),
+            round(self.get_time_on_sale(now) * 100, 1),
+            self.last_sale,
+        )
+
+    def as_attributes(self, now: float) -> dict[str, Any]:
+        """Render the statistics as entity attributes, prices in currency units."""
+        return render_statistics(self.get_statistics(now))
+
+
+def render_statistics(statistics: Statistics) -> dict[str, Any]:
+    """Render statistics as entity attributes, prices in currency units."""
+    min_price, max_price, average_price, percent_on_sale, last_sale = statistics
+    return {
+        "lowest_price": min_price / 100,
+        "highest_price": max_price / 100,
+        "average_price": average_price,
+        "percent_time_on_sale": percent_on_sale,
+        "last_on_sale": None
+        if last_sale is None
+        else dt_util.utc_from_timestamp(last_sale).isoformat(),
+    }
+
+
+class PriceHistory:
+    """The price history of every game on a wishlist.
+
+    The index is only read and changed on the event loop, the executor jobs
+    only read and write the file.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.apps: dict[int, AppPriceHistory] = {}
+        # The attributes of each app as of the last `update_attributes`, with
+        # the statistics they were rendered from.
+        self._attributes: dict[int, tuple[Statistics, dict[str, Any]]] = {}
+        self._loaded = False
+
+    def get(self, app_id: int) -> AppPriceHistory | None:
+        """Return the price history of an app."""
+        return self.apps.get(app_id)
+
+    def get_attributes(self, app_id: int) -> dict[str, Any] | None:
+        """Return the attributes of an app as of the last `update_attributes`."""
+        if (rendered := self._attributes.get(app_id)) is None:
+            return None
+        return rendered[1]
+
+    def update_attributes(self, now: float) -> list[int]:
+        """Render the attributes of every app as of `now`.
+
+        The average price and the time on sale move along with the time, so
+        they are rendered once per refresh rather than when an entity is
+        written.  Returns the apps whose attributes changed.
+        """
+        changed = []
+        for app_id, history in self.apps.items():
+            statistics = history.get_statistics(now)
+            rendered = self._attributes.get(app_id)
+            if rendered is None or rendered[0] != statistics:
+                self._attributes[app_id] = (statistics, render_statistics(statistics))
+                changed.append(app_id)
+        return changed
+
+    async def async_load(self, hass: core.HomeAssistant) -> None:
+        """Read the file into the index of each app, if it wasn't yet."""
+        if self._loaded:
+            return
+        apps = await hass.async_add_executor_job(self.read)
+        if not self._loaded:
+            self.apps = apps
+            self._loaded = True
+
+    def read(self) -> dict[int, AppPriceHistory]:
+        """Read the file into a new index of each app.
+
+        A damaged end of the file, e.g. from a write that was cut short, is
+        dropped.  A file of another format is moved aside, not overwritten, and
+        a new history is started.  This does I/O, run it in the executor.
+        """
+        apps: dict[int, AppPriceHistory] = {}
+        try:
+            with open(self.path, "rb") as file:
+                content = file.read()
+        except FileNotFoundError:
+            return apps
+        except OSError as err:
+            _LOGGER.warning("Unable to read price history %s: %s", self.path, err)
+            return apps
+
+        if len(content) >= FILE_HEADER.size and FILE_HEADER.unpack_from(content) != (
+            MAGIC,
+            VERSION,
+        ):
+            self._move_aside()
+            return apps
+        end = _read_blocks(memoryview(content), apps)
+        if end < len(content):
+            _LOGGER.warning("Dropping the damaged end of price history %s", self.path)
+            try:
+                os.truncate(self.path, end)
+            except OSError as err:
+                _LOGGER.warning("Unable to repair price history %s: %s", self.path, err)
+        return apps
+
+    def _move_aside(self) -> None:
+        """Move a file of another format out of the way of a new history."""
+        unsupported_path = f"{self.path}{UNSUPPORTED_SUFFIX}"
+        _LOGGER.warning(
+            "Price history %s has an unsupported format, moving it to %s",
+            self.path,
+            unsupported_path,
+        )
+        try:
+            os.replace(self.path, unsupported_path)
+        except OSError as err:
+            _LOGGER.warning("Unable to move price history %s: %s", self.path, err)
+
+    def get_changed_samples(
+        self, store_items: Mapping[int, dict[str, Any]]
+    ) -> dict[int, PriceSample]:
+        """Return the prices of `store_items` that changed since their last sample."""
+        samples: dict[int, PriceSample] = {}
+        for app_id, store_item in store_items.items():
+            if (sample := get_price_sample(store_item)) is None:
+                continue
+            history = self.apps.get(app_id)
+            if history is None or history.last_sample != sample:
+                samples[app_id] = sample
+        return samples
+
+    async def async_record(
+        self,
+        hass: core.HomeAssistant,
+        timestamp: float,
+        store_items: Mapping[int, dict[str, Any]],
+    ) -> int:
+        """Append the prices of `store_items` that changed since their last sample.
+
+        Returns the amount of samples written.  The index only takes the new
+        samples once they are in the file.
+        """
+        await self.async_load(hass)
+        if not (samples := self.get_changed_samples(store_items)):
+            return 0
+        if not await hass.async_add_executor_job(self.write, timestamp, samples):
+            return 0
+        for app_id, sample in samples.items():
+            self.apps.setdefault(app_id, AppPriceHistory()).append(timestamp, sample)
+        return len(samples)
+
+    def write(self, timestamp: float, samples: Mapping[int, PriceSample]) -> bool:
+        """Append a block of samples to the file, return whether it was written.
+
+        This does I/O, run it in the executor.
+        """
+        columns = [array(code) for code in COLUMNS]
+        app_ids, final_prices, original_prices, discounts = columns
+        app_ids.extend(samples)
+        for final_price, original_price, discount in samples.values():
+            final_prices.append(final_price)
+            original_prices.append(original_price)
+            discounts.append(discount)
+        if sys.byteorder == "big":
+            for column in columns:
+                column.byteswap()
+        try:
+            with open(self.path, "ab") as file:
+                end = file.tell()
+                try:
+                    if end == 0:
+                        file.write(FILE_HEADER.pack(MAGIC, VERSION))
+                    file.write(BLOCK_HEADER.pack(timestamp, len(samples)))
+                    for column in columns:
+                        file.write(column.tobytes())
+                    file.flush()
+                except OSError:
+                    # Don't leave half a block for the next one to follow.
+                    file.truncate(end)
+                    raise
+        except OSError as err:
+            _LOGGER.error("Unable to write price history %s: %s", self.path, err)
+            return False
+        return True
+
+    async def async_remove(self, hass: core.HomeAssistant) -> None:
+        """Forget the history and remove its file."""
+        self.apps.clear()
+        self._attributes.clear()
+        await hass.async_add_executor_job(self.remove_file)
+
+    def remove_file(self) -> None:
+        """Remove the file.  This does I/O, run it in the executor."""
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def _read_blocks(content: memoryview, apps: dict[int, AppPriceHistory]) -> int:
+    """Index the samples of every complete block, return where they end.
+
+    The file header must have been checked already.
+    """
+    if len(content) < FILE_HEADER.size:
+        return 0
+
+    pos = FILE_HEADER.size
+    while pos + BLOCK_HEADER.size <= len(content):
+        timestamp, count = BLOCK_HEADER.unpack_from(content, pos)
+        start = pos + BLOCK_HEADER.size
+        if start + count * SAMPLE_SIZE > len(content):
+            break
+        columns = []
+        for code in COLUMNS:
+            column = array(code)
+            end = start + count * column.itemsize
+            column.frombytes(content[start:end])
+            if sys.byteorder == "big":
+                column.byteswap()
+            columns.append(column)
+            start = end
+        for app_id, *sample in zip(*columns):
+            if (history := apps.get(app_id)) is None:
+                history = apps[app_id] = AppPriceHistory()
+            history.extend(timestamp, sample)
+        pos = start
+
+    for history in apps.values():
+        history.update_statistics(0)
+    return pos
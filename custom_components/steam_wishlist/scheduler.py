@@ -0,0 +1,62 @@
+"""Pick when the wishlist is refreshed next.
+
+Rather than polling at a fixed interval, the next refresh is scheduled just
+after the next time a price is known or likely to change: the end of a
+discount on the wishlist or the time Steam usually starts its sales.
+"""
+
+from collections.abc import Iterable
+from datetime import date, datetime, time, timedelta
+from typing import Any
+
+from homeassistant.util import dt as dt_util
+
+from .const import MAX_SCAN_INTERVAL, MIN_SCAN_INTERVAL
+from .util import get_discount_end
+
+# Steam starts (and ends) its daily deals, weeklong deals and seasonal sales at
+# 10AM Pacific time.
+STEAM_SALE_TIME_ZONE = dt_util.get_time_zone("America/Los_Angeles")
+STEAM_SALE_START = time(10, 0)
+# How long after a price change to refresh, giving the store time to update.
+TRANSITION_DELAY = timedelta(minutes=1)
+
+
+def _get_sale_start(day: date) -> datetime:
+    """Return the time Steam usually starts sales at on `day`, in UTC."""
+    sale_start = datetime.combine(day, STEAM_SALE_START, tzinfo=STEAM_SALE_TIME_ZONE)
+    return sale_start.astimezone(dt_util.UTC)
+
+
+def get_last_sale_start(now: datetime) -> datetime:
+    """Return the most recent time Steam usually starts sales at, as of `now`."""
+    today = now.astimezone(STEAM_SALE_TIME_ZONE).date()
+    if (sale_start := _get_sale_start(today)) <= now:
+        return sale_start
+    return _get_sale_start(today - timedelta(days=1))
+
+
+def get_next_sale_start(now: datetime) -> datetime:
+    """Return the next time Steam usually starts sales at, after `now`."""
+    today = now.astimezone(STEAM_SALE_TIME_ZONE).date()
+    if (sale_start := _get_sale_start(today)) > now:
+        return sale_start
+    return _get_sale_start(today + timedelta(days=1))
+
+
+def get_refresh_interval(
+    now: datetime, store_items: Iterable[dict[str, Any]]
+) -> timedelta:
+    """Return how long to wait before the next refresh.
+
+    That is until just after the earliest upcoming discount end or sale
+    start, bounded by `MIN_SCAN_INTERVAL` and `MAX_SCAN_INTERVAL`.
+    """
+    timestamp = now.timestamp()
+    next_change = get_next_sale_start(now).timestamp()
+    for item in store_items:
+        discount_end = get_discount_end(item)
+        if discount_end is not None and timestamp < discount_end < next_change:
+            next_change = discount_end
+    interval = timedelta(seconds=next_change - timestamp) + TRANSITION_DELAY
+    return max(MIN_SCAN_INTERVAL, min(MAX_SCAN_INTERVAL, interval))
@@ -1,29 +1,77 @@
 """Coordinator and sensor manager for the integration."""
 
-import json
+import asyncio
+import importlib
 import logging
-from collections.abc import Callable
-from itertools import batched
-from typing import Any
+import sys
+from collections.abc import Callable, Container, Iterable, Mapping
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any
 
 from homeassistant import core
-from homeassistant.core import callback
+from homeassistant.components.binary_sensor import DOMAIN as BINARY_SENSOR_DOMAIN
+from homeassistant.core import CALLBACK_TYPE, callback
 from homeassistant.helpers import entity_registry as er
-from homeassistant.helpers.aiohttp_client import async_get_clientsession
 from homeassistant.helpers.entity import DeviceInfo
+from homeassistant.helpers.storage import STORAGE_DIR, Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+from homeassistant.util import dt as dt_util, slugify
 
-from .const import DOMAIN, SCAN_INTERVAL
-from .entities import SteamGameEntity, SteamWishlistEntity
-from .util import get_steam_game
+from .const import (
+    DEFAULT_ATTRIBUTE_BUDGET,
+    DEFAULT_ATTRIBUTE_PAGES,
+    DOMAIN,
+    MIN_SCAN_INTERVAL,
+    SCAN_INTERVAL,
+    SORT_WISHLIST,
+)
+from .entities import (
+    SteamGameEntity,
+    SteamRefreshMetricsEntity,
+    SteamWishlistEntity,
+    UnrecordedSteamWishlistEntity,
+    get_game_unique_id,
+)
+from .metrics import (
+    STAGE_LISTENERS,
+    STAGE_PARSE,
+    STAGE_PRICE_HISTORY,
+    STAGE_STORE_ITEMS,
+    STAGE_UPDATE_ITEMS,
+    STAGE_WISHLIST,
+    RefreshStats,
+    time_stage,
+)
+from .price_history import PriceHistory
+from .scheduler import (
+    TRANSITION_DELAY,
+    get_last_sale_start,
+    get_next_sale_start,
+    get_refresh_interval,
+)
+from .snapshot import WishlistSnapshot
+from .types import SteamGameRecord
+from .util import get_discount_end, project_store_item
+
+if TYPE_CHECKING:
+    from .client import SteamApiClient
 
 _LOGGER = logging.getLogger(__name__)
+# The Steam client along with the fetching and decoding code is only imported
+# once the first refresh runs.
+CLIENT_MODULE = f"{__package__}.client"
 WISHLIST_ID = -1
-# The max amount of app ids to request data for in a single network request.
-BATCH_SIZE = 100
+# How long store items are reused before they are requested again.
+ITEM_TTL = timedelta(hours=6)
+# Store items are requested again when a known discount ends within this window.
+PRICE_TRANSITION_WINDOW = timedelta(minutes=10)
 DEVICE_CONFIGURATION_URL = "https://store.steampowered.com/wishlist/profiles/{}/"
-GET_WISHLIST_URL = "https://api.steampowered.com/IWishlistService/GetWishlist/v1"
-GET_APPS_URL = "https://api.steampowered.com/IStoreBrowseService/GetItems/v1"
+STORAGE_KEY = DOMAIN + ".{}"
+# The price history file of a steam id, in the storage directory.
+PRICE_HISTORY_FILE = STORAGE_KEY + ".prices"
+STORAGE_VERSION = 1
+# Seconds to wait before writing refreshed data to disk.
+STORAGE_SAVE_DELAY = 60
 
 SteamEntity = SteamGameEntity | SteamWishlistEntity
 
@@ -38,10 +86,48 @@ class SteamWishlistDataUpdateCoordinator(DataUpdateCoordinator):
     is scheduled.
     """
 
-    def __init__(self, hass: core.HomeAssistant, api_key: str, steam_id: str) -> None:
+    def __init__(
+        self,
+        hass: core.HomeAssistant,
+        api_key: str,
+        steam_id: str,
+        item_ttl: timedelta = ITEM_TTL,
+        client: "SteamApiClient | None" = None,
+        refresh_metrics: bool = False,
+    ) -> None:
         self.api_key = api_key
         self.steam_id = steam_id
-        self.http_session = async_get_clientsession(hass)
+        self.item_ttl = item_ttl
+        # Requests to Steam go through the client shared by all config entries.
+        self._client = client
+        # When the store item of each app was last fetched, as a unix timestamp.
+        self._fetched_at: dict[int, float] = {}
+        # The `date_added` of each app on the wishlist when it was last fetched.
+        self._date_added: dict[int, int] = {}
+        # A hash of the wishlist entries of the last complete refresh, and the
+        # unix timestamp the first of its store items goes stale at.
+        self._wishlist_hash: int | None = None
+        self._fresh_until = 0.0
+        self._snapshot: WishlistSnapshot | None = None
+        # A snapshot of data about to be set, parsed in the executor.
+        self._next_snapshot: WishlistSnapshot | None = None
+        # Listeners for a single game keyed by the game's app id.
+        self._app_listeners: dict[int, set[CALLBACK_TYPE]] = {}
+        # The snapshot version and availability listeners were last updated with.
+        self._dispatched_version: int | None = None
+        self._dispatched_success = True
+        self._store: Store = Store(hass, STORAGE_VERSION, STORAGE_KEY.format(steam_id))
+        # Whether a delayed save of the store is scheduled.
+        self._save_pending = False
+        self.price_history = PriceHistory(get_price_history_path(hass, steam_id))
+        # The price history write, if one is running.
+        self._price_history_write: asyncio.Future[int] | None = None
+        # Set once the config entry unloads, nothing is written after that.
+        self._unloaded = False
+        # How long the stages of the last refreshes took, if recorded.
+        self.refresh_stats = RefreshStats(refresh_metrics)
+        # Shared by every entity of the config entry, built on first use.
+        self._device_info: DeviceInfo | None = None
         super().__init__(
             hass,
             _LOGGER,
@@ -50,82 +136,468 @@ class SteamWishlistDataUpdateCoordinator(DataUpdateCoordinator):
             update_interval=SCAN_INTERVAL,
         )
 
+    async def _async_refresh(self, *args: Any, **kwargs: Any) -> None:
+        """Refresh data, recording how long the refresh took if enabled."""
+        self.refresh_stats.start()
+        try:
+            await super()._async_refresh(*args, **kwargs)
+        finally:
+            self.refresh_stats.finish()
+
+    async def async_unload(self) -> None:
+        """Stop refreshing and finish writing the data of the config entry.
+
+        Once this returns nothing writes the stored data or the price history
+        anymore, so they can be removed along with the config entry.
+        """
+        self._unloaded = True
+        await self.async_shutdown()
+        if self._price_history_write is not None:
+            # The write is shielded, it keeps running when its refresh is cancelled.
+            await self._price_history_write
+        if self._save_pending:
+            await self._store.async_save(self._data_to_store())
+
+    @property
+    def client(self) -> "SteamApiClient":
+        """Return the Steam client, the shared one unless another was given."""
+        if self._client is None:
+            from .client import async_get_client
+
+            self._client = async_get_client(self.hass)
+        return self._client
+
+    async def _async_import_client(self) -> None:
+        """Import the client module in the executor, unless it already is.
+
+        Setup doesn't need it when the entities are restored from the stored
+        data, the refresh that follows in the background imports it.
+        """
+        if self._client is None and CLIENT_MODULE not in sys.modules:
+            await self.hass.async_add_import_executor_job(
+                importlib.import_module, CLIENT_MODULE
+            )
+
+    async def async_get_client(self) -> "SteamApiClient":
+        """Return the Steam client, importing its module in the executor first."""
+        await self._async_import_client()
+        return self.client
+
     async def _async_fetch_data(self) -> dict[int, dict[str, Any]]:
-        """Fetch the data for the coordinator."""
-        async with self.http_session.get(
-            GET_WISHLIST_URL, params={"key": self.api_key, "steamid": self.steam_id}
-        ) as resp:
-            wishlist_data = await resp.json()
-            if (wishlist_items := wishlist_data["response"].get("items")) is None:
-                _LOGGER.warning(
-                    "wishlist response had no `items` key: %s", wishlist_data
-                )
-                return {}
+        """Fetch the data for the coordinator.
+
+        A failed refresh is retried after `MIN_SCAN_INTERVAL`, not after the
+        interval the last successful one picked, which can be hours.
+        """
+        try:
+            return await self._async_fetch_wishlist_data()
+        except Exception:
+            self.update_interval = MIN_SCAN_INTERVAL
+            raise
+
+    async def _async_fetch_wishlist_data(self) -> dict[int, dict[str, Any]]:
+        await self._async_import_client()
+        metrics = self.refresh_stats.current
+        with time_stage(metrics, STAGE_WISHLIST):
+            wishlist_data = await self.client.async_get_wishlist(
+                self.api_key, self.steam_id, metrics
+            )
+        utcnow = dt_util.utcnow()
+        if (wishlist_items := wishlist_data["response"].get("items")) is None:
+            _LOGGER.warning("wishlist response had no `items` key: %s", wishlist_data)
+            # There are no discounts to wait for, only the next sale start.
+            self.update_interval = get_refresh_interval(utcnow, ())
+            return {}
+
+        now = utcnow.timestamp()
+        wishlist_hash = hash(
+            tuple(
+                (item["appid"], item.get("date_added", 0), item.get("priority", 0))
+                for item in wishlist_items
+            )
+        )
+        if (
+            self.data is not None
+            and wishlist_hash == self._wishlist_hash
+            and now < self._fresh_until
+        ):
+            # Nothing on the wishlist changed and none of its store items went
+            # stale, so the current data is kept as is.
+            self.update_interval = get_refresh_interval(utcnow, self.data.values())
+            return self.data
 
-            app_ids: list[int] = [item["appid"] for item in wishlist_items]
+        app_ids: list[int] = [item["appid"] for item in wishlist_items]
 
+        # Only request the store items that may have changed since they were
+        # last fetched, the rest are reused from the previous refresh.
+        # Any game may have gone on sale at the last usual sale start, once
+        # the store had time to update.
+        sale_start = (
+            get_last_sale_start(utcnow - TRANSITION_DELAY) + TRANSITION_DELAY
+        ).timestamp()
+        previous: dict[int, dict[str, Any]] = self.data or {}
+        stale_ids = [
+            item["appid"]
+            for item in wishlist_items
+            if self._is_store_item_stale(
+                item, previous.get(item["appid"]), now, sale_start
+            )
+        ]
+        # Other config entries may have fetched some of these apps moments
+        # ago, those are only reused if they're newer than the copy we have.
+        with time_stage(metrics, STAGE_STORE_ITEMS):
+            store_items, failed_ids = await self.client.async_get_store_items(
+                self.api_key, stale_ids, self._fetched_at, metrics
+            )
+
+        for item in wishlist_items:
+            if (fetched := store_items.get(item["appid"])) is not None:
+                self._fetched_at[item["appid"]] = fetched[0]
+                self._date_added[item["appid"]] = item.get("date_added", 0)
+        # Forget apps that are no longer on the wishlist.
+        for app_id in self._fetched_at.keys() - set(app_ids):
+            del self._fetched_at[app_id]
+            self._date_added.pop(app_id, None)
+
+        # Batches can complete in any order, so build the result in the
+        # order the games appear on the wishlist.
+        # Apps whose batch failed keep their last known data until they are
+        # requested again on the next refresh.
         data: dict[int, dict[str, Any]] = {}
-        for batch in batched(app_ids, BATCH_SIZE):
-            input_json = {
-                "ids": [{"appid": str(app_id)} for app_id in batch],
-                "context": {
-                    "language": self.hass.config.language or "en",
-                    "country_code": self.hass.config.country or "US",
-                },
-                "data_request": {
-                    "include_assets": True,
-                    "include_reviews": True,
-                    "include_basic_info": True,
-                },
-            }
-            async with self.http_session.get(
-                GET_APPS_URL,
-                params={"key": self.api_key, "input_json": json.dumps(input_json)},
-            ) as resp:
-                apps_data = await resp.json()
-                data.update(
-                    {item["id"]: item for item in apps_data["response"]["store_items"]}
+        requested_ids = set(stale_ids) - failed_ids
+        for app_id in app_ids:
+            if app_id in store_items:
+                data[app_id] = store_items[app_id][1]
+            elif app_id not in requested_ids and app_id in previous:
+                data[app_id] = previous[app_id]
+
+        if self._unloaded:
+            # The entry unloaded while fetching, don't write its data again.
+            return data
+        self._save_pending = True
+        self._store.async_delay_save(self._data_to_store, STORAGE_SAVE_DELAY)
+        with time_stage(metrics, STAGE_PRICE_HISTORY):
+            self._price_history_write = self.hass.async_create_task(
+                self.price_history.async_record(
+                    self.hass,
+                    now,
+                    {app_id: fetched[1] for app_id, fetched in store_items.items()},
                 )
+            )
+            try:
+                await asyncio.shield(self._price_history_write)
+            finally:
+                if self._price_history_write.done():
+                    self._price_history_write = None
+        # Refresh again just after the next price change we know or expect.
+        self.update_interval = get_refresh_interval(utcnow, data.values())
+        if failed_ids:
+            # Try the apps that failed again soon.
+            self.update_interval = MIN_SCAN_INTERVAL
+        if failed_ids or len(data) < len(app_ids):
+            # Apps without a store item are requested on every refresh.
+            self._wishlist_hash = None
+        else:
+            self._wishlist_hash = wishlist_hash
+            self._fresh_until = self._get_fresh_until(data, utcnow)
+        with time_stage(metrics, STAGE_PARSE):
+            await self._async_parse_snapshot(data)
+        if metrics is not None:
+            metrics.items_parsed = len(data)
         return data
 
+    async def async_load_stored_data(self) -> bool:
+        """Set the data saved by a previous run as the coordinator data.
+
+        Returns True if there was stored data.  The price history is loaded
+        as well.
+        """
+        await self.price_history.async_load(self.hass)
+        if (stored := await self._store.async_load()) is None:
+            return False
+
+        data: dict[int, dict[str, Any]] = {}
+        try:
+            for app_id, fetched_at, date_added, item in stored["items"]:
+                data[app_id] = project_store_item(item)
+                self._fetched_at[app_id] = fetched_at
+                self._date_added[app_id] = date_added
+        except (KeyError, TypeError, ValueError):
+            _LOGGER.warning("Ignoring invalid stored wishlist data")
+            self._fetched_at.clear()
+            self._date_added.clear()
+            return False
+
+        await self._async_parse_snapshot(data)
+        self.async_set_updated_data(data)
+        return True
+
+    @callback
+    def _data_to_store(self) -> dict[str, Any]:
+        """Return the data to save between restarts."""
+        self._save_pending = False
+        return {
+            "items": [
+                [
+                    app_id,
+                    self._fetched_at.get(app_id, 0),
+                    self._date_added.get(app_id, 0),
+                    item,
+                ]
+                for app_id, item in (self.data or {}).items()
+            ]
+        }
+
+    def _is_store_item_stale(
+        self,
+        wishlist_item: dict[str, Any],
+        store_item: dict[str, Any] | None,
+        now: float,
+        sale_start: float,
+    ) -> bool:
+        """Return True if the store item of a wishlist entry should be fetched.
+
+        That is the case for apps that are new on the wishlist, were fetched
+        longer than `item_ttl` ago or before `sale_start`, or have a known
+        discount that is about to end.
+        """
+        app_id = wishlist_item["appid"]
+        fetched_at = self._fetched_at.get(app_id)
+        if store_item is None or fetched_at is None:
+            return True
+        if wishlist_item.get("date_added", 0) != self._date_added.get(app_id):
+            # The app was removed and added to the wishlist again.
+            return True
+        if now - fetched_at >= self.item_ttl.total_seconds():
+            return True
+        if fetched_at < sale_start:
+            # A sale may have started since the item was fetched.
+            return True
+        discount_end = get_discount_end(store_item)
+        return (
+            discount_end is not None
+            and fetched_at < discount_end
+            and discount_end - now <= PRICE_TRANSITION_WINDOW.total_seconds()
+        )
+
+    def _get_fresh_until(
+        self, data: dict[int, dict[str, Any]], utcnow: datetime
+    ) -> float:
+        """Return the unix timestamp the first store item in `data` goes stale at.
+
+        See `_is_store_item_stale`, every item is expected to have been fetched
+        since the last sale start.
+        """
+        fresh_until = (
+            get_next_sale_start(utcnow - TRANSITION_DELAY) + TRANSITION_DELAY
+        ).timestamp()
+        item_ttl = self.item_ttl.total_seconds()
+        window = PRICE_TRANSITION_WINDOW.total_seconds()
+        for app_id, store_item in data.items():
+            fetched_at = self._fetched_at.get(app_id, 0)
+            fresh_until = min(fresh_until, fetched_at + item_ttl)
+            discount_end = get_discount_end(store_item)
+            if discount_end is not None and fetched_at < discount_end:
+                fresh_until = min(fresh_until, discount_end - window)
+        return fresh_until
+
+    async def _async_parse_snapshot(self, data: dict[int, dict[str, Any]]) -> None:
+        """Parse the snapshot of `data` in the executor before it is set.
+
+        Parsing thousands of games takes long enough to hold up the event
+        loop, this way the listeners called once `data` is set only have to
+        pick up the parsed games.
+        """
+        previous = self.snapshot
+        self._next_snapshot = await self.hass.async_add_executor_job(
+            WishlistSnapshot,
+            previous.version + 1,
+            data,
+            previous,
+            self.hass.config.currency,
+        )
+
+    @property
+    def snapshot(self) -> WishlistSnapshot:
+        """Return the parsed games for the current coordinator data.
+
+        The snapshot is only rebuilt when new data has been set on the
+        coordinator, every other access reuses the already parsed games.
+        """
+        if self._snapshot is None or self._snapshot.data is not self.data:
+            version = 1 if self._snapshot is None else self._snapshot.version + 1
+            parsed, self._next_snapshot = self._next_snapshot, None
+            if (
+                parsed is not None
+                and parsed.data is self.data
+                and parsed.version == version
+            ):
+                self._snapshot = parsed
+            else:
+                self._snapshot = WishlistSnapshot(
+                    version, self.data, self._snapshot, self.hass.config.currency
+                )
+        return self._snapshot
+
+    @callback
+    def async_add_listener(
+        self, update_callback: CALLBACK_TYPE, context: Any = None
+    ) -> Callable[[], None]:
+        """Listen for data updates.
+
+        Listeners registered with an app id as their `context` are only called
+        when that game changed.
+        """
+        remove_listener = super().async_add_listener(update_callback, context)
+        if context is None:
+            return remove_listener
+
+        self._app_listeners.setdefault(context, set()).add(update_callback)
+
+        @callback
+        def remove_app_listener() -> None:
+            remove_listener()
+            listeners = self._app_listeners.get(context, set())
+            listeners.discard(update_callback)
+            if not listeners:
+                self._app_listeners.pop(context, None)
+
+        return remove_app_listener
+
+    @callback
+    def async_update_listeners(self) -> None:
+        """Update the listeners affected by the latest refresh.
+
+        Rather than updating every entity after each refresh, only the games
+        that were added, removed or changed since the last update are updated,
+        along with the games whose price history attributes moved.
+        """
+        with time_stage(self.refresh_stats.current, STAGE_LISTENERS):
+            self._async_update_listeners()
+
+    @callback
+    def _async_update_listeners(self) -> None:
+        snapshot = self.snapshot
+        previous_version = self._dispatched_version
+        availability_changed = self.last_update_success != self._dispatched_success
+        self._dispatched_version = snapshot.version
+        self._dispatched_success = self.last_update_success
+        if (
+            availability_changed
+            or previous_version is None
+            or snapshot.version > previous_version + 1
+        ):
+            self.price_history.update_attributes(dt_util.utcnow().timestamp())
+            super().async_update_listeners()
+            return
+
+        if snapshot.version == previous_version:
+            # Nothing changed since the last update.
+            return
+
+        now = dt_util.utcnow().timestamp()
+        changed_ids = dict.fromkeys(snapshot.diff.changed)
+        changed_ids.update(dict.fromkeys(self.price_history.update_attributes(now)))
+        if snapshot.diff:
+            for update_callback, context in list(self._listeners.values()):
+                if context is None:
+                    update_callback()
+        for game_id in changed_ids:
+            for update_callback in list(self._app_listeners.get(game_id, ())):
+                update_callback()
+
     @property
     def device_info(self) -> DeviceInfo:
-        """Return device info for the integration."""
-        unique_id = self.config_entry.unique_id
-        return DeviceInfo(
-            identifiers={(DOMAIN, unique_id)},
-            manufacturer="Valve Corp",
-            name="Steam",
-            configuration_url=DEVICE_CONFIGURATION_URL.format(self.steam_id),
-        )
+        """Return device info for the integration.
+
+        It's built once per config entry, every entity shares it.
+        """
+        if self._device_info is None:
+            self._device_info = DeviceInfo(
+                identifiers={(DOMAIN, self.config_entry.unique_id)},
+                manufacturer="Valve Corp",
+                name="Steam",
+                configuration_url=DEVICE_CONFIGURATION_URL.format(self.steam_id),
+            )
+        return self._device_info
+
+
+def get_price_history_path(hass: core.HomeAssistant, steam_id: str) -> str:
+    """Return the path of the price history file of `steam_id`."""
+    return hass.config.path(STORAGE_DIR, PRICE_HISTORY_FILE.format(steam_id))
+
+
+def get_removed_game_ids(
+    current_wishlist: dict[int, SteamEntity], data: dict[int, Any]
+) -> set[int]:
+    """Return the ids of games with an entity that are no longer on the wishlist."""
+    # Never remove the sensor.steam_wishlist
+    return current_wishlist.keys() - data.keys() - {WISHLIST_ID}
+
+
+def get_game_slugs(
+    games: Mapping[int, SteamGameRecord],
+    taken: Mapping[str, int],
+    registered: Container[str],
+) -> dict[int, str]:
+    """Return the slug of the entity id of each of `games`.
+
+    `taken` maps the slugs of the existing game entities to their app id and
+    `registered` holds the slugs of the games in the entity registry.  Games
+    whose titles slugify the same get their app id appended to the slug, all
+    but one: the game with an existing entity, else the lowest app id that
+    wasn't registered with its app id appended.  So a game keeps its entity
+    id across restarts whatever order the games come in.
+    """
+    slugs: dict[int, str] = {}
+    app_ids_by_slug: dict[str, list[int]] = {}
+    for app_id, game in games.items():
+        slug = slugs[app_id] = slugify(game["title"])
+        app_ids_by_slug.setdefault(slug, []).append(app_id)
+
+    for slug, app_ids in app_ids_by_slug.items():
+        if slug in taken:
+            owner = None
+        elif len(app_ids) == 1:
+            continue
+        else:
+            owner = min(
+                (app_id for app_id in app_ids if f"{slug}_{app_id}" not in registered),
+                default=None,
+            )
+        for app_id in app_ids:
+            if app_id != owner:
+                slugs[app_id] = f"{slug}_{app_id}"
+    return slugs
 
 
 async def async_remove_games(
     current_wishlist: dict[int, SteamEntity],
     coordinator: SteamWishlistDataUpdateCoordinator,
+    game_ids: Iterable[int] | None = None,
 ) -> None:
     """Remove games no longer on the wish list.
 
     This will delete the entity and unregister it with homeassistant.
     This method also mutates `current_wishlist`, removing games that should
-    be removed.
+    be removed.  If `game_ids` isn't given, the games to remove are computed
+    from the coordinator data.
     """
-    removed_entities = []
-    for game_id, entity in current_wishlist.items():
-        # Never remove the sensor.steam_wishlist
-        if game_id == WISHLIST_ID:
-            continue
+    if game_ids is None:
+        game_ids = get_removed_game_ids(current_wishlist, coordinator.data)
+    entities = [
+        entity
+        for game_id in game_ids
+        if (entity := current_wishlist.pop(game_id, None)) is not None
+    ]
+    if not entities:
+        return
 
-        if game_id not in coordinator.data:
-            # Need to remove entity
-            removed_entities.append(game_id)
-            await entity.async_remove()
-            ent_registry = er.async_get(coordinator.hass)
-            if entity.entity_id in ent_registry.entities:
-                ent_registry.async_remove(entity.entity_id)
-
-    for game_id in removed_entities:
-        del current_wishlist[game_id]
+    await asyncio.gather(*[entity.async_remove() for entity in entities])
+    ent_registry = er.async_get(coordinator.hass)
+    for entity in entities:
+        if entity.entity_id in ent_registry.entities:
+            ent_registry.async_remove(entity.entity_id)
 
 
 class SensorManager:
@@ -140,16 +612,41 @@ class SensorManager:
         store_all_wishlist_items: bool,
         api_key: str,
         steam_id: str,
+        max_wishlist_items: int = 0,
+        attribute_budget: int = DEFAULT_ATTRIBUTE_BUDGET,
+        attribute_pages: int = DEFAULT_ATTRIBUTE_PAGES,
+        exclude_from_recorder: bool = False,
+        sort_order: str = SORT_WISHLIST,
+        refresh_metrics: bool = False,
     ) -> None:
         """Initialize the sensor manager."""
         self.hass = hass
         self.store_all_wishlist_items = store_all_wishlist_items
+        # Only put the games with the highest discounts in the wishlist sensor
+        # attributes, 0 means no limit.
+        self.max_wishlist_items = max_wishlist_items
+        # The max size in bytes of the games in each wishlist sensor's attributes.
+        self.attribute_budget = attribute_budget
+        # The amount of wishlist sensors to split the games across.
+        self.attribute_pages = attribute_pages
+        self.exclude_from_recorder = exclude_from_recorder
+        # The order of the games in the wishlist sensor attributes.
+        self.sort_order = sort_order
         self.steam_id = steam_id
         self.api_key = api_key
-        self.coordinator = SteamWishlistDataUpdateCoordinator(hass, api_key, steam_id)
+        # Record how long refreshes take, with a diagnostic sensor showing it.
+        self.refresh_metrics = refresh_metrics
+        self.coordinator = SteamWishlistDataUpdateCoordinator(
+            hass, api_key, steam_id, refresh_metrics=refresh_metrics
+        )
         self._component_add_entities = {}
         self.cleanup_jobs = []
         self.current_wishlist: dict[int, SteamEntity] = {}
+        # The wishlist sensors for pages after the first one.
+        self.wishlist_pages: list[SteamWishlistEntity] = []
+        self.refresh_metrics_sensor: SteamRefreshMetricsEntity | None = None
+        # The snapshot version entities were last added or removed for.
+        self._snapshot_version = 0
 
     async def async_register_component(
         self, platform: str, async_add_entities: Callable
@@ -163,32 +660,63 @@ class SensorManager:
         # All platforms are now registered for the component.
         # Add callback to update sensors when coordinator refreshes data.
         self.coordinator.async_add_listener(self.async_update_items)
+        if await self.coordinator.async_load_stored_data():
+            # Entities were created from the data saved by the last run, so
+            # don't make setup wait on Steam for fresh data.  The refresh is
+            # cancelled if the entry unloads first.
+            self.coordinator.config_entry.async_create_background_task(
+                self.hass,
+                self.coordinator.async_refresh(),
+                f"{DOMAIN} {self.steam_id} refresh",
+            )
+            return
         # Fetch initial data.
         await self.coordinator.async_refresh()
 
     @callback
     def async_update_items(self):
         """Add or remove sensors based on coordinator data."""
+        with time_stage(self.coordinator.refresh_stats.current, STAGE_UPDATE_ITEMS):
+            self._async_update_items()
+
+    @callback
+    def _async_update_items(self) -> None:
         if len(self._component_add_entities) < 2:
             # Wait until both sensor and binary_sensor platforms are registered
             return
 
-        new_sensors: list[SteamWishlistEntity] = []
+        new_sensors: list[SteamWishlistEntity | SteamRefreshMetricsEntity] = []
+        wishlist_cls = (
+            UnrecordedSteamWishlistEntity
+            if self.exclude_from_recorder
+            else SteamWishlistEntity
+        )
         if not self.current_wishlist.get(WISHLIST_ID):
-            self.current_wishlist[WISHLIST_ID] = SteamWishlistEntity(self)
+            self.current_wishlist[WISHLIST_ID] = wishlist_cls(self)
             new_sensors.append(self.current_wishlist[WISHLIST_ID])
+        while len(self.wishlist_pages) < self.attribute_pages - 1:
+            page = wishlist_cls(self, page=len(self.wishlist_pages) + 2)
+            self.wishlist_pages.append(page)
+            new_sensors.append(page)
+        if self.refresh_metrics and self.refresh_metrics_sensor is None:
+            self.refresh_metrics_sensor = SteamRefreshMetricsEntity(self)
+            new_sensors.append(self.refresh_metrics_sensor)
 
-        new_binary_sensors: list[SteamGameEntity] = []
-
-        for game_id, game in self.coordinator.data.items():
-            existing = self.current_wishlist.get(game_id)
-            if existing is not None:
-                continue
+        snapshot = self.coordinator.snapshot
+        if snapshot.version == self._snapshot_version + 1:
+            # Only the games added since the last update can be new.
+            game_ids = snapshot.diff.added
+        else:
+            game_ids = list(snapshot.games)
+        self._snapshot_version = snapshot.version
 
-            # Found a new game that we will need to create a new binary_sensor for.
-            steam_game = get_steam_game(game_id, game)
-            self.current_wishlist[game_id] = SteamGameEntity(self, steam_game)
-            new_binary_sensors.append(self.current_wishlist[game_id])
+        # The games we will need to create a new binary_sensor for.
+        new_games = {
+            game_id: snapshot.games[game_id]
+            for game_id in game_ids
+            if game_id not in self.current_wishlist
+        }
+        new_binary_sensors = self._create_game_entities(new_games)
 
         if new_sensors:
             self._component_add_entities["sensor"](new_sensors)
@@ -196,6 +724,46 @@ class SensorManager:
             self._component_add_entities["binary_sensor"](new_binary_sensors)
 
         # Handle removing any entities that removed from the steam wishlist.
-        self.hass.async_create_task(
-            async_remove_games(self.current_wishlist, self.coordinator)
-        )
+        if removed_game_ids := get_removed_game_ids(
+            self.current_wishlist, snapshot.games
+        ):
+            self.hass.async_create_task(
+                async_remove_games(
+                    self.current_wishlist, self.coordinator, removed_game_ids
+                )
+            )
+
+    def _create_game_entities(
+        self, games: Mapping[int, SteamGameRecord]
+    ) -> list[SteamGameEntity]:
+        """Create the entities of `games` and add them to the current wishlist.
+
+        The entity registry is read once for all of them: games that were
+        registered before get their registered entity id, so they keep any
+        rename, and the slugs of the rest are resolved against it in bulk.
+        """
+        if not games:
+            return []
+        prefix = get_game_unique_id(self.steam_id, "")
+        registered: dict[str, str] = {}
+        for entry in er.async_entries_for_config_entry(
+            er.async_get(self.hass), self.coordinator.config_entry.entry_id
+        ):
+            if entry.domain == BINARY_SENSOR_DOMAIN and entry.unique_id.startswith(
+                prefix
+            ):
+                registered[entry.unique_id.removeprefix(prefix)] = entry.entity_id
+        taken = {
+            entity.slug: game_id
+            for game_id, entity in self.current_wishlist.items()
+            if isinstance(entity, SteamGameEntity)
+        }
+
+        entities: list[SteamGameEntity] = []
+        for game_id, slug in get_game_slugs(games, taken, registered).items():
+            entity = SteamGameEntity(
+                self, games[game_id], slug=slug, entity_id=registered.get(slug)
+            )
+            self.current_wishlist[game_id] = entity
+            entities.append(entity)
+        return entities
@@ -0,0 +1,249 @@
+"""Parsed snapshots of the coordinator data."""
+
+from bisect import bisect_left, insort
+from collections.abc import Iterable, Mapping
+from itertools import islice
+from typing import Any
+
+from .const import SORT_DISCOUNT, SORT_PRICE, SORT_WISHLIST
+from .types import SteamGame, SteamGameRecord
+from .util import get_steam_game, paginate_games
+
+# The fields of a parsed game that are compared for each kind of change.
+CHANGE_FIELDS: dict[str, tuple[str, ...]] = {
+    "title": ("title",),
+    "price": ("normal_price", "sale_price", "price", "final_price"),
+    "discount": ("percent_off",),
+    "reviews": ("rating", "review_desc", "reviews_percent", "reviews_total"),
+    "assets": ("box_art_url", "fanart", "poster"),
+}
+
+
+class WishlistDiff:
+    """The changes between two consecutive wishlist snapshots."""
+
+    def __init__(
+        self,
+        added: list[int],
+        removed: list[int],
+        changed: dict[int, frozenset[str]],
+    ) -> None:
+        # Ids of games that are new on the wishlist.
+        self.added = added
+        # Ids of games that are no longer on the wishlist.
+        self.removed = removed
+        # Ids of games that changed mapped to the kinds of change, e.g. `price`.
+        self.changed = changed
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.changed)
+
+
+def diff_games(
+    old: dict[int, SteamGameRecord], new: dict[int, SteamGameRecord]
+) -> WishlistDiff:
+    """Return the games added, removed and changed between `old` and `new`."""
+    added = [game_id for game_id in new if game_id not in old]
+    removed = [game_id for game_id in old if game_id not in new]
+    changed: dict[int, frozenset[str]] = {}
+    for game_id, game in new.items():
+        old_game = old.get(game_id)
+        if old_game is None or old_game == game:
+            continue
+        kinds = frozenset(
+            kind
+            for kind, fields in CHANGE_FIELDS.items()
+            if any(old_game.get(field) != game.get(field) for field in fields)
+        )
+        if kinds:
+            changed[game_id] = kinds
+    return WishlistDiff(added, removed, changed)
+
+
+# Games without a price are sorted after the ones with a price.
+NO_PRICE = 2**31
+
+
+def discount_key(game: SteamGameRecord) -> tuple[float, int]:
+    """Return the sort key of a game in the biggest discount first index."""
+    return -game.percent_off, game.app_id
+
+
+def price_key(game: SteamGameRecord) -> tuple[int, int]:
+    """Return the sort key of a game in the cheapest first index."""
+    return NO_PRICE if game.final_price is None else game.final_price, game.app_id
+
+
+class WishlistIndexes:
+    """Secondary indexes over the games of a snapshot.
+
+    The sorted indexes hold the sort key of each game, which ends with the
+    game's id.  Ties are broken by that id.
+    """
+
+    def __init__(
+        self,
+        on_sale: set[int],
+        by_discount: list[tuple[float, int]],
+        by_price: list[tuple[int, int]],
+        review_buckets: dict[str, set[int]],
+    ) -> None:
+        # Ids of the games on sale.
+        self.on_sale = on_sale
+        # Every game, biggest discount first.
+        self.by_discount = by_discount
+        # Every game, lowest final price first.
+        self.by_price = by_price
+        # Ids of the games by their review score, e.g. `Very Positive`.
+        self.review_buckets = review_buckets
+
+    @classmethod
+    def build(cls, games: Mapping[int, SteamGameRecord]) -> "WishlistIndexes":
+        """Index every game from scratch."""
+        review_buckets: dict[str, set[int]] = {}
+        for game_id, game in games.items():
+            review_buckets.setdefault(game.review_desc, set()).add(game_id)
+        return cls(
+            {game_id for game_id, game in games.items() if game.percent_off > 0},
+            sorted(map(discount_key, games.values())),
+            sorted(map(price_key, games.values())),
+            review_buckets,
+        )
+
+    def update(
+        self,
+        old_games: Mapping[int, SteamGameRecord],
+        new_games: Mapping[int, SteamGameRecord],
+        diff: WishlistDiff,
+    ) -> "WishlistIndexes":
+        """Return the indexes of `new_games`, these being the ones of `old_games`.
+
+        Only the games in `diff` are moved, unless so many changed that
+        sorting them all again is cheaper.  These indexes are left as is.
+        """
+        moved = len(diff.added) + len(diff.removed) + len(diff.changed)
+        if moved > len(new_games) // 4:
+            return self.build(new_games)
+
+        on_sale = set(self.on_sale)
+        by_discount = list(self.by_discount)
+        by_price = list(self.by_price)
+        # The buckets are copied once they change.
+        review_buckets = dict(self.review_buckets)
+        copied: set[str] = set()
+
+        def get_bucket(label: str) -> set[int]:
+            if label not in copied:
+                copied.add(label)
+                review_buckets[label] = set(review_buckets.get(label, ()))
+            return review_buckets[label]
+
+        for game_id in [*diff.removed, *diff.changed]:
+            game = old_games[game_id]
+            on_sale.discard(game_id)
+            _remove_sorted(by_discount, discount_key(game))
+            _remove_sorted(by_price, price_key(game))
+            get_bucket(game.review_desc).discard(game_id)
+        for game_id in [*diff.added, *diff.changed]:
+            game = new_games[game_id]
+            if game.percent_off > 0:
+                on_sale.add(game_id)
+            insort(by_discount, discount_key(game))
+            insort(by_price, price_key(game))
+            get_bucket(game.review_desc).add(game_id)
+        for label in copied:
+            if not review_buckets[label]:
+                del review_buckets[label]
+        return WishlistIndexes(on_sale, by_discount, by_price, review_buckets)
+
+
+def _remove_sorted(keys: list[Any], key: Any) -> None:
+    """Remove `key` from the sorted list `keys`."""
+    del keys[bisect_left(keys, key)]
+
+
+class WishlistSnapshot:
+    """The parsed games for a single version of the coordinator data.
+
+    A snapshot is built once per coordinator refresh and shared by every
+    entity, so each game is only parsed by `get_steam_game` once per refresh
+    no matter how many times entity properties are read.  Prices Steam didn't
+    format are written in `currency`.
+    """
+
+    def __init__(
+        self,
+        version: int,
+        data: dict[int, dict[str, Any]] | None,
+        previous: "WishlistSnapshot | None" = None,
+        currency: str | None = None,
+    ) -> None:
+        self.version = version
+        # The coordinator data this snapshot was parsed from.
+        self.data = data
+        self.games: dict[int, SteamGameRecord] = {}
+        for game_id, game in (data or {}).items():
+            # This indicates an empty wishlist.
+            if game_id == "success":
+                break
+            self.games[game_id] = get_steam_game(game_id, game, currency)
+        # What changed since the previous snapshot.
+        self.diff = diff_games({} if previous is None else previous.games, self.games)
+        if previous is None:
+            self.indexes = WishlistIndexes.build(self.games)
+        else:
+            self.indexes = previous.indexes.update(
+                previous.games, self.games, self.diff
+            )
+        self._wishlist_pages: dict[tuple[Any, ...], list[list[SteamGame]]] = {}
+
+    def get_wishlist_pages(
+        self,
+        store_all: bool,
+        max_items: int,
+        budget: int,
+        max_pages: int,
+        sort_order: str = SORT_WISHLIST,
+    ) -> list[list[SteamGame]]:
+        """Return the rendered games of each wishlist sensor page.
+
+        See `paginate_games`.  The pages are only built once per snapshot for
+        the same options.
+        """
+        key = (store_all, max_items, budget, max_pages, sort_order)
+        if (pages := self._wishlist_pages.get(key)) is None:
+            games = self._get_wishlist_games(store_all, max_items, sort_order)
+            pages = paginate_games(games, budget, max_pages)
+            self._wishlist_pages[key] = pages
+        return pages
+
+    def _get_wishlist_games(
+        self, store_all: bool, max_items: int, sort_order: str
+    ) -> Iterable[SteamGameRecord]:
+        """Return the games for the wishlist sensors in `sort_order`.
+
+        The games are read from the indexes as the pages are filled, so only
+        the games that end up on a page are visited when sorting by discount.
+        """
+        games, indexes = self.games, self.indexes
+        if max_items:
+            # The games with the biggest discounts, in that order by default.
+            if not store_all:
+                max_items = min(max_items, len(indexes.on_sale))
+            top = [games[key[-1]] for key in indexes.by_discount[:max_items]]
+            if sort_order == SORT_PRICE:
+                top.sort(key=price_key)
+            return top
+
+        if sort_order == SORT_DISCOUNT:
+            by_discount = indexes.by_discount
+            if not store_all:
+                by_discount = islice(by_discount, len(indexes.on_sale))
+            game_ids: Iterable[int] = (key[-1] for key in by_discount)
+        elif sort_order == SORT_PRICE:
+            game_ids = (key[-1] for key in indexes.by_price)
+        else:
+            game_ids = games
+        if not store_all and sort_order != SORT_DISCOUNT:
+            game_ids = (game_id for game_id in game_ids if game_id in indexes.on_sale)
+        return (games[game_id] for game_id in game_ids)
@@ -1,4 +1,5 @@
-from typing import TypedDict
+from collections.abc import Iterator, Mapping
+from typing import Any, TypedDict
 
 
 class SteamGame(TypedDict):
@@ -13,3 +14,142 @@ class SteamGame(TypedDict):
     sale_price: str | None
     steam_id: int
     title: str
+
+
+class SteamGameRecord(Mapping):
+    """An immutable, compact parsed Steam game.
+
+    Only the values that differ between games are stored.  Reading it as a
+    mapping gives the same keys and values as a `SteamGame`, and `as_dict`
+    renders the attributes Home Assistant needs.  The `final_price` in cents
+    can be read too, but isn't one of the attributes.
+    """
+
+    __slots__ = (
+        "app_id",
+        "title",
+        "rating",
+        "price",
+        "normal_price",
+        "percent_off",
+        "review_desc",
+        "reviews_percent",
+        "reviews_total",
+        "sale_price",
+        "image_url",
+        "final_price",
+    )
+
+    KEYS = (
+        "title",
+        "rating",
+        "price",
+        "genres",
+        "release",
+        "airdate",
+        "normal_price",
+        "percent_off",
+        "review_desc",
+        "reviews_percent",
+        "reviews_total",
+        "sale_price",
+        "steam_id",
+        "box_art_url",
+        "fanart",
+        "poster",
+        "deep_link",
+    )
+
+    def __init__(
+        self,
+        app_id: int,
+        title: str,
+        rating: str,
+        price: str,
+        normal_price: str | None,
+        percent_off: float,
+        review_desc: str,
+        reviews_percent: int | str,
+        reviews_total: int,
+        sale_price: str | None,
+        image_url: str | None,
+        final_price: int | None = None,
+    ) -> None:
+        for name, value in zip(
+            self.__slots__,
+            (
+                app_id,
+                title,
+                rating,
+                price,
+                normal_price,
+                percent_off,
+                review_desc,
+                reviews_percent,
+                reviews_total,
+                sale_price,
+                image_url,
+                final_price,
+            ),
+        ):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __getitem__(self, key: str) -> Any:
+        if key in ("box_art_url", "fanart", "poster"):
+            return self.image_url
+        if key == "steam_id":
+            return str(self.app_id)
+        if key == "deep_link":
+            return f"https://store.steampowered.com/app/{self.app_id}"
+        if key in ("genres", "release"):
+            return ""
+        if key == "airdate":
+            return "unknown"
+        if key in self.__slots__ and key not in ("app_id", "image_url"):
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.KEYS)
+
+    def __len__(self) -> int:
+        return len(self.KEYS)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, SteamGameRecord):
+            return self._values() == other._values()
+        return super().__eq__(other)
+
+    def __reduce__(self) -> tuple[type, tuple[Any, ...]]:
+        return (type(self), self._values())
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.app_id}, {self.title!r})"
+
+    def _values(self) -> tuple[Any, ...]:
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def as_dict(self) -> SteamGame:
+        """Render the game as the attributes of a `SteamGame`."""
+        return {
+            "title": self.title,
+            "rating": self.rating,
+            "price": self.price,
+            "genres": "",
+            "release": "",
+            "airdate": "unknown",
+            "normal_price": self.normal_price,
+            "percent_off": self.percent_off,
+            "review_desc": self.review_desc,
+            "reviews_percent": self.reviews_percent,
+            "reviews_total": self.reviews_total,
+            "sale_price": self.sale_price,
+            "steam_id": str(self.app_id),
+            "box_art_url": self.image_url,
+            "fanart": self.image_url,
+            "poster": self.image_url,
+            "deep_link": f"https://store.steampowered.com/app/{self.app_id}",
+        }
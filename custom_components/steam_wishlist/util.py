@@ -1,44 +1,161 @@
 """Utilities for the integration."""
 
+import json
 import logging
+import re
+import sys
+from collections.abc import Iterable
 from typing import Any
 
-from .types import SteamGame
+from homeassistant.helpers.json import json_bytes
+
+from .formatting import format_cents, format_price_info, format_rating
+from .types import SteamGame, SteamGameRecord
 
 _LOGGER = logging.getLogger(__name__)
 ASSET_BASE_URL = "https://shared.cloudflare.steamstatic.com/store_item_assets/"
+# Added Upcoming Media Card compatibility
+PLACEHOLDERS = {
+    "title_default": "$title",
+    "line1_default": "$rating",
+    "line2_default": "$price",
+    "line3_default": "$release",
+    "line4_default": "$genres",
+    "icon": "mdi:arrow-down-bold",
+}
+# The fields of a GetItems store item used by the integration.
+PRICING_FIELDS = (
+    "discount_pct",
+    "final_price_in_cents",
+    "original_price_in_cents",
+    "formatted_final_price",
+    "formatted_original_price",
+)
+REVIEW_FIELDS = ("percent_positive", "review_score_label", "review_count")
+ASSET_FIELDS = ("asset_url_format", "main_capsule")
+# The start of a GetItems response body, up to its first store item.
+_STORE_ITEMS_START = re.compile(r'\s*\{\s*"response"\s*:\s*\{\s*"store_items"\s*:\s*\[')
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_DECODER = json.JSONDecoder()
+
+
+def project_store_item(item: dict[str, Any]) -> dict[str, Any]:
+    """Project a GetItems store item down to the fields used by the integration.
+
+    The result has the same shape as the store item so it can be used anywhere
+    a store item can, it just doesn't hold on to everything else in it.
+    """
+    compact: dict[str, Any] = {"id": item["id"], "name": item.get("name")}
+    if (pricing := item.get("best_purchase_option")) is not None:
+        compact_pricing = {
+            field: pricing[field] for field in PRICING_FIELDS if field in pricing
+        }
+        if discounts := pricing.get("active_discounts"):
+            compact_pricing["active_discounts"] = [
+                {"discount_end_date": discount["discount_end_date"]}
+                for discount in discounts
+                if "discount_end_date" in discount
+            ]
+        compact["best_purchase_option"] = compact_pricing
+    if (reviews := item.get("reviews", {}).get("summary_filtered")) is not None:
+        compact["reviews"] = {
+            "summary_filtered": {
+                field: reviews[field] for field in REVIEW_FIELDS if field in reviews
+            }
+        }
+    if (assets := item.get("assets")) is not None:
+        compact["assets"] = {
+            field: assets[field] for field in ASSET_FIELDS if field in assets
+        }
+    return compact
+
+
+def decode_store_items(body: bytes) -> dict[int, dict[str, Any]]:
+    """Decode a GetItems response body into projected store items by app id.
+
+    Store items are decoded and projected one at a time, so the full object
+    tree of only a single store item exists at once instead of the one of
+    the whole response.  This is CPU bound, run it in the executor.
+    """
+    text = body.decode()
+    if (match := _STORE_ITEMS_START.match(text)) is None:
+        # Not laid out the way Steam usually does, decode it all at once.
+        store_items = json.loads(text)["response"]["store_items"]
+        return {item["id"]: project_store_item(item) for item in store_items}
+
+    items: dict[int, dict[str, Any]] = {}
+    pos = _WHITESPACE.match(text, match.end()).end()
+    try:
+        while text[pos] != "]":
+            item, pos = _DECODER.raw_decode(text, pos)
+            items[item["id"]] = project_store_item(item)
+            pos = _WHITESPACE.match(text, pos).end()
+            if text[pos] == ",":
+                pos = _WHITESPACE.match(text, pos + 1).end()
+    except IndexError as err:
+        # Like a body json.loads can't decode, so the request is retried.
+        raise ValueError("Store items response ended early") from err
+    return items
+
+
+def get_discount_end(game: dict[str, Any]) -> int | None:
+    """Get the unix timestamp the earliest active discount of a game ends at."""
+    discounts = (game.get("best_purchase_option") or {}).get("active_discounts", [])
+    end_dates = [
+        discount["discount_end_date"]
+        for discount in discounts
+        if discount.get("discount_end_date")
+    ]
+    return min(end_dates, default=None)
 
 
-def get_steam_game(game_id: int, game: dict[str, Any]) -> SteamGame:
-    """Get a SteamGame from a game dict."""
+def _intern(value: str | None) -> str | None:
+    """Intern strings that repeat across many games, e.g. prices."""
+    return None if value is None else sys.intern(value)
+
+
+def _get_formatted_price(
+    pricing: dict[str, Any], field: str, currency: str | None
+) -> str | None:
+    """Return a price as formatted by Steam.
+
+    If Steam left the formatted price out, it is written from the price in
+    cents in `currency`, when that is known.
+    """
+    if (formatted := pricing.get(f"formatted_{field}")) is not None:
+        return formatted
+    if currency is None or (cents := pricing.get(f"{field}_in_cents")) is None:
+        return None
+    return format_cents(int(cents), currency)
+
+
+def get_steam_game(
+    game_id: int, game: dict[str, Any], currency: str | None = None
+) -> SteamGameRecord:
+    """Get a SteamGameRecord from a game dict."""
     pricing: dict[str, Any] | None = None
     discount_pct: float = 0
     normal_price: str | None = None
     sale_price: str | None = None
+    final_price: int | None = None
     if (pricing := game.get("best_purchase_option")) is not None:
         discount_pct = pricing.get("discount_pct", 0)
+        if (final_price_in_cents := pricing.get("final_price_in_cents")) is not None:
+            final_price = int(final_price_in_cents)
         if not discount_pct:
-            normal_price = pricing["formatted_final_price"]
+            normal_price = _get_formatted_price(pricing, "final_price", currency)
         else:
-            normal_price = pricing["formatted_original_price"]
-            sale_price = pricing["formatted_final_price"]
+            normal_price = _get_formatted_price(pricing, "original_price", currency)
+            sale_price = _get_formatted_price(pricing, "final_price", currency)
 
     reviews = game.get("reviews", {}).get("summary_filtered", {})
     reviews_percent = reviews.get("percent_positive", "N/A")
     review_desc = reviews.get("review_score_label", "No reviews")
-    rating_info = f"Reviews:&nbsp;&nbsp;{reviews_percent}% ({review_desc})"
     review_count = reviews.get("review_count", 0)
-
+    # Games with the same reviews and prices share the rendered strings.
+    rating_info = format_rating(reviews_percent, review_desc)
     try:
-        if normal_price is None:
-            price_info = "Price:&nbsp;&nbsp;TBD"
-        elif sale_price is not None:
-            strikethrough_price = (
-                "".join(ch + "\u0336" for ch in normal_price[:-1]) + normal_price[-1]
-            )
-            price_info = f"{strikethrough_price} {sale_price} ({discount_pct}% off)&nbsp;&nbsp;🎫"
-        else:
-            price_info = f"Price:&nbsp;&nbsp;{normal_price}"
+        price_info = format_price_info(normal_price, sale_price, discount_pct)
     except (ValueError, TypeError):
         price_info = "Price information unavailable"
 
@@ -50,23 +167,48 @@ def get_steam_game(game_id: int, game: dict[str, Any]) -> SteamGame:
     except KeyError:
         image_url = None
 
-    game: SteamGame = {
-        "title": game["name"],
-        "rating": rating_info,
-        "price": price_info,
-        "genres": "",
-        "release": "",
-        "airdate": "unknown",
-        "normal_price": normal_price,
-        "percent_off": discount_pct,
-        "review_desc": review_desc,
-        "reviews_percent": reviews_percent,
-        "reviews_total": review_count,
-        "sale_price": sale_price,
-        "steam_id": str(game_id),
-        "box_art_url": image_url,
-        "fanart": image_url,
-        "poster": image_url,
-        "deep_link": f"https://store.steampowered.com/app/{game_id}",
-    }
-    return game
+    return SteamGameRecord(
+        app_id=game_id,
+        title=game["name"],
+        rating=rating_info,
+        price=price_info,
+        normal_price=_intern(normal_price),
+        percent_off=discount_pct,
+        review_desc=_intern(review_desc),
+        reviews_percent=reviews_percent,
+        reviews_total=review_count,
+        sale_price=_intern(sale_price),
+        image_url=image_url,
+        final_price=final_price,
+    )
+
+
+def paginate_games(
+    games: Iterable[SteamGameRecord], budget: int, max_pages: int
+) -> list[list[SteamGame]]:
+    """Split games into pages of wishlist sensor attributes.
+
+    The serialized `data` and `on_sale` attributes of each page stay within
+    `budget` bytes.  Games that don't fit in `max_pages` pages are left out.
+    """
+    base_size = len(json_bytes({"data": [PLACEHOLDERS], "on_sale": []}))
+    pages: list[list[SteamGame]] = [[]]
+    size = base_size
+    for game in games:
+        rendered = game.as_dict()
+        # Include the separating comma.
+        game_size = len(json_bytes(rendered)) + 1
+        if rendered["percent_off"] > 0:
+            # A game on sale is in both `data` and `on_sale`.
+            game_size *= 2
+        if base_size + game_size > budget:
+            # Too big for any page.
+            continue
+        if size + game_size > budget:
+            if len(pages) == max_pages:
+                break
+            pages.append([])
+            size = base_size
+        pages[-1].append(rendered)
+        size += game_size
+    return pages
@@ -0,0 +1,165 @@
+"""Common helpers for steam-wishlist tests."""
+
+import asyncio
+import copy
+import json
+import os
+import zlib
+from typing import Any
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+import pytest
+
+WISHLIST_PATH = "/IWishlistService/GetWishlist/v1"
+ITEMS_PATH = "/IStoreBrowseService/GetItems/v1"
+# Benchmarks only run when this is set, to the path to write their results to.
+BENCHMARK_ENV = "STEAM_WISHLIST_BENCHMARK"
+benchmark = pytest.mark.skipif(
+    not os.environ.get(BENCHMARK_ENV), reason=f"set {BENCHMARK_ENV} to run"
+)
+
+
+def make_store_items(template: dict[str, Any], count: int) -> list[dict[str, Any]]:
+    """Generate `count` synthetic store items shaped like `template`."""
+    items = []
+    for index in range(count):
+        app_id = 100000 + index
+        item = copy.deepcopy(template)
+        item["id"] = app_id
+        item["appid"] = app_id
+        item["name"] = f"Game {index}"
+        item["store_url_path"] = f"app/{app_id}/Game_{index}"
+        item["assets"]["asset_url_format"] = f"steam/apps/{app_id}/${{FILENAME}}"
+        items.append(item)
+    return items
+
+
+class FakeSteamServer:
+    """A local fake of the Steam web API endpoints used by the integration."""
+
+    def __init__(self, items: list[dict[str, Any]] | None = None) -> None:
+        self.items: dict[int, dict[str, Any]] = {}
+        self._encoded: dict[int, bytes] = {}
+        self.set_items(items or [])
+        # Seconds to wait before answering a GetItems request.
+        self.delay = 0.0
+        # GetItems requests are held until this event is set, if given.
+        self.hold: asyncio.Event | None = None
+        self.requests: dict[str, int] = {WISHLIST_PATH: 0, ITEMS_PATH: 0}
+        # Every app id store items were requested for.
+        self.requested_ids: list[int] = []
+        # Overrides of the `date_added` of wishlist entries by app id.
+        self.date_added: dict[int, int] = {}
+        # The app ids on the wishlist of a steam id, all items if not set.
+        self.wishlists: dict[str, list[int]] = {}
+        # The amount of upcoming GetItems requests to answer with an error, and
+        # with a `response` that has no store items.
+        self.failures = 0
+        self.empty_responses = 0
+        # The amount of upcoming GetWishlist requests to answer with an error.
+        self.wishlist_failures = 0
+        # GetItems requests for any of these app ids always fail.
+        self.failing_ids: set[int] = set()
+        # GetItems requests with any of these api keys are rejected.
+        self.rejected_keys: set[str] = set()
+        # Responses have an ETag of their body and honour If-None-Match.
+        self.send_etag = True
+        # A Last-Modified date to send, If-Modified-Since is honoured with it.
+        self.last_modified: str | None = None
+        self.not_modified = 0
+        # Compress responses for clients that accept it.
+        self.compress = True
+        # The Accept-Encoding header of every request.
+        self.accept_encodings: list[str] = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        app = web.Application()
+        app.router.add_get(WISHLIST_PATH, self._handle_wishlist)
+        app.router.add_get(ITEMS_PATH, self._handle_items)
+        self.server = TestServer(app)
+
+    def set_items(self, items: list[dict[str, Any]]) -> None:
+        """Replace the games on the wishlist.
+
+        The store items are encoded up front, so answering a request barely
+        blocks the event loop the client runs in too.
+        """
+        self.items = {item["id"]: item for item in items}
+        self._encoded = {
+            app_id: json.dumps(item).encode() for app_id, item in self.items.items()
+        }
+
+    def url(self, path: str) -> str:
+        """Return the url of `path` on the fake server."""
+        return str(self.server.make_url(path))
+
+    def _respond(self, request: web.Request, body: str | bytes) -> web.Response:
+        """Answer with `body`, or that it didn't change since the last request."""
+        if isinstance(body, str):
+            body = body.encode()
+        self.accept_encodings.append(request.headers.get("Accept-Encoding", ""))
+        headers = {}
+        if self.send_etag:
+            headers["ETag"] = f'"{zlib.crc32(body):08x}"'
+        if self.last_modified is not None:
+            headers["Last-Modified"] = self.last_modified
+        if_none_match = request.headers.get("If-None-Match")
+        if (if_none_match is not None and if_none_match == headers.get("ETag")) or (
+            if_none_match is None
+            and self.last_modified is not None
+            and request.headers.get("If-Modified-Since") == self.last_modified
+        ):
+            self.not_modified += 1
+            return web.Response(status=304, headers=headers)
+        response = web.Response(
+            body=body, headers=headers, content_type="application/json"
+        )
+        if self.compress:
+            response.enable_compression()
+        return response
+
+    async def _handle_wishlist(self, request: web.Request) -> web.Response:
+        self.requests[WISHLIST_PATH] += 1
+        if self.wishlist_failures:
+            self.wishlist_failures -= 1
+            return web.Response(status=500)
+        app_ids = self.wishlists.get(request.query["steamid"], list(self.items))
+        items = [
+            {
+                "appid": app_id,
+                "priority": priority,
+                "date_added": self.date_added.get(app_id, 1700000000),
+            }
+            for priority, app_id in enumerate(app_ids)
+        ]
+        return self._respond(request, json.dumps({"response": {"items": items}}))
+
+    async def _handle_items(self, request: web.Request) -> web.Response:
+        self.requests[ITEMS_PATH] += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            if self.hold is not None:
+                await self.hold.wait()
+            input_json = json.loads(request.query["input_json"])
+            app_ids = [int(item["appid"]) for item in input_json["ids"]]
+            if request.query["key"] in self.rejected_keys:
+                return web.Response(status=403)
+            if self.failures or self.failing_ids.intersection(app_ids):
+                self.failures = max(0, self.failures - 1)
+                return web.Response(status=500)
+            if self.empty_responses:
+                self.empty_responses -= 1
+                return web.json_response({"response": {}})
+            self.requested_ids.extend(app_ids)
+            store_items = b",".join(
+                self._encoded[app_id] for app_id in app_ids if app_id in self._encoded
+            )
+            return self._respond(
+                request, b'{"response": {"store_items": [' + store_items + b"]}}"
+            )
+        finally:
+            self.in_flight -= 1
@@ -5,6 +5,29 @@ from unittest.mock import Mock
 from aioresponses import aioresponses
 import pytest
 
+from custom_components.steam_wishlist import client, sensor_manager
+from custom_components.steam_wishlist.const import (
+    DEFAULT_ATTRIBUTE_BUDGET,
+    DEFAULT_ATTRIBUTE_PAGES,
+    SORT_WISHLIST,
+)
+from custom_components.steam_wishlist.metrics import RefreshStats
+from custom_components.steam_wishlist.price_history import PriceHistory
+
+from tests.common import ITEMS_PATH, WISHLIST_PATH, FakeSteamServer
+
+
+@pytest.fixture(autouse=True)
+def price_history_path(tmp_path, monkeypatch):
+    """Fixture to keep the price history files of each test apart."""
+
+    def get_price_history_path(hass, steam_id):
+        return str(tmp_path / f"steam_wishlist.{steam_id}.prices")
+
+    monkeypatch.setattr(
+        sensor_manager, "get_price_history_path", get_price_history_path
+    )
+
 
 @pytest.fixture
 def mock_aioresponse():
@@ -13,6 +36,17 @@ def mock_aioresponse():
         yield m
 
 
+@pytest.fixture
+async def fake_steam_server(socket_enabled, monkeypatch):
+    """Fixture to run a local fake Steam server the coordinator talks to."""
+    server = FakeSteamServer()
+    await server.server.start_server()
+    monkeypatch.setattr(client, "GET_WISHLIST_URL", server.url(WISHLIST_PATH))
+    monkeypatch.setattr(client, "GET_APPS_URL", server.url(ITEMS_PATH))
+    yield server
+    await server.server.close()
+
+
 @pytest.fixture
 def game_on_sale_response_item():
     """Fixture to return an on sale steam game response item."""
@@ -155,9 +189,19 @@ def game_response_item():
 
 
 @pytest.fixture
-def coordinator_mock(hass, game_response_item, game_on_sale_response_item):
+def coordinator_mock(hass, tmp_path, game_response_item, game_on_sale_response_item):
     """Fixture to mock the update data coordinator."""
-    coordinator = Mock(data={}, hass=hass)
+    coordinator = Mock(
+        data={},
+        hass=hass,
+        _snapshot=None,
+        _next_snapshot=None,
+        price_history=PriceHistory(str(tmp_path / "steam_wishlist.prices")),
+        refresh_stats=RefreshStats(),
+    )
+    # Use the real snapshot property so entities parse the mocked data.
+    coordinator_cls = sensor_manager.SteamWishlistDataUpdateCoordinator
+    type(coordinator).snapshot = coordinator_cls.snapshot
     coordinator.data = {
         str(game_on_sale_response_item["id"]): game_on_sale_response_item,
         str(game_response_item["id"]): game_response_item,
@@ -168,5 +212,12 @@ def coordinator_mock(hass, game_response_item, game_on_sale_response_item):
 @pytest.fixture
 def manager_mock(coordinator_mock):
     """Pytest fixture mocking the sensor manager class."""
-    manager = Mock(coordinator=coordinator_mock)
+    manager = Mock(
+        coordinator=coordinator_mock,
+        store_all_wishlist_items=False,
+        max_wishlist_items=0,
+        attribute_budget=DEFAULT_ATTRIBUTE_BUDGET,
+        attribute_pages=DEFAULT_ATTRIBUTE_PAGES,
+        sort_order=SORT_WISHLIST,
+    )
     yield manager
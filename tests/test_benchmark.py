@@ -0,0 +1,302 @@
+"""Benchmarks of the refresh pipeline with synthetic wishlists.
+
+Every stage of a refresh, and a cold start until every game entity is in the
+state machine, is measured for wishlists of 10, 1,000 and 10,000 games served
+by the fake Steam server.  The benchmarks only run with
+`STEAM_WISHLIST_BENCHMARK` set to a path to write the results as JSON, e.g.
+
+    STEAM_WISHLIST_BENCHMARK=benchmark.json pytest tests/test_benchmark.py
+
+For each wishlist size and stage the results hold the wall time in seconds,
+the peak of the traced allocations in bytes and the amount of memory blocks
+still allocated after the stage.  The stages add their own counts, such as
+requests, state writes and attribute sizes.  Loading two years of hourly price
+history and looking up a game in it are under `price_history`.
+"""
+
+from collections.abc import Awaitable, Callable
+import copy
+import gc
+import inspect
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Any
+from unittest.mock import Mock, patch
+
+from homeassistant.helpers.json import json_bytes
+import pytest
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    MockEntityPlatform,
+)
+
+from custom_components.steam_wishlist import sensor_manager
+from custom_components.steam_wishlist.client import DATA_CLIENT, SteamApiClient
+from custom_components.steam_wishlist.const import DOMAIN
+from custom_components.steam_wishlist.entities import (
+    SteamGameEntity,
+    SteamWishlistEntity,
+)
+from custom_components.steam_wishlist.price_history import (
+    BLOCK_HEADER,
+    FILE_HEADER,
+    SAMPLE_SIZE,
+    AppPriceHistory,
+    PriceHistory,
+)
+from custom_components.steam_wishlist.util import get_steam_game
+from tests.common import BENCHMARK_ENV, benchmark, make_store_items
+
+pytestmark = benchmark
+SIZES = (10, 1000, 10000)
+HOUR = 3600.0
+# The share of games whose price changes between two refreshes.
+CHANGED_SHARE = 0.01
+# Results by wishlist size and stage.
+RESULTS: dict[str, dict[str, dict[str, Any]]] = {}
+
+Stage = Callable[[], Any]
+
+
+@pytest.fixture(scope="module", autouse=True)
+def benchmark_results():
+    """Fixture to write the results of every size once they're all measured."""
+    yield RESULTS
+    if path := os.environ.get(BENCHMARK_ENV):
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(
+                {"python": platform.python_version(), "results": RESULTS},
+                file,
+                indent=2,
+                sort_keys=True,
+            )
+
+
+async def measure(setup: Callable[[], Awaitable[Stage]]) -> tuple[Any, dict]:
+    """Measure the stage returned by `setup`.
+
+    The stage is set up and run twice, once for its wall time and once to
+    trace its allocations, since tracing slows it down.
+    """
+
+    async def run(stage: Stage) -> Any:
+        result = stage()
+        return await result if inspect.isawaitable(result) else result
+
+    stage = await setup()
+    gc.collect()
+    start = time.perf_counter()
+    await run(stage)
+    wall_time = time.perf_counter() - start
+
+    stage = await setup()
+    gc.collect()
+    blocks = sys.getallocatedblocks()
+    tracemalloc.start()
+    result = await run(stage)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, {
+        "wall_time": round(wall_time, 6),
+        "peak_bytes": peak,
+        "allocated_blocks": sys.getallocatedblocks() - blocks,
+    }
+
+
+@pytest.mark.parametrize("size", SIZES)
+async def test_refresh_pipeline_benchmark(
+    hass, fake_steam_server, game_on_sale_response_item, size
+):
+    """Benchmark each stage of a refresh of a synthetic wishlist."""
+    items = make_store_items(game_on_sale_response_item, size)
+    fake_steam_server.set_items(items)
+    coordinators = []
+    results: dict[str, dict[str, Any]] = {}
+
+    def make_manager() -> sensor_manager.SensorManager:
+        manager = sensor_manager.SensorManager(hass, True, "key", "123")
+        manager.coordinator.config_entry = MockConfigEntry(
+            domain=DOMAIN, unique_id="steam_wishlist_123"
+        )
+        manager._component_add_entities = {"binary_sensor": Mock(), "sensor": Mock()}
+        coordinators.append(manager.coordinator)
+        return manager
+
+    # Fetching the wishlist and store items, decoding and parsing them.
+    clients = []
+
+    async def setup_fetch() -> Stage:
+        # Don't let the rate limit or batch window slow down the batches.
+        client = SteamApiClient(
+            hass, rate_limit=1000, rate_limit_burst=1000, batch_window=0
+        )
+        coordinator = sensor_manager.SteamWishlistDataUpdateCoordinator(
+            hass, "key", "123", client=client
+        )
+        coordinators.append(coordinator)
+        clients.append(client)
+        return coordinator._async_fetch_data
+
+    data, results["fetch"] = await measure(setup_fetch)
+    stats = clients[-1].http_cache_stats
+    results["fetch"]["requests"] = stats.requests
+    results["fetch"]["bytes_received"] = stats.bytes_received
+    assert size == len(data)
+
+    # Parsing every game on its own.
+    async def setup_parse() -> Stage:
+        return lambda: [get_steam_game(app_id, item) for app_id, item in data.items()]
+
+    _, results["get_steam_game"] = await measure(setup_parse)
+
+    # Creating the entities of every game.
+    async def setup_update_items() -> Stage:
+        manager = make_manager()
+        manager.coordinator.data = data
+        return manager.async_update_items
+
+    _, results["async_update_items"] = await measure(setup_update_items)
+    manager = make_manager()
+    manager.coordinator.data = data
+    manager.async_update_items()
+    add_binary_sensors = manager._component_add_entities["binary_sensor"]
+    entities = add_binary_sensors.call_args[0][0]
+    wishlist = manager.current_wishlist[sensor_manager.WISHLIST_ID]
+    results["async_update_items"]["entities"] = len(entities) + 1
+    assert size == len(entities)
+
+    # Updating the entities after a refresh in which some prices changed.
+    state_writes = 0
+
+    def count_state_write(self) -> None:
+        nonlocal state_writes
+        state_writes += 1
+
+    for entity in [wishlist, *entities]:
+        entity.hass = hass
+        manager.coordinator.async_add_listener(
+            entity._handle_coordinator_update, entity.coordinator_context
+        )
+    with (
+        patch.object(SteamGameEntity, "async_write_ha_state"),
+        patch.object(SteamWishlistEntity, "async_write_ha_state"),
+    ):
+        # The first update goes to every entity.
+        manager.coordinator.async_set_updated_data(data)
+    changed = max(1, int(size * CHANGED_SHARE))
+
+    async def setup_refresh() -> Stage:
+        new_data = dict(manager.coordinator.data)
+        for app_id in list(new_data)[:changed]:
+            item = copy.deepcopy(new_data[app_id])
+            pricing = item["best_purchase_option"]
+            pricing["discount_pct"] = (pricing["discount_pct"] + 5) % 100
+            new_data[app_id] = item
+        await manager.coordinator._async_parse_snapshot(new_data)
+        return lambda: manager.coordinator.async_set_updated_data(new_data)
+
+    with (
+        patch.object(SteamGameEntity, "async_write_ha_state", count_state_write),
+        patch.object(SteamWishlistEntity, "async_write_ha_state", count_state_write),
+    ):
+        _, results["refresh"] = await measure(setup_refresh)
+    results["refresh"]["changed_games"] = changed
+    # Both runs write the same states.
+    results["refresh"]["state_writes"] = state_writes // 2
+    assert state_writes // 2 == changed + 1
+
+    # Rendering the wishlist sensor attributes.
+    async def setup_attributes() -> Stage:
+        manager.coordinator.snapshot._wishlist_pages.clear()
+        return lambda: wishlist.extra_state_attributes
+
+    attributes, results["extra_state_attributes"] = await measure(setup_attributes)
+    results["extra_state_attributes"]["attribute_bytes"] = len(json_bytes(attributes))
+    results["extra_state_attributes"]["games"] = len(attributes["data"]) - 1
+    results["extra_state_attributes"]["game_attribute_bytes"] = len(
+        json_bytes(entities[0].extra_state_attributes)
+    )
+    assert len(json_bytes(attributes)) <= manager.attribute_budget + 1024
+
+    RESULTS.setdefault(str(size), {}).update(results)
+    for coordinator in coordinators:
+        await coordinator.async_shutdown()
+
+
+@pytest.mark.parametrize("size", SIZES)
+async def test_cold_start_benchmark(
+    hass, fake_steam_server, game_on_sale_response_item, size
+):
+    """Benchmark a cold start until every game entity is in the state machine."""
+    fake_steam_server.set_items(make_store_items(game_on_sale_response_item, size))
+    hass.data[DATA_CLIENT] = SteamApiClient(
+        hass, rate_limit=1000, rate_limit_burst=1000, batch_window=0
+    )
+    config_entry = MockConfigEntry(domain=DOMAIN, unique_id="steam_wishlist_123")
+    config_entry.add_to_hass(hass)
+    manager = sensor_manager.SensorManager(hass, True, "key", "123")
+    manager.coordinator.config_entry = config_entry
+    platform = MockEntityPlatform(hass, domain="binary_sensor", platform_name=DOMAIN)
+    platform.config_entry = config_entry
+
+    gc.collect()
+    start = time.perf_counter()
+    await manager.async_register_component("sensor", Mock())
+    await manager.async_register_component(
+        "binary_sensor", platform._async_schedule_add_entities_for_entry
+    )
+    await hass.async_block_till_done()
+    wall_time = time.perf_counter() - start
+
+    assert size == len(hass.states.async_entity_ids("binary_sensor"))
+    RESULTS.setdefault(str(size), {})["cold_start"] = {
+        "wall_time": round(wall_time, 6),
+        "entities": size,
+    }
+    await platform.async_reset()
+    await manager.coordinator.async_shutdown()
+
+
+def test_price_history_benchmark(tmp_path):
+    """Benchmark the price history file and lookups with years of samples."""
+    path = str(tmp_path / "prices")
+    history = PriceHistory(path)
+    # Two years of hourly price changes of 50 games.
+    hours = 2 * 365 * 24
+    for hour in range(hours):
+        price = 1000 + hour % 100
+        history.write(hour * HOUR, {app_id: (price, 2000, 50) for app_id in range(50)})
+    assert FILE_HEADER.size + hours * (BLOCK_HEADER.size + 50 * SAMPLE_SIZE) == (
+        os.path.getsize(path)
+    )
+
+    start = time.perf_counter()
+    apps = history.read()
+    results = {
+        "load": {
+            "wall_time": round(time.perf_counter() - start, 6),
+            "samples": 50 * hours,
+            "file_bytes": os.path.getsize(path),
+        }
+    }
+    assert hours == len(apps[0].times)
+
+    short = AppPriceHistory()
+    for hour in range(10):
+        short.append(hour * HOUR, (1000, 2000, 50))
+    # Reading a game shouldn't scan its history, so the lookups in a long
+    # history take about as long as in a short one.
+    for name, app in (("short", short), ("long", apps[0])):
+        start = time.perf_counter()
+        for _ in range(10000):
+            app.get_sample(5.5 * HOUR)
+            app.as_attributes(hours * HOUR)
+        results[f"lookup_{name}"] = {
+            "wall_time": round(time.perf_counter() - start, 6),
+            "samples": len(app.times),
+        }
+    RESULTS["price_history"] = results
@@ -0,0 +1,407 @@
+"""Tests for the shared Steam client."""
+
+import asyncio
+from datetime import timedelta
+import math
+import random
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import aiohttp
+import pytest
+
+from custom_components.steam_wishlist import client as client_module
+from custom_components.steam_wishlist.client import (
+    SteamApiClient,
+    TokenBucket,
+    async_get_client,
+)
+from custom_components.steam_wishlist.sensor_manager import (
+    SteamWishlistDataUpdateCoordinator,
+)
+from custom_components.steam_wishlist.util import decode_store_items
+from tests.common import ITEMS_PATH, WISHLIST_PATH, make_store_items
+
+
+async def test_async_get_client_is_shared(hass):
+    """Test every coordinator of a hass instance uses the same client."""
+    first = SteamWishlistDataUpdateCoordinator(hass, "key", "1")
+    second = SteamWishlistDataUpdateCoordinator(hass, "key", "2")
+    assert first.client is second.client
+    assert async_get_client(hass) is first.client
+
+
+async def test_overlapping_entries_coalesce_requests(
+    hass, fake_steam_server, game_on_sale_response_item
+):
+    """Test N entries with overlapping wishlists fetch each app once."""
+    items = make_store_items(game_on_sale_response_item, 300)
+    fake_steam_server.set_items(items)
+    fake_steam_server.delay = 0.05
+    client = SteamApiClient(hass)
+    coordinators = [
+        SteamWishlistDataUpdateCoordinator(hass, "key", str(index), client=client)
+        for index in range(20)
+    ]
+
+    # Every entry refreshes at the same time.
+    results = await asyncio.gather(
+        *[coordinator._async_fetch_data() for coordinator in coordinators]
+    )
+    assert all(list(data) == [item["id"] for item in items] for data in results)
+    assert 20 == fake_steam_server.requests[WISHLIST_PATH]
+    assert 3 == fake_steam_server.requests[ITEMS_PATH]
+    assert sorted(fake_steam_server.requested_ids) == [item["id"] for item in items]
+    # The entries share the same store item objects.
+    assert results[0][items[0]["id"]] is results[19][items[0]["id"]]
+
+    # An entry set up a little later is served from the cache.
+    late = SteamWishlistDataUpdateCoordinator(hass, "key", "late", client=client)
+    assert 300 == len(await late._async_fetch_data())
+    assert 3 == fake_steam_server.requests[ITEMS_PATH]
+
+
+async def test_batches_are_packed_across_entries(
+    hass, fake_steam_server, game_on_sale_response_item
+):
+    """Benchmark GetItems calls for overlapping wishlists refreshing together."""
+    items = make_store_items(game_on_sale_response_item, 400)
+    fake_steam_server.set_items(items)
+    fake_steam_server.delay = 0.05
+    rng = random.Random(0)
+    for index in range(10):
+        fake_steam_server.wishlists[str(index)] = [
+            item["id"] for item in rng.sample(items, 120)
+        ]
+    unique_ids = set().union(*fake_steam_server.wishlists.values())
+    # The window only closes once every entry queued its app ids, however
+    # long their wishlist requests take.
+    client = SteamApiClient(hass, batch_window=3600)
+    coordinators = [
+        SteamWishlistDataUpdateCoordinator(hass, "key", str(index), client=client)
+        for index in range(10)
+    ]
+    queued = 0
+    async_get_store_items = client.async_get_store_items
+
+    async def async_count_store_items(*args, **kwargs):
+        nonlocal queued
+        # The app ids are queued before the first await.
+        queued += 1
+        return await async_get_store_items(*args, **kwargs)
+
+    client.async_get_store_items = async_count_store_items
+
+    fetches = asyncio.gather(
+        *[coordinator._async_fetch_data() for coordinator in coordinators]
+    )
+    while queued < len(coordinators):
+        await asyncio.sleep(0.01)
+    for context, handle in list(client._flush_handles.items()):
+        handle.cancel()
+        client._flush(context)
+    results = await fetches
+    for coordinator, data in zip(coordinators, results):
+        assert fake_steam_server.wishlists[coordinator.steam_id] == list(data)
+
+    # Batching each wishlist on its own would take 2 calls per entry.
+    assert math.ceil(len(unique_ids) / 100) == fake_steam_server.requests[ITEMS_PATH]
+    assert sorted(unique_ids) == sorted(fake_steam_server.requested_ids)
+
+
+async def test_cache_never_returns_older_items(
+    hass, freezer, fake_steam_server, game_on_sale_response_item
+):
+    """Test cached items are only used when newer than the caller's copy."""
+    items = make_store_items(game_on_sale_response_item, 2)
+    fake_steam_server.set_items(items)
+    # The loop clock is frozen too, so don't wait for other entries' app ids.
+    client = SteamApiClient(hass, cache_ttl=timedelta(minutes=5), batch_window=0)
+    app_ids = [item["id"] for item in items]
+
+    first, _ = await client.async_get_store_items("key", app_ids)
+    assert 1 == fake_steam_server.requests[ITEMS_PATH]
+    fetched_at = {app_id: first[app_id][0] for app_id in app_ids}
+    freezer.tick(timedelta(minutes=1))
+    assert (first, set()) == await client.async_get_store_items("key", app_ids)
+    assert 1 == fake_steam_server.requests[ITEMS_PATH]
+    # The caller already has these copies, so they are requested again.
+    second, _ = await client.async_get_store_items("key", app_ids, fetched_at)
+    assert 2 == fake_steam_server.requests[ITEMS_PATH]
+    assert all(second[app_id][0] > fetched_at[app_id] for app_id in app_ids)
+
+    # Expired items are requested again.
+    freezer.tick(timedelta(minutes=6))
+    await client.async_get_store_items("key", app_ids)
+    assert 3 == fake_steam_server.requests[ITEMS_PATH]
+
+
+async def test_failed_batch_fails_for_every_waiter(
+    hass, fake_steam_server, game_on_sale_response_item
+):
+    """Test the apps of a batch that keeps failing are failed for every entry."""
+    fake_steam_server.set_items(make_store_items(game_on_sale_response_item, 5))
+    fake_steam_server.delay = 0.05
+    fake_steam_server.failing_ids = {100001}
+    client = SteamApiClient(hass, retry_backoff=0.01)
+    results = await asyncio.gather(
+        client.async_get_store_items("key", [100000, 100001]),
+        client.async_get_store_items("key", [100001]),
+    )
+    assert [({}, {100000, 100001}), ({}, {100001})] == results
+    # The one request was tried 3 times.
+    assert 3 == fake_steam_server.requests[ITEMS_PATH]
+    assert not client._in_flight
+
+
+async def test_rejected_api_key_only_fails_its_entry(
+    hass, fake_steam_server, game_on_sale_response_item
+):
+    """Test apps another entry fetched with a rejected key are fetched again."""
+    items = make_store_items(game_on_sale_response_item, 150)
+    fake_steam_server.set_items(items)
+    fake_steam_server.rejected_keys = {"revoked"}
+    client = SteamApiClient(hass, retry_backoff=0.01)
+    app_ids = [item["id"] for item in items]
+    # The entry with the rejected key queues the apps first.
+    revoked, good = await asyncio.gather(
+        client.async_get_store_items("revoked", app_ids),
+        client.async_get_store_items("good", app_ids),
+    )
+    assert ({}, set(app_ids)) == revoked
+    assert sorted(app_ids) == sorted(good[0])
+    assert set() == good[1]
+    assert not client._in_flight
+    assert not client._queued
+
+
+@pytest.mark.parametrize("failure", ["failures", "empty_responses"])
+async def test_failed_requests_are_retried(
+    hass, fake_steam_server, game_on_sale_response_item, failure
+):
+    """Test failed requests are retried with backoff until they succeed."""
+    items = make_store_items(game_on_sale_response_item, 5)
+    fake_steam_server.set_items(items)
+    setattr(fake_steam_server, failure, 2)
+    client = SteamApiClient(hass, retry_backoff=0.05)
+    start = time.perf_counter()
+    store_items, failed = await client.async_get_store_items(
+        "key", [item["id"] for item in items]
+    )
+    assert 5 == len(store_items)
+    assert set() == failed
+    assert 3 == fake_steam_server.requests[ITEMS_PATH]
+    # Jittered waits of up to 0.05 and 0.1 seconds.
+    assert time.perf_counter() - start < 1
+
+
+async def test_close_stops_queued_and_running_batches(
+    hass, fake_steam_server, game_on_sale_response_item
+):
+    """Test closing the client cancels its batches and fails their apps."""
+    items = make_store_items(game_on_sale_response_item, 101)
+    fake_steam_server.set_items(items)
+    fake_steam_server.hold = asyncio.Event()
+    client = SteamApiClient(hass, batch_window=60)
+    # A full batch is sent right away, the other app waits for the window.
+    running = hass.async_create_task(
+        client.async_get_store_items("key", [item["id"] for item in items[:100]])
+    )
+    queued = hass.async_create_task(
+        client.async_get_store_items("key", [items[100]["id"]])
+    )
+    while not fake_steam_server.in_flight:
+        await asyncio.sleep(0.01)
+    assert client._flush_handles
+
+    await client.async_close()
+    assert ({}, {item["id"] for item in items[:100]}) == await running
+    assert ({}, {items[100]["id"]}) == await queued
+    assert not client._flush_handles
+    assert not client._batch_tasks
+    fake_steam_server.hold.set()
+
+
+async def test_failed_wishlist_request_is_retried(hass, fake_steam_server):
+    """Test the wishlist request is retried too."""
+    client = SteamApiClient(hass, retry_backoff=0.01)
+    fake_steam_server.wishlist_failures = 1
+    assert {"response": {"items": []}} == await client.async_get_wishlist("k", "1")
+    assert 2 == fake_steam_server.requests[WISHLIST_PATH]
+
+
+async def test_rate_limit_applies_to_all_requests(
+    hass, fake_steam_server, game_on_sale_response_item
+):
+    """Test the token bucket spaces out requests once the burst is used."""
+    fake_steam_server.set_items(make_store_items(game_on_sale_response_item, 500))
+    client = SteamApiClient(hass, rate_limit=20, rate_limit_burst=2)
+    coordinators = [
+        SteamWishlistDataUpdateCoordinator(hass, "key", str(index), client=client)
+        for index in range(3)
+    ]
+    start = time.perf_counter()
+    await asyncio.gather(
+        *[coordinator._async_fetch_data() for coordinator in coordinators]
+    )
+    elapsed = time.perf_counter() - start
+    # 3 wishlists and 5 batches, 2 of them allowed right away.
+    assert 8 == sum(fake_steam_server.requests.values())
+    assert elapsed >= 6 / 20 * 0.9
+
+
+@pytest.mark.parametrize(("rate", "capacity", "count"), [(50, 5, 15), (100, 1, 11)])
+async def test_token_bucket(monkeypatch, rate, capacity, count):
+    """Test the token bucket allows bursts, then `rate` acquisitions a second."""
+    now = 1000.0
+
+    async def sleep(delay: float) -> None:
+        nonlocal now
+        now += delay
+
+    # Only the bucket's clock and sleeps are faked, they never take real time.
+    monkeypatch.setattr(client_module, "time", SimpleNamespace(monotonic=lambda: now))
+    monkeypatch.setattr(client_module.asyncio, "sleep", sleep)
+    bucket = TokenBucket(rate, capacity)
+    for _ in range(capacity):
+        await bucket.async_acquire()
+    assert 1000 == now
+    for _ in range(count - capacity):
+        await bucket.async_acquire()
+    assert pytest.approx(1000 + (count - capacity) / rate) == now
+
+
+async def test_decoding_does_not_block_event_loop(
+    hass, fake_steam_server, game_on_sale_response_item
+):
+    """Test store item responses are decoded in the executor."""
+    items = make_store_items(game_on_sale_response_item, 100)
+    fake_steam_server.set_items(items)
+    decoding_threads = []
+
+    def decode(body: bytes):
+        decoding_threads.append(threading.get_ident())
+        return decode_store_items(body)
+
+    client = SteamApiClient(hass)
+    with patch("custom_components.steam_wishlist.client.decode_store_items", decode):
+        store_items, _ = await client.async_get_store_items(
+            "key", [item["id"] for item in items]
+        )
+
+    assert 100 == len(store_items)
+    assert decoding_threads
+    assert threading.get_ident() not in decoding_threads
+
+
+async def test_http_cache_etag(hass, fake_steam_server, game_on_sale_response_item):
+    """Test unchanged responses are neither downloaded nor decoded again."""
+    fake_steam_server.set_items(make_store_items(game_on_sale_response_item, 100))
+    client = SteamApiClient(hass)
+    stats = client.http_cache_stats
+
+    first = await client.async_get_wishlist("key", "123")
+    assert 0 == stats.not_modified
+    assert stats.bytes_received > 0
+    assert first is await client.async_get_wishlist("key", "123")
+    assert 1 == fake_steam_server.not_modified
+    assert 1 == stats.not_modified
+    assert stats.bytes_saved == stats.bytes_received
+    assert stats.decode_time_saved == stats.decode_time
+
+    # A changed response is downloaded and decoded.
+    fake_steam_server.date_added[100000] = 1800000000
+    changed = await client.async_get_wishlist("key", "123")
+    assert 1800000000 == changed["response"]["items"][0]["date_added"]
+    assert 1 == fake_steam_server.not_modified
+    # aiohttp asks for compressed transfer every time.
+    assert all("gzip" in value for value in fake_steam_server.accept_encodings)
+    assert {"GetWishlist": 0.333} == stats.as_dict()["hit_rates"]
+
+
+async def test_http_cache_last_modified(
+    hass, fake_steam_server, game_on_sale_response_item
+):
+    """Test conditional requests are made with Last-Modified too."""
+    items = make_store_items(game_on_sale_response_item, 100)
+    fake_steam_server.set_items(items)
+    fake_steam_server.send_etag = False
+    fake_steam_server.last_modified = "Wed, 18 Dec 2024 18:00:00 GMT"
+    # The loop clock is frozen too, so don't wait for other entries' app ids.
+    client = SteamApiClient(hass, cache_ttl=timedelta(0), batch_window=0)
+    app_ids = [item["id"] for item in items]
+
+    first, _ = await client.async_get_store_items("key", app_ids)
+    second, _ = await client.async_get_store_items("key", app_ids)
+    assert 2 == fake_steam_server.requests[ITEMS_PATH]
+    assert 1 == fake_steam_server.not_modified
+    assert all(first[app_id][1] is second[app_id][1] for app_id in app_ids)
+    assert client.http_cache_stats.bytes_saved > 0
+
+
+async def test_http_cache_max_bytes(
+    hass, fake_steam_server, game_on_sale_response_item
+):
+    """Test the least recently used responses are dropped over the size limit."""
+    items = make_store_items(game_on_sale_response_item, 300)
+    fake_steam_server.set_items(items)
+    client = SteamApiClient(hass, cache_ttl=timedelta(0), batch_window=0)
+    stats = client.http_cache_stats
+    await client.async_get_wishlist("key", "123")
+    await client.async_get_store_items("key", [item["id"] for item in items[:100]])
+    # Room for the wishlist and a single batch.
+    client.http_cache_max_bytes = stats.cached_bytes
+
+    for start in (100, 200):
+        await client.async_get_store_items(
+            "key", [item["id"] for item in items[start : start + 100]]
+        )
+        assert stats.cached_bytes <= client.http_cache_max_bytes
+    assert 1 == len(client._http_cache)
+    # Only the last batch is requested conditionally, the wishlist was dropped.
+    await client.async_get_store_items("key", [item["id"] for item in items[200:]])
+    await client.async_get_wishlist("key", "123")
+    assert {"GetWishlist": 0.0, "GetItems": 0.25} == stats.as_dict()["hit_rates"]
+
+
+async def test_http_cache_kept_when_request_fails(
+    hass, fake_steam_server, game_on_sale_response_item
+):
+    """Test a failed request keeps the response to request conditionally."""
+    fake_steam_server.set_items(make_store_items(game_on_sale_response_item, 5))
+    client = SteamApiClient(hass, retry_backoff=0)
+    stats = client.http_cache_stats
+    first = await client.async_get_wishlist("key", "123")
+    cached_bytes = stats.cached_bytes
+
+    # The retry is still a conditional request.
+    fake_steam_server.wishlist_failures = 1
+    assert first is await client.async_get_wishlist("key", "123")
+    assert 3 == fake_steam_server.requests[WISHLIST_PATH]
+    assert 1 == fake_steam_server.not_modified
+    assert cached_bytes == stats.cached_bytes
+
+    # So is the next request after every attempt failed.
+    client.retry_attempts = 1
+    fake_steam_server.wishlist_failures = 1
+    with pytest.raises(aiohttp.ClientResponseError):
+        await client.async_get_wishlist("key", "123")
+    assert cached_bytes == stats.cached_bytes
+    assert first is await client.async_get_wishlist("key", "123")
+    assert 2 == fake_steam_server.not_modified
+
+
+async def test_http_cache_without_validators(
+    hass, fake_steam_server, game_on_sale_response_item
+):
+    """Test responses without validators are always downloaded."""
+    fake_steam_server.set_items(make_store_items(game_on_sale_response_item, 5))
+    fake_steam_server.send_etag = False
+    client = SteamApiClient(hass)
+    await client.async_get_wishlist("key", "123")
+    await client.async_get_wishlist("key", "123")
+    assert 0 == fake_steam_server.not_modified
+    assert 0 == client.http_cache_stats.bytes_saved
+    assert {} == client._http_cache
@@ -0,0 +1,52 @@
+"""Diagnostics tests."""
+
+from unittest.mock import AsyncMock, Mock
+
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
+from custom_components.steam_wishlist.client import SteamApiClient
+from custom_components.steam_wishlist.const import DOMAIN
+from custom_components.steam_wishlist.diagnostics import (
+    async_get_config_entry_diagnostics,
+)
+from custom_components.steam_wishlist.metrics import RefreshStats
+
+
+async def test_async_get_config_entry_diagnostics(hass, fake_steam_server):
+    """Test the HTTP cache savings and refresh metrics are reported."""
+    entry = MockConfigEntry(
+        domain=DOMAIN,
+        data={"steam_id": "123", "key": "secret"},
+        options={"show_all_wishlist_items": True},
+    )
+    client = SteamApiClient(hass)
+    refresh_stats = RefreshStats(True)
+    hass.data[DOMAIN] = {
+        entry.entry_id: Mock(
+            coordinator=Mock(
+                async_get_client=AsyncMock(return_value=client),
+                refresh_stats=refresh_stats,
+            )
+        )
+    }
+    refresh_stats.start()
+    await client.async_get_wishlist("secret", "123", refresh_stats.current)
+    await client.async_get_wishlist("secret", "123")
+    refresh_stats.finish()
+
+    diagnostics = await async_get_config_entry_diagnostics(hass, entry)
+    assert {"show_all_wishlist_items": True} == diagnostics["options"]
+    http_cache = diagnostics["http_cache"]
+    assert 2 == http_cache["requests"]
+    assert 1 == http_cache["not_modified"]
+    assert http_cache["bytes_saved"] == http_cache["bytes_received"] > 0
+    assert {"GetWishlist": 0.5} == http_cache["hit_rates"]
+    assert http_cache["cached_bytes"] == http_cache["bytes_received"]
+    refresh_metrics = diagnostics["refresh_metrics"]
+    assert 1 == refresh_metrics["refreshes"]
+    assert (
+        http_cache["bytes_received"]
+        == (refresh_metrics["last_refresh"]["bytes_received"])
+    )
+    assert {"decode", "total"} == refresh_metrics["percentiles"].keys()
+    assert "secret" not in str(diagnostics)
@@ -1,10 +1,27 @@
 """Test the entity classes."""
 
+import copy
+from unittest.mock import Mock, patch
+
+from homeassistant.const import EntityCategory
+from homeassistant.helpers.json import json_bytes
+from homeassistant.util import dt as dt_util
+from pytest_homeassistant_custom_component.common import MockConfigEntry
+
 from custom_components.steam_wishlist import util
+from custom_components.steam_wishlist.const import DOMAIN, SORT_DISCOUNT, SORT_PRICE
 from custom_components.steam_wishlist.entities import (
     SteamGameEntity,
+    SteamRefreshMetricsEntity,
     SteamWishlistEntity,
+    UnrecordedSteamWishlistEntity,
+)
+from custom_components.steam_wishlist.metrics import STAGE_PARSE, STAGE_TOTAL
+from custom_components.steam_wishlist.sensor_manager import (
+    SteamWishlistDataUpdateCoordinator,
 )
+from custom_components.steam_wishlist.util import PLACEHOLDERS
+from tests.common import make_store_items
 
 
 def test_steamwishlistentity_games_property(manager_mock):
@@ -123,3 +140,242 @@ def test_steamgameentity_extra_state_attributes_property(manager_mock):
         "deep_link": "https://store.steampowered.com/app/1220150",
     }
     assert entity.extra_state_attributes == expected
+
+
+async def test_steamgameentity_extra_state_attributes_price_history(
+    hass, manager_mock, freezer
+):
+    """Test the price history statistics are added to the attributes."""
+    freezer.move_to("2024-12-18 18:00:00+00:00")
+    game_id = "1220150"
+    store_item = manager_mock.coordinator.data[game_id]
+    game = util.get_steam_game(game_id, store_item)
+    entity = SteamGameEntity(manager_mock, game)
+    assert "lowest_price" not in entity.extra_state_attributes
+
+    price_history = manager_mock.coordinator.price_history
+    now = dt_util.utcnow().timestamp()
+    await price_history.async_record(hass, now, {1220150: store_item})
+    assert "lowest_price" not in entity.extra_state_attributes
+    assert [1220150] == price_history.update_attributes(now)
+    attributes = entity.extra_state_attributes
+    assert 4.99 == attributes["lowest_price"]
+    assert 4.99 == attributes["highest_price"]
+    assert 4.99 == attributes["average_price"]
+    assert 100 == attributes["percent_time_on_sale"]
+    assert "2024-12-18T18:00:00+00:00" == attributes["last_on_sale"]
+
+
+def test_steamwishlistentity_parses_games_once_per_refresh(manager_mock):
+    """Test each game is only parsed once per coordinator refresh."""
+    entity = SteamWishlistEntity(manager_mock)
+    with patch(
+        "custom_components.steam_wishlist.snapshot.get_steam_game",
+        wraps=util.get_steam_game,
+    ) as get_steam_game:
+        for _ in range(3):
+            assert 1 == entity.state
+            entity.extra_state_attributes
+            entity.games
+        version = manager_mock.coordinator.snapshot.version
+        assert 2 == get_steam_game.call_count
+
+        # A refresh sets new data on the coordinator.
+        manager_mock.coordinator.data = dict(manager_mock.coordinator.data)
+        assert 1 == entity.state
+        entity.extra_state_attributes
+        assert 4 == get_steam_game.call_count
+        assert version + 1 == manager_mock.coordinator.snapshot.version
+
+
+async def test_steamgameentity_sale_starts_and_ends(hass, game_response_item):
+    """Test the entity follows a sale starting and ending across refreshes."""
+    coordinator = SteamWishlistDataUpdateCoordinator(hass, "key", "123")
+    coordinator.config_entry = MockConfigEntry(
+        domain=DOMAIN, unique_id="steam_wishlist_123"
+    )
+    coordinator.async_set_updated_data({2215430: game_response_item})
+    entity = SteamGameEntity(
+        Mock(coordinator=coordinator), coordinator.snapshot.games[2215430]
+    )
+    entity.async_write_ha_state = Mock()
+    other_entity = SteamGameEntity(
+        Mock(coordinator=coordinator), util.get_steam_game(1, {"name": "Other"})
+    )
+    other_entity.async_write_ha_state = Mock()
+    # What CoordinatorEntity.async_added_to_hass registers.
+    for game_entity in (entity, other_entity):
+        coordinator.async_add_listener(
+            game_entity._handle_coordinator_update, game_entity.coordinator_context
+        )
+    assert entity.is_on is False
+
+    # The sale starts.
+    on_sale = copy.deepcopy(game_response_item)
+    on_sale["best_purchase_option"].update(
+        {
+            "formatted_original_price": "$59.99",
+            "formatted_final_price": "$29.99",
+            "discount_pct": 50,
+        }
+    )
+    coordinator.async_set_updated_data({2215430: on_sale, 1: {"name": "Other"}})
+    assert entity.is_on is True
+    assert "$29.99" == entity.extra_state_attributes["sale_price"]
+    assert 1 == entity.async_write_ha_state.call_count
+
+    # A refresh without changes doesn't write the state again.
+    coordinator.async_set_updated_data(
+        {2215430: copy.deepcopy(on_sale), 1: {"name": "Other"}}
+    )
+    assert 1 == entity.async_write_ha_state.call_count
+
+    # The sale ends.
+    coordinator.async_set_updated_data(
+        {2215430: copy.deepcopy(game_response_item), 1: {"name": "Other"}}
+    )
+    assert entity.is_on is False
+    assert entity.extra_state_attributes["sale_price"] is None
+    assert 2 == entity.async_write_ha_state.call_count
+    # The other game never changed so it was never re-rendered.
+    assert 0 == other_entity.async_write_ha_state.call_count
+    await coordinator.async_shutdown()
+
+
+def test_steamwishlistentity_extra_state_attributes(manager_mock):
+    """Test the games in the attributes of the wishlist sensor."""
+    entity = SteamWishlistEntity(manager_mock)
+    attributes = entity.extra_state_attributes
+    assert ["$title", "Blue Fire"] == [
+        game.get("title_default", game.get("title")) for game in attributes["data"]
+    ]
+    assert ["Blue Fire"] == [game["title"] for game in attributes["on_sale"]]
+
+    manager_mock.store_all_wishlist_items = True
+    attributes = entity.extra_state_attributes
+    assert 3 == len(attributes["data"])
+    assert 1 == len(attributes["on_sale"])
+
+
+def test_steamwishlistentity_attributes_stay_within_budget(
+    manager_mock, game_on_sale_response_item
+):
+    """Test the serialized attributes stay under the budget for any wishlist."""
+    manager_mock.store_all_wishlist_items = True
+    manager_mock.attribute_budget = 16000
+    for count in (10, 1000, 10000):
+        items = make_store_items(game_on_sale_response_item, count)
+        manager_mock.coordinator.data = {item["id"]: item for item in items}
+        entity = SteamWishlistEntity(manager_mock)
+        size = len(json_bytes(entity.extra_state_attributes))
+        assert size <= 16000
+        assert count == entity.state
+
+    # 10 small games fit in the budget.
+    manager_mock.coordinator.data = {item["id"]: item for item in items[:10]}
+    assert 11 == len(entity.extra_state_attributes["data"])
+
+
+def test_steamwishlistentity_attribute_pages(manager_mock, game_on_sale_response_item):
+    """Test games are split across the wishlist sensor pages."""
+    manager_mock.attribute_budget = 16000
+    manager_mock.attribute_pages = 3
+    manager_mock.coordinator.steam_id = "12345"
+    items = make_store_items(game_on_sale_response_item, 1000)
+    manager_mock.coordinator.data = {item["id"]: item for item in items}
+    entities = [SteamWishlistEntity(manager_mock, page) for page in (1, 2, 3, 4)]
+
+    titles = []
+    for entity in entities[:3]:
+        attributes = entity.extra_state_attributes
+        assert len(json_bytes(attributes)) <= 16000
+        titles.extend(game["title"] for game in attributes["data"][1:])
+    # Each page continues where the last one ended.
+    assert [item["name"] for item in items[: len(titles)]] == titles
+    assert 1000 == entities[0].state
+    assert len(entities[1].extra_state_attributes["on_sale"]) == entities[1].state
+    # Only 3 pages are configured.
+    assert [PLACEHOLDERS] == entities[3].extra_state_attributes["data"]
+    assert "steam_wishlist_12345_page_2" == entities[1].unique_id
+
+
+def test_steamwishlistentity_top_games_by_discount(
+    manager_mock, game_on_sale_response_item
+):
+    """Test only the games with the biggest discounts are in the attributes."""
+    manager_mock.max_wishlist_items = 2
+    items = make_store_items(game_on_sale_response_item, 5)
+    for discount, item in zip((10, 50, 20, 90, 50), items):
+        item["best_purchase_option"]["discount_pct"] = discount
+    manager_mock.coordinator.data = {item["id"]: item for item in items}
+    entity = SteamWishlistEntity(manager_mock)
+    assert [90, 50] == [
+        game["percent_off"] for game in entity.extra_state_attributes["data"][1:]
+    ]
+    assert "Game 3" == entity.extra_state_attributes["data"][1]["title"]
+    assert 5 == entity.state
+
+
+def test_unrecordedsteamwishlistentity_unrecorded_attributes(manager_mock):
+    """Test the game attributes can be excluded from the recorder."""
+    entity = UnrecordedSteamWishlistEntity(manager_mock)
+    assert {"data", "on_sale"} == entity._unrecorded_attributes
+    assert frozenset() == SteamWishlistEntity(manager_mock)._unrecorded_attributes
+
+
+def test_steamwishlistentity_sort_order(manager_mock, game_on_sale_response_item):
+    """Test the games in the attributes can be sorted by discount or price."""
+    items = make_store_items(game_on_sale_response_item, 4)
+    for discount, price, item in zip((10, 50, 0, 20), (900, 500, 300, 800), items):
+        item["best_purchase_option"]["discount_pct"] = discount
+        item["best_purchase_option"]["final_price_in_cents"] = str(price)
+    manager_mock.coordinator.data = {item["id"]: item for item in items}
+    manager_mock.store_all_wishlist_items = True
+    entity = SteamWishlistEntity(manager_mock)
+
+    def titles() -> list[str]:
+        return [game["title"] for game in entity.extra_state_attributes["data"][1:]]
+
+    assert ["Game 0", "Game 1", "Game 2", "Game 3"] == titles()
+    manager_mock.sort_order = SORT_DISCOUNT
+    assert ["Game 1", "Game 3", "Game 0", "Game 2"] == titles()
+    manager_mock.sort_order = SORT_PRICE
+    assert ["Game 2", "Game 1", "Game 3", "Game 0"] == titles()
+    manager_mock.store_all_wishlist_items = False
+    assert ["Game 1", "Game 3", "Game 0"] == titles()
+    manager_mock.max_wishlist_items = 2
+    assert ["Game 1", "Game 3"] == titles()
+    assert 3 == entity.state
+    assert ["Game 1", "Game 3", "Game 0"] == [game.title for game in entity.on_sale]
+
+
+def test_steamrefreshmetricsentity(manager_mock):
+    """Test the diagnostic sensor shows the last refresh and the percentiles."""
+    stats = manager_mock.coordinator.refresh_stats
+    manager_mock.coordinator.steam_id = "123"
+    entity = SteamRefreshMetricsEntity(manager_mock)
+    assert "steam_wishlist_123_refresh_time" == entity.unique_id
+    assert EntityCategory.DIAGNOSTIC == entity.entity_category
+    assert entity.state is None
+    assert 0 == entity.extra_state_attributes["refreshes"]
+
+    stats.enabled = True
+    refresh = stats.start()
+    refresh.add_time(STAGE_PARSE, 0.25)
+    refresh.add_batch(100, 0.5, True)
+    refresh.bytes_received = 2048
+    refresh.items_parsed = 100
+    refresh.entities_written = 3
+    stats.finish()
+    assert round(refresh.stages[STAGE_TOTAL], 3) == entity.state
+    attributes = entity.extra_state_attributes
+    assert {"p50": 0.25, "p90": 0.25, "p99": 0.25} == (
+        attributes["percentiles"][STAGE_PARSE]
+    )
+    assert {
+        "refreshes": 1,
+        "batches": 1,
+        "bytes_received": 2048,
+        "items_parsed": 100,
+        "entities_written": 3,
+    } == {key: value for key, value in attributes.items() if key != "percentiles"}
@@ -0,0 +1,95 @@
+"""Formatting tests."""
+
+import sys
+from unittest.mock import patch
+
+import pytest
+
+from custom_components.steam_wishlist import formatting, util
+from custom_components.steam_wishlist.formatting import (
+    FORMAT_CACHE_SIZE,
+    format_cents,
+    format_price_info,
+    format_rating,
+    strikethrough,
+)
+from custom_components.steam_wishlist.util import get_steam_game
+from tests.common import make_store_items
+
+
+@pytest.mark.parametrize(
+    ("cents", "currency", "expected"),
+    [
+        (1999, "USD", "$19.99"),
+        (123456, "USD", "$1,234.56"),
+        (1999, "EUR", "19,99€"),
+        (123456, "EUR", "1.234,56€"),
+        (1999, "CAD", "CDN$ 19.99"),
+        (198000, "JPY", "¥ 1,980"),
+        (-500, "GBP", "-£5.00"),
+        (1999, "XYZ", "19.99 XYZ"),
+    ],
+)
+def test_format_cents(cents, currency, expected) -> None:
+    """Verify prices in cents are written the way Steam does."""
+    assert expected == format_cents(cents, currency)
+
+
+def test_format_price_info() -> None:
+    """Verify the rendered price descriptions."""
+    assert "$̶1̶9̶.̶9̶9" == strikethrough("$19.99")
+    assert "$̶1̶9̶.̶9̶9 $4.99 (75% off)&nbsp;&nbsp;🎫" == format_price_info(
+        "$19.99", "$4.99", 75
+    )
+    assert "Price:&nbsp;&nbsp;$19.99" == format_price_info("$19.99", None, 0)
+    assert "Price:&nbsp;&nbsp;TBD" == format_price_info(None, None, 0)
+    assert "Reviews:&nbsp;&nbsp;84% (Very Positive)" == format_rating(
+        84, "Very Positive"
+    )
+
+
+def test_formatting_caches_are_bounded() -> None:
+    """Verify each renderer keeps at most `FORMAT_CACHE_SIZE` strings."""
+    format_cents.cache_clear()
+    for cents in range(FORMAT_CACHE_SIZE + 10):
+        format_cents(cents, "USD")
+    assert FORMAT_CACHE_SIZE == format_cents.cache_info().currsize
+    for renderer in (strikethrough, format_price_info, format_rating):
+        assert FORMAT_CACHE_SIZE == renderer.cache_info().maxsize
+
+
+def test_get_steam_game_prices_from_cents(game_on_sale_response_item) -> None:
+    """Verify prices Steam didn't format are written from the prices in cents."""
+    pricing = game_on_sale_response_item["best_purchase_option"]
+    del pricing["formatted_final_price"]
+    del pricing["formatted_original_price"]
+    game = get_steam_game(1220150, game_on_sale_response_item, "EUR")
+    assert "19,99€" == game.normal_price
+    assert "4,99€" == game.sale_price
+    assert 499 == game.final_price
+    # Without a currency the price is unknown.
+    assert get_steam_game(1220150, game_on_sale_response_item).normal_price is None
+
+
+def test_get_steam_game_formatting_allocations(game_on_sale_response_item) -> None:
+    """Test memoization shares the formatted strings between games."""
+    items = make_store_items(game_on_sale_response_item, 2000)
+    unmemoized = {
+        name: getattr(formatting, name).__wrapped__
+        for name in ("format_price_info", "format_rating")
+    }
+
+    def parse() -> int:
+        blocks = sys.getallocatedblocks()
+        records = [get_steam_game(item["id"], item) for item in items]
+        assert len(records) == len(items)
+        return sys.getallocatedblocks() - blocks
+
+    parse()
+    memoized_blocks = parse()
+    with patch.multiple(util, **unmemoized):
+        unmemoized_blocks = parse()
+
+    per_game = (unmemoized_blocks - memoized_blocks) / len(items)
+    # The price and rating strings are shared instead of kept per game.
+    assert per_game >= 1.5
@@ -0,0 +1,104 @@
+"""Import time tests."""
+
+import importlib
+import os
+import subprocess
+import sys
+from unittest.mock import AsyncMock, patch
+
+from custom_components.steam_wishlist import sensor_manager
+from custom_components.steam_wishlist.client import DATA_CLIENT, SteamApiClient
+from tests.common import make_store_items
+
+PACKAGE = "custom_components.steam_wishlist"
+# What Home Assistant has imported by the time it sets up the integration.
+PRELOADED = (
+    "homeassistant.config_entries",
+    "homeassistant.components.binary_sensor",
+    "homeassistant.components.sensor",
+    "homeassistant.helpers.aiohttp_client",
+    "homeassistant.helpers.entity_registry",
+    "homeassistant.helpers.storage",
+    "homeassistant.helpers.update_coordinator",
+)
+# Only imported once the integration fetches, a config flow is started or
+# diagnostics are downloaded.
+DEFERRED = (f"{PACKAGE}.client", f"{PACKAGE}.config_flow", f"{PACKAGE}.diagnostics")
+
+
+def get_imported_modules(*modules: str) -> set[str]:
+    """Import `modules` in a new interpreter after the preloaded ones.
+
+    Returns every module `-X importtime` reports as imported along with
+    `modules`.
+    """
+    code = "\n".join(
+        [
+            *(f"import {module}" for module in PRELOADED),
+            "import sys",
+            "sys.stderr.write('---\\n')",
+            *(f"import {module}" for module in modules),
+        ]
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        check=True,
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        text=True,
+    )
+    return {
+        line.rsplit("|", 1)[1].strip()
+        for line in result.stderr.split("---\n", 1)[1].splitlines()
+        if line.startswith("import time:")
+    }
+
+
+def test_setup_imports():
+    """Test setting up the integration doesn't import the deferred modules."""
+    imported = get_imported_modules(
+        PACKAGE, f"{PACKAGE}.binary_sensor", f"{PACKAGE}.sensor"
+    )
+    assert PACKAGE in imported
+    assert f"{PACKAGE}.sensor_manager" in imported
+    assert not set(DEFERRED) & imported
+
+
+def test_deferred_imports():
+    """Test the config flow and diagnostics don't import the fetching code."""
+    assert f"{PACKAGE}.client" not in get_imported_modules(f"{PACKAGE}.config_flow")
+    assert f"{PACKAGE}.client" not in get_imported_modules(f"{PACKAGE}.diagnostics")
+
+
+async def test_coordinator_gets_client_on_first_refresh(
+    hass, fake_steam_server, game_on_sale_response_item
+):
+    """Test the shared client is only looked up once the coordinator fetches."""
+    fake_steam_server.set_items(make_store_items(game_on_sale_response_item, 10))
+    hass.data[DATA_CLIENT] = SteamApiClient(hass, batch_window=0)
+    coordinator = sensor_manager.SteamWishlistDataUpdateCoordinator(hass, "key", "1")
+    assert coordinator._client is None
+    await coordinator.async_refresh()
+    assert 10 == len(coordinator.data)
+    assert hass.data[DATA_CLIENT] is coordinator.client
+    await coordinator.async_shutdown()
+
+
+async def test_coordinator_imports_client_in_executor(hass):
+    """Test getting the client before the first refresh imports it off the loop."""
+    module = sys.modules[sensor_manager.CLIENT_MODULE]
+    coordinator = sensor_manager.SteamWishlistDataUpdateCoordinator(hass, "key", "1")
+    with (
+        patch.dict(sys.modules),
+        patch.object(
+            hass,
+            "async_add_import_executor_job",
+            AsyncMock(side_effect=lambda _, name: sys.modules.update({name: module})),
+        ) as import_job,
+    ):
+        del sys.modules[sensor_manager.CLIENT_MODULE]
+        client = await coordinator.async_get_client()
+    import_job.assert_awaited_once_with(
+        importlib.import_module, sensor_manager.CLIENT_MODULE
+    )
+    assert client is coordinator.client
@@ -0,0 +1,92 @@
+"""Refresh metrics tests."""
+
+from unittest.mock import Mock, patch
+
+import pytest
+
+from custom_components.steam_wishlist import metrics
+from custom_components.steam_wishlist.metrics import (
+    STAGE_BATCH,
+    STAGE_PARSE,
+    STAGE_TOTAL,
+    RefreshMetrics,
+    RefreshStats,
+    get_percentile,
+    time_stage,
+)
+
+
+def test_refresh_stats_disabled():
+    """Test nothing is recorded or timed while the metrics are disabled."""
+    stats = RefreshStats()
+    assert stats.start() is None
+    assert time_stage(stats.current, STAGE_PARSE) is time_stage(None, STAGE_PARSE)
+    listener = Mock()
+    stats.async_add_listener(listener)
+    stats.finish()
+    listener.assert_not_called()
+    assert stats.last is None
+    assert {
+        "enabled": False,
+        "window": metrics.METRICS_WINDOW,
+        "refreshes": 0,
+        "percentiles": {},
+        "last_refresh": None,
+    } == stats.as_dict()
+
+
+def test_refresh_stats_records_refreshes():
+    """Test each refresh is recorded, keeping the last ones only."""
+    stats = RefreshStats(True, window=3)
+    listener = Mock()
+    remove_listener = stats.async_add_listener(listener)
+    for _ in range(5):
+        refresh = stats.start()
+        with time_stage(refresh, STAGE_PARSE):
+            pass
+        with time_stage(refresh, STAGE_PARSE):
+            pass
+        refresh.add_batch(100, 0.5, True)
+        refresh.bytes_received += 1024
+        stats.finish()
+    assert 5 == listener.call_count
+    assert 3 == len(stats.history)
+    last = stats.last
+    assert {STAGE_PARSE, STAGE_TOTAL} == last.stages.keys()
+    assert last.stages[STAGE_PARSE] <= last.stages[STAGE_TOTAL]
+    assert [{"apps": 100, "time": 0.5, "success": True}] == (
+        stats.as_dict()["last_refresh"]["batches"]
+    )
+    assert 1024 == last.bytes_received
+
+    remove_listener()
+    stats.start()
+    stats.finish()
+    assert 5 == listener.call_count
+
+
+def test_refresh_metrics_measure_failing_stage():
+    """Test the time of a stage that raised is still recorded."""
+    refresh = RefreshMetrics()
+    with (
+        patch.object(metrics.time, "perf_counter", side_effect=[1.0, 3.5]),
+        pytest.raises(ValueError),
+        time_stage(refresh, STAGE_PARSE),
+    ):
+        raise ValueError
+    assert {STAGE_PARSE: 2.5} == refresh.stages
+
+
+def test_get_percentiles():
+    """Test the nearest-rank percentiles of each stage and of the batches."""
+    stats = RefreshStats(True, window=100)
+    for seconds in range(1, 101):
+        refresh = stats.start()
+        refresh.add_time(STAGE_PARSE, seconds / 100)
+        refresh.add_batch(100, seconds, True)
+        stats.finish()
+    percentiles = stats.get_percentiles()
+    assert {"p50": 0.5, "p90": 0.9, "p99": 0.99} == percentiles[STAGE_PARSE]
+    assert {"p50": 50, "p90": 90, "p99": 99} == percentiles[STAGE_BATCH]
+    assert 1 == get_percentile([1], 99)
+    assert 1 == get_percentile([1, 2], 1)
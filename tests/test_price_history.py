@@ -0,0 +1,170 @@
+"""Price history tests."""
+
+import os
+from unittest.mock import patch
+
+import pytest
+
+from custom_components.steam_wishlist.price_history import (
+    BLOCK_HEADER,
+    FILE_HEADER,
+    MAGIC,
+    SAMPLE_SIZE,
+    UNSUPPORTED_SUFFIX,
+    VERSION,
+    AppPriceHistory,
+    PriceHistory,
+    get_price_sample,
+)
+
+HOUR = 3600.0
+
+
+def store_item(final_price: int, original_price: int, discount: int) -> dict:
+    return {
+        "best_purchase_option": {
+            "final_price_in_cents": str(final_price),
+            "original_price_in_cents": str(original_price),
+            "discount_pct": discount,
+        }
+    }
+
+
+def test_get_price_sample(game_on_sale_response_item, game_response_item):
+    """Test the prices are read from the cents fields of a store item."""
+    assert (499, 1999, 75) == get_price_sample(game_on_sale_response_item)
+    assert (5999, 5999, 0) == get_price_sample(game_response_item)
+    assert get_price_sample({"id": 1}) is None
+
+
+async def test_price_history_record_and_load(hass, tmp_path):
+    """Test only price changes are appended and read back after a restart."""
+    path = str(tmp_path / "prices")
+    history = PriceHistory(path)
+    full, sale = store_item(1999, 1999, 0), store_item(499, 1999, 75)
+
+    assert 2 == await history.async_record(hass, 0, {1: full, 2: full})
+    assert 0 == await history.async_record(hass, HOUR, {1: full, 2: full, 3: {"id": 3}})
+    assert 1 == await history.async_record(hass, 2 * HOUR, {1: sale, 2: full})
+    assert 1 == await history.async_record(hass, 3 * HOUR, {1: full, 2: full})
+    assert FILE_HEADER.size + 3 * BLOCK_HEADER.size + 4 * SAMPLE_SIZE == (
+        os.path.getsize(path)
+    )
+
+    loaded = PriceHistory(path)
+    await loaded.async_load(hass)
+    assert history.apps.keys() == loaded.apps.keys()
+    app = loaded.get(1)
+    assert list(app.times) == [0, 2 * HOUR, 3 * HOUR]
+    assert app.get_sample(-1) is None
+    assert (1999, 1999, 0) == app.get_sample(HOUR)
+    assert (499, 1999, 75) == app.get_sample(2 * HOUR)
+    assert (1999, 1999, 0) == app.get_sample(10 * HOUR)
+    assert loaded.get(3) is None
+
+    # Appending continues after the loaded samples.
+    assert 1 == await loaded.async_record(hass, 4 * HOUR, {1: sale})
+    assert 4 == len(loaded.get(1).times)
+
+
+def test_app_price_history_statistics():
+    """Test the statistics of a game weigh each price by how long it held."""
+    app = AppPriceHistory()
+    app.append(0, (2000, 2000, 0))
+    assert 2000 == app.get_average_price(0)
+    app.append(3 * HOUR, (1000, 2000, 50))
+    app.append(4 * HOUR, (500, 2000, 75))
+    app.append(5 * HOUR, (2000, 2000, 0))
+
+    assert 500 == app.min_price
+    assert 2000 == app.max_price
+    # 6 hours at $20, 1 at $10 and 1 at $5.
+    assert 1687.5 == pytest.approx(app.get_average_price(8 * HOUR))
+    assert 0.25 == app.get_time_on_sale(8 * HOUR)
+    # A sale that deepens is still the same sale.
+    assert 3 * HOUR == app.last_sale
+    assert {
+        "lowest_price": 5.0,
+        "highest_price": 20.0,
+        "average_price": 16.88,
+        "percent_time_on_sale": 25.0,
+        "last_on_sale": "1970-01-01T03:00:00+00:00",
+    } == app.as_attributes(8 * HOUR)
+
+
+async def test_price_history_drops_damaged_end(hass, tmp_path, caplog):
+    """Test a block that was cut short is dropped."""
+    path = str(tmp_path / "prices")
+    history = PriceHistory(path)
+    await history.async_record(hass, 0, {1: store_item(1999, 1999, 0)})
+    size = os.path.getsize(path)
+    await history.async_record(hass, HOUR, {1: store_item(499, 1999, 75)})
+    with open(path, "r+b") as file:
+        file.truncate(size + BLOCK_HEADER.size + 2)
+
+    loaded = PriceHistory(path)
+    await loaded.async_load(hass)
+    assert "damaged end" in caplog.text
+    assert size == os.path.getsize(path)
+    assert 1 == len(loaded.get(1).times)
+    assert 1 == await loaded.async_record(
+        hass, 2 * HOUR, {1: store_item(499, 1999, 75)}
+    )
+    reloaded = PriceHistory(path)
+    await reloaded.async_load(hass)
+    assert [0, 2 * HOUR] == list(reloaded.get(1).times)
+
+
+@pytest.mark.parametrize(
+    "header", [FILE_HEADER.pack(MAGIC, VERSION + 1), b"not a price history"]
+)
+async def test_price_history_moves_unsupported_file_aside(
+    hass, tmp_path, caplog, header
+):
+    """Test a file of another format is kept and a new history started."""
+    path = str(tmp_path / "prices")
+    with open(path, "wb") as file:
+        file.write(header + b"samples")
+
+    history = PriceHistory(path)
+    await history.async_load(hass)
+    assert "unsupported format" in caplog.text
+    assert {} == history.apps
+    with open(f"{path}{UNSUPPORTED_SUFFIX}", "rb") as file:
+        assert header + b"samples" == file.read()
+
+    assert 1 == await history.async_record(hass, 0, {1: store_item(1999, 1999, 0)})
+    reloaded = PriceHistory(path)
+    await reloaded.async_load(hass)
+    assert [0] == list(reloaded.get(1).times)
+
+
+async def test_price_history_index_changes_after_write(hass, tmp_path):
+    """Test the index only takes the samples the executor job wrote."""
+    history = PriceHistory(str(tmp_path / "missing" / "prices"))
+    assert 0 == await history.async_record(hass, 0, {1: store_item(1999, 1999, 0)})
+    assert {} == history.apps
+
+    history.path = str(tmp_path / "prices")
+    write = history.write
+    indexed_during_write = []
+
+    def write_samples(*args):
+        indexed_during_write.append(history.get(1) is not None)
+        return write(*args)
+
+    with patch.object(history, "write", write_samples):
+        assert 1 == await history.async_record(hass, 0, {1: store_item(1999, 1999, 0)})
+    assert [False] == indexed_during_write
+    assert [0] == list(history.get(1).times)
+
+
+async def test_price_history_remove(hass, tmp_path):
+    """Test removing the history deletes the file."""
+    path = str(tmp_path / "prices")
+    history = PriceHistory(path)
+    await history.async_record(hass, 0, {1: store_item(1999, 1999, 0)})
+    await history.async_remove(hass)
+    assert not os.path.exists(path)
+    assert history.get(1) is None
+    await history.async_remove(hass)
@@ -0,0 +1,73 @@
+"""Scheduler tests."""
+
+from datetime import datetime, timedelta
+
+from homeassistant.util import dt as dt_util
+import pytest
+
+from custom_components.steam_wishlist.const import (
+    MAX_SCAN_INTERVAL,
+    MIN_SCAN_INTERVAL,
+)
+from custom_components.steam_wishlist.scheduler import (
+    TRANSITION_DELAY,
+    get_last_sale_start,
+    get_next_sale_start,
+    get_refresh_interval,
+)
+
+
+def utc(value: str) -> datetime:
+    return datetime.fromisoformat(value).replace(tzinfo=dt_util.UTC)
+
+
+@pytest.mark.parametrize(
+    ("now", "last", "next_"),
+    [
+        # 10AM PST is 18:00 UTC.
+        ("2024-12-18 12:00", "2024-12-17 18:00", "2024-12-18 18:00"),
+        ("2024-12-18 18:00", "2024-12-18 18:00", "2024-12-19 18:00"),
+        # 10AM PDT is 17:00 UTC.
+        ("2024-07-01 17:30", "2024-07-01 17:00", "2024-07-02 17:00"),
+        # Daylight saving time starts on 2024-03-10.
+        ("2024-03-09 20:00", "2024-03-09 18:00", "2024-03-10 17:00"),
+    ],
+)
+def test_sale_start(now, last, next_) -> None:
+    """Test the usual sale start times around `now`."""
+    assert utc(last) == get_last_sale_start(utc(now))
+    assert utc(next_) == get_next_sale_start(utc(now))
+
+
+def test_get_refresh_interval_discount_end(game_on_sale_response_item) -> None:
+    """Test the next refresh is just after the earliest discount end."""
+    now = utc("2024-12-18 15:00")
+    game_on_sale_response_item["best_purchase_option"]["active_discounts"][0][
+        "discount_end_date"
+    ] = (now + timedelta(hours=1)).timestamp()
+    assert timedelta(hours=1) + TRANSITION_DELAY == get_refresh_interval(
+        now, [game_on_sale_response_item]
+    )
+
+
+def test_get_refresh_interval_sale_start(game_response_item) -> None:
+    """Test the next refresh is just after the next sale start."""
+    now = utc("2024-12-18 16:00")
+    assert timedelta(hours=2) + TRANSITION_DELAY == get_refresh_interval(
+        now, [game_response_item]
+    )
+
+
+@pytest.mark.parametrize(
+    ("now", "expected"),
+    [
+        # Right before the sale start.
+        ("2024-12-18 17:59:30", MIN_SCAN_INTERVAL),
+        # Overnight nothing is expected to change for a long time.
+        ("2024-12-18 06:00", MAX_SCAN_INTERVAL),
+    ],
+)
+def test_get_refresh_interval_bounds(now, expected, game_on_sale_response_item) -> None:
+    """Test the refresh interval stays within the min and max interval."""
+    # This discount ended before `now`.
+    assert expected == get_refresh_interval(utc(now), [game_on_sale_response_item])
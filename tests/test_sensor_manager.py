@@ -1,15 +1,38 @@
 """Tests for the SensorManager class."""
+import asyncio
+import copy
+from datetime import timedelta
+import os
 from typing import Dict
-from unittest.mock import AsyncMock, Mock, call
+from unittest.mock import AsyncMock, Mock, call, patch
 
+from homeassistant.const import EVENT_HOMEASSISTANT_FINAL_WRITE
+from homeassistant.helpers import entity_registry as er
+from homeassistant.util import dt as dt_util
+import pytest
+from pytest_homeassistant_custom_component.common import (
+    MockConfigEntry,
+    MockEntityPlatform,
+    async_fire_time_changed,
+)
+
+from custom_components import steam_wishlist
 from custom_components.steam_wishlist import sensor_manager
+from custom_components.steam_wishlist.client import DATA_CLIENT, SteamApiClient
+from custom_components.steam_wishlist.const import (
+    DOMAIN,
+    MAX_SCAN_INTERVAL,
+    MIN_SCAN_INTERVAL,
+    SCAN_INTERVAL,
+)
 from custom_components.steam_wishlist.entities import (
     SteamGameEntity,
     SteamWishlistEntity,
 )
 from custom_components.steam_wishlist.sensor_manager import SteamEntity
 from custom_components.steam_wishlist.types import SteamGame
-from custom_components.steam_wishlist.util import get_steam_game
+from custom_components.steam_wishlist.util import get_discount_end, get_steam_game
+from tests.common import make_store_items
 
 
 async def test_async_remove_games(manager_mock):
@@ -113,3 +136,777 @@ async def test_sensormanager_async_update_items_success(hass, coordinator_mock):
     assert expected_add_entities_calls == mock_async_add_entities.call_args_list
     # Verify our task to remove games was created.
     assert 1 == len(manager.hass._pending_tasks)
+
+
+async def test_coordinator_fetch_data_batches_in_wishlist_order(
+    hass, fake_steam_server, game_on_sale_response_item
+):
+    """Test all batches are fetched and merged in wishlist order."""
+    items = make_store_items(game_on_sale_response_item, 250)
+    fake_steam_server.set_items(items)
+    coordinator = sensor_manager.SteamWishlistDataUpdateCoordinator(
+        hass, "key", "123", client=SteamApiClient(hass, max_concurrent_requests=2)
+    )
+    data = await coordinator._async_fetch_data()
+    assert [item["id"] for item in items] == list(data)
+    # 1 wishlist request and 3 batches of at most 100 app ids.
+    assert 1 == fake_steam_server.requests["/IWishlistService/GetWishlist/v1"]
+    assert 3 == fake_steam_server.requests["/IStoreBrowseService/GetItems/v1"]
+    assert fake_steam_server.max_in_flight <= 2
+
+
+async def test_coordinator_fetch_data_concurrency_limit(
+    hass, fake_steam_server, game_on_sale_response_item
+):
+    """Test batches are sent concurrently up to the in-flight limit."""
+    fake_steam_server.set_items(make_store_items(game_on_sale_response_item, 800))
+
+    for max_concurrent_requests in (1, 2, 8):
+        fake_steam_server.max_in_flight = 0
+        fake_steam_server.hold = asyncio.Event()
+        # Don't wait for other entries' app ids to send the last batch.
+        client = SteamApiClient(
+            hass, max_concurrent_requests=max_concurrent_requests, batch_window=0
+        )
+        coordinator = sensor_manager.SteamWishlistDataUpdateCoordinator(
+            hass, "key", "123", client=client
+        )
+        fetch = hass.async_create_task(coordinator._async_fetch_data())
+        # The held requests pile up to the limit, however slow the machine is.
+        while fake_steam_server.in_flight < max_concurrent_requests:
+            await asyncio.sleep(0.01)
+        fake_steam_server.hold.set()
+        assert 800 == len(await fetch)
+        assert max_concurrent_requests == fake_steam_server.max_in_flight
+
+
+async def test_sensormanager_refresh_parses_each_game_once(
+    hass, game_on_sale_response_item
+):
+    """Benchmark the number of `get_steam_game` calls per refresh."""
+    manager = sensor_manager.SensorManager(hass, True, "key", "123")
+    manager.coordinator.config_entry = MockConfigEntry(
+        domain=DOMAIN, unique_id="steam_wishlist_123"
+    )
+    manager._component_add_entities = {"binary_sensor": Mock(), "sensor": Mock()}
+    items = make_store_items(game_on_sale_response_item, 500)
+    with (
+        patch("custom_components.steam_wishlist.sensor_manager.async_remove_games"),
+        patch(
+            "custom_components.steam_wishlist.snapshot.get_steam_game",
+            wraps=get_steam_game,
+        ) as mock_get_steam_game,
+    ):
+        for refresh in range(1, 3):
+            manager.coordinator.data = {item["id"]: item for item in items}
+            manager.async_update_items()
+            wishlist_entity = manager.current_wishlist[sensor_manager.WISHLIST_ID]
+            assert 500 == wishlist_entity.state
+            wishlist_entity.extra_state_attributes
+            assert 500 * refresh == mock_get_steam_game.call_count
+
+
+async def test_coordinator_only_updates_listeners_of_changed_games(
+    hass, game_on_sale_response_item
+):
+    """Test only entities of games whose fields changed are updated."""
+    coordinator = sensor_manager.SteamWishlistDataUpdateCoordinator(hass, "key", "123")
+    items = make_store_items(game_on_sale_response_item, 2000)
+    wishlist_listener = Mock()
+    game_listeners = {item["id"]: Mock() for item in items}
+    coordinator.async_add_listener(wishlist_listener)
+    for app_id, listener in game_listeners.items():
+        coordinator.async_add_listener(listener, app_id)
+
+    coordinator.async_set_updated_data({item["id"]: item for item in items})
+    # The first update goes to every listener.
+    assert 1 == wishlist_listener.call_count
+    assert all(1 == listener.call_count for listener in game_listeners.values())
+
+    # Nothing changed, nothing is updated.
+    items = copy.deepcopy(items)
+    coordinator.async_set_updated_data({item["id"]: item for item in items})
+    assert 1 == wishlist_listener.call_count
+    assert 2000 == sum(listener.call_count for listener in game_listeners.values())
+
+    # The price of 3 games moved.
+    items = copy.deepcopy(items)
+    for item in items[:3]:
+        item["best_purchase_option"]["formatted_final_price"] = "$1.99"
+    coordinator.async_set_updated_data({item["id"]: item for item in items})
+    assert 2 == wishlist_listener.call_count
+    assert 2003 == sum(listener.call_count for listener in game_listeners.values())
+    for item in items[:3]:
+        assert 2 == game_listeners[item["id"]].call_count
+    assert {
+        item["id"]: frozenset({"price"}) for item in items[:3]
+    } == coordinator.snapshot.diff.changed
+
+    # A failed refresh makes every entity unavailable.
+    coordinator.last_update_success = False
+    coordinator.async_update_listeners()
+    assert 3 == wishlist_listener.call_count
+    assert 4003 == sum(listener.call_count for listener in game_listeners.values())
+    await coordinator.async_shutdown()
+
+
+async def test_async_remove_games_bulk(hass, manager_mock):
+    """Test removed games are removed concurrently with one registry lookup."""
+    in_flight = 0
+    max_in_flight = 0
+
+    async def async_remove():
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0)
+        in_flight -= 1
+
+    wishlist: Dict[int, SteamEntity] = {}
+    for app_id in range(300):
+        entity = SteamGameEntity(
+            manager_mock, get_steam_game(app_id, {"name": f"Game {app_id}"})
+        )
+        entity.async_remove = AsyncMock(side_effect=async_remove)
+        wishlist[app_id] = entity
+    wishlist[sensor_manager.WISHLIST_ID] = SteamWishlistEntity(manager_mock)
+    manager_mock.coordinator.data = {app_id: {} for app_id in range(100)}
+
+    with patch.object(
+        sensor_manager.er, "async_get", wraps=sensor_manager.er.async_get
+    ) as mock_async_get:
+        await sensor_manager.async_remove_games(wishlist, manager_mock.coordinator)
+
+    assert 1 == mock_async_get.call_count
+    assert 200 == max_in_flight
+    assert {sensor_manager.WISHLIST_ID, *range(100)} == set(wishlist)
+
+
+async def test_sensormanager_async_update_items_nothing_removed(
+    hass, game_on_sale_response_item
+):
+    """Test no removal task is scheduled when no game was removed."""
+    manager = sensor_manager.SensorManager(hass, False, "key", "123")
+    manager.coordinator.config_entry = MockConfigEntry(
+        domain=DOMAIN, unique_id="steam_wishlist_123"
+    )
+    manager._component_add_entities = {"binary_sensor": Mock(), "sensor": Mock()}
+    items = make_store_items(game_on_sale_response_item, 3)
+    with patch.object(sensor_manager, "async_remove_games") as mock_remove_games:
+        manager.coordinator.data = {item["id"]: item for item in items}
+        manager.async_update_items()
+        assert mock_remove_games.called is False
+
+        manager.coordinator.data = {item["id"]: item for item in items[1:]}
+        manager.async_update_items()
+        mock_remove_games.assert_called_once_with(
+            manager.current_wishlist, manager.coordinator, {items[0]["id"]}
+        )
+
+
+async def test_coordinator_delta_refresh(
+    hass, freezer, fake_steam_server, game_on_sale_response_item
+):
+    """Test only new, stale or soon to change store items are requested."""
+    freezer.move_to("2024-12-01 12:00:00+00:00")
+    items = make_store_items(game_on_sale_response_item, 1000)
+    # The discount of the first game ends in 5 minutes.
+    items[0]["best_purchase_option"]["active_discounts"][0]["discount_end_date"] = (
+        dt_util.utcnow().timestamp() + 300
+    )
+    fake_steam_server.set_items(items)
+    # The loop clock is frozen too, so don't wait for other entries' app ids.
+    coordinator = sensor_manager.SteamWishlistDataUpdateCoordinator(
+        hass,
+        "key",
+        "123",
+        item_ttl=timedelta(hours=6),
+        client=SteamApiClient(hass, batch_window=0),
+    )
+
+    async def async_refresh() -> list[int]:
+        fake_steam_server.requested_ids.clear()
+        coordinator.async_set_updated_data(await coordinator._async_fetch_data())
+        return fake_steam_server.requested_ids
+
+    assert 1000 == len(await async_refresh())
+    assert 10 == fake_steam_server.requests["/IStoreBrowseService/GetItems/v1"]
+
+    # Only the game whose discount is about to end is requested again, and
+    # once more after the discount ended.
+    freezer.tick(timedelta(minutes=1))
+    assert [items[0]["id"]] == await async_refresh()
+    freezer.tick(timedelta(hours=1))
+    assert [items[0]["id"]] == await async_refresh()
+    assert [] == await async_refresh()
+    assert 12 == fake_steam_server.requests["/IStoreBrowseService/GetItems/v1"]
+
+    # New games and games added to the wishlist again are requested.
+    new_items = make_store_items(game_on_sale_response_item, 1005)[1000:]
+    fake_steam_server.set_items(items + new_items)
+    fake_steam_server.date_added[items[1]["id"]] = 1800000000
+    requested_ids = await async_refresh()
+    assert {items[1]["id"], *[item["id"] for item in new_items]} == set(requested_ids)
+    assert 1005 == len(coordinator.data)
+    assert [item["id"] for item in items + new_items] == list(coordinator.data)
+
+    # Removed games are dropped without any store requests.
+    fake_steam_server.set_items(items[:500])
+    assert [] == await async_refresh()
+    assert 500 == len(coordinator.data)
+
+    # Everything is requested again once the ttl passed.
+    freezer.tick(timedelta(hours=6))
+    assert 500 == len(await async_refresh())
+    await coordinator.async_shutdown()
+
+
+async def test_sensormanager_startup_from_stored_data(
+    hass, hass_storage, fake_steam_server, game_on_sale_response_item
+):
+    """Test startup adds the entities before a slow Steam answers."""
+    items = make_store_items(game_on_sale_response_item, 1000)
+    fake_steam_server.set_items(items)
+
+    # A previous run fetched the wishlist and saved it.
+    coordinator = sensor_manager.SteamWishlistDataUpdateCoordinator(hass, "key", "123")
+    coordinator.async_set_updated_data(await coordinator._async_fetch_data())
+    hass.bus.async_fire(EVENT_HOMEASSISTANT_FINAL_WRITE)
+    await hass.async_block_till_done()
+    assert 1000 == len(hass_storage["steam_wishlist.123"]["data"]["items"])
+    assert 10 == fake_steam_server.requests["/IStoreBrowseService/GetItems/v1"]
+
+    # Restart with Steam answering slowly.
+    fake_steam_server.delay = 1
+    manager = sensor_manager.SensorManager(hass, False, "key", "123")
+    manager.coordinator.config_entry = MockConfigEntry(
+        domain=DOMAIN, unique_id="steam_wishlist_123"
+    )
+    add_sensors = Mock()
+    add_binary_sensors = Mock()
+    await manager.async_register_component("sensor", add_sensors)
+    await manager.async_register_component("binary_sensor", add_binary_sensors)
+
+    # Setup didn't wait for Steam, the entities came from the stored data.
+    assert 1 == fake_steam_server.requests["/IWishlistService/GetWishlist/v1"]
+    assert 10 == fake_steam_server.requests["/IStoreBrowseService/GetItems/v1"]
+    assert 1 == add_sensors.call_count
+    assert 1000 == len(add_binary_sensors.call_args[0][0])
+    assert [item["id"] for item in items] == list(manager.coordinator.data)
+
+    # The refresh happens in the background and only needs the wishlist.
+    await hass.async_block_till_done(wait_background_tasks=True)
+    assert 2 == fake_steam_server.requests["/IWishlistService/GetWishlist/v1"]
+    assert 10 == fake_steam_server.requests["/IStoreBrowseService/GetItems/v1"]
+    assert manager.coordinator.last_update_success is True
+    await manager.coordinator.async_shutdown()
+
+
+@pytest.mark.parametrize("adaptive", [True, False])
+async def test_coordinator_adaptive_schedule(
+    hass,
+    freezer,
+    fake_steam_server,
+    game_response_item,
+    game_on_sale_response_item,
+    adaptive,
+):
+    """Simulate a day of refreshes with the adaptive and the hourly schedule."""
+    freezer.move_to("2024-12-18 06:17:00+00:00")
+    # The discounts of the first 50 games end, and the games 100-129 go on sale
+    # at the usual sale start.
+    sale_start = dt_util.parse_datetime("2024-12-18 18:00:00+00:00")
+    before = (
+        make_store_items(game_on_sale_response_item, 50)
+        + make_store_items(game_response_item, 300)[50:]
+    )
+    after = make_store_items(game_response_item, 300)
+    for item in after[100:130]:
+        item["best_purchase_option"] = copy.deepcopy(
+            game_on_sale_response_item["best_purchase_option"]
+        )
+        item["best_purchase_option"]["active_discounts"][0]["discount_end_date"] = (
+            sale_start + timedelta(days=1)
+        ).timestamp()
+    fake_steam_server.set_items(before)
+    coordinator = sensor_manager.SteamWishlistDataUpdateCoordinator(
+        hass, "key", "123", client=SteamApiClient(hass, batch_window=0)
+    )
+
+    end = dt_util.utcnow() + timedelta(days=1)
+    detected_at = None
+    while dt_util.utcnow() < end:
+        if dt_util.utcnow() >= sale_start:
+            fake_steam_server.set_items(after)
+        coordinator.async_set_updated_data(await coordinator._async_fetch_data())
+        data = coordinator.data
+        if (
+            detected_at is None
+            and get_discount_end(data[after[0]["id"]]) is None
+            and get_discount_end(data[after[100]["id"]]) is not None
+        ):
+            detected_at = dt_util.utcnow()
+        freezer.tick(coordinator.update_interval if adaptive else SCAN_INTERVAL)
+    await coordinator.async_shutdown()
+
+    latency = detected_at - sale_start
+    requests = sum(fake_steam_server.requests.values())
+    if adaptive:
+        assert latency <= timedelta(minutes=2)
+        assert requests <= 20
+    else:
+        # An hourly schedule notices the sale as late as it runs after 10AM.
+        assert latency == timedelta(minutes=17)
+        assert requests > 30
+
+
+async def test_sensormanager_refresh_callbacks_dont_parse_games(
+    hass, fake_steam_server, game_on_sale_response_item
+):
+    """Test the games are parsed in the executor, not in the refresh callbacks."""
+    items = make_store_items(game_on_sale_response_item, 200)
+    fake_steam_server.set_items(items)
+    hass.data[DATA_CLIENT] = SteamApiClient(hass, batch_window=0)
+    manager = sensor_manager.SensorManager(hass, True, "key", "123")
+    manager.coordinator.config_entry = MockConfigEntry(
+        domain=DOMAIN, unique_id="steam_wishlist_123"
+    )
+    in_callback = False
+    parsed, parsed_in_callback = 0, 0
+
+    def parse_game(*args):
+        nonlocal parsed, parsed_in_callback
+        parsed += 1
+        parsed_in_callback += in_callback
+        return get_steam_game(*args)
+
+    update_listeners = manager.coordinator.async_update_listeners
+
+    def watched_update_listeners() -> None:
+        nonlocal in_callback
+        in_callback = True
+        try:
+            update_listeners()
+        finally:
+            in_callback = False
+
+    manager.coordinator.async_update_listeners = watched_update_listeners
+    add_binary_sensors = Mock()
+    with patch("custom_components.steam_wishlist.snapshot.get_steam_game", parse_game):
+        await manager.async_register_component("sensor", Mock())
+        await manager.async_register_component("binary_sensor", add_binary_sensors)
+        assert 200 == len(add_binary_sensors.call_args[0][0])
+
+        # Every game changed price, but no entities are added or removed.
+        for item in items:
+            item["best_purchase_option"]["formatted_final_price"] = "$3.99"
+            fake_steam_server.date_added[item["id"]] = 1800000000
+        fake_steam_server.set_items(items)
+        await manager.coordinator.async_refresh()
+    assert all(
+        game.sale_price == "$3.99"
+        for game in manager.coordinator.snapshot.games.values()
+    )
+    assert 400 == parsed
+    assert 0 == parsed_in_callback
+    await manager.coordinator.async_shutdown()
+
+
+async def test_coordinator_failed_batch_keeps_last_known_data(
+    hass, fake_steam_server, game_on_sale_response_item
+):
+    """Test a batch that keeps failing doesn't hold back the other batches."""
+    items = make_store_items(game_on_sale_response_item, 250)
+    fake_steam_server.set_items(items)
+    coordinator = sensor_manager.SteamWishlistDataUpdateCoordinator(
+        hass, "key", "123", client=SteamApiClient(hass, retry_backoff=0.01)
+    )
+    await coordinator.async_refresh()
+    fetched_at = dict(coordinator._fetched_at)
+
+    # Every game changed price and is requested again, but the batch with
+    # the first 100 games fails.
+    for item in items:
+        item["best_purchase_option"]["formatted_final_price"] = "$3.99"
+        fake_steam_server.date_added[item["id"]] = 1800000000
+    fake_steam_server.set_items(items)
+    fake_steam_server.failing_ids = {items[0]["id"]}
+    await coordinator.async_refresh()
+
+    assert coordinator.last_update_success is True
+    assert [item["id"] for item in items] == list(coordinator.data)
+    prices = [game.sale_price for game in coordinator.snapshot.games.values()]
+    assert ["$4.99"] * 100 + ["$3.99"] * 150 == prices
+    assert all(
+        coordinator._fetched_at[item["id"]] == fetched_at[item["id"]]
+        for item in items[:100]
+    )
+    assert sensor_manager.MIN_SCAN_INTERVAL == coordinator.update_interval
+
+    # The failed games are requested again on the next refresh.
+    fake_steam_server.failing_ids = set()
+    fake_steam_server.requested_ids.clear()
+    await coordinator.async_refresh()
+    assert [item["id"] for item in items[:100]] == fake_steam_server.requested_ids
+    assert all(
+        game.sale_price == "$3.99" for game in coordinator.snapshot.games.values()
+    )
+    await coordinator.async_shutdown()
+
+
+async def test_coordinator_unchanged_wishlist_skips_store_requests(
+    hass, freezer, fake_steam_server, game_on_sale_response_item
+):
+    """Test an unchanged wishlist with fresh store items needs one request."""
+    freezer.move_to("2024-12-01 12:00:00+00:00")
+    items = make_store_items(game_on_sale_response_item, 300)
+    fake_steam_server.set_items(items)
+    # The loop clock is frozen too, so don't wait for other entries' app ids.
+    coordinator = sensor_manager.SteamWishlistDataUpdateCoordinator(
+        hass, "key", "123", client=SteamApiClient(hass, batch_window=0)
+    )
+    await coordinator.async_refresh()
+    data = coordinator.data
+    snapshot = coordinator.snapshot
+    requests = dict(fake_steam_server.requests)
+
+    for _ in range(5):
+        freezer.tick(timedelta(minutes=30))
+        with patch.object(
+            coordinator.client, "async_get_store_items"
+        ) as get_store_items:
+            await coordinator.async_refresh()
+        get_store_items.assert_not_called()
+        assert data is coordinator.data
+        assert snapshot is coordinator.snapshot
+    requests = {
+        path: count - requests[path]
+        for path, count in fake_steam_server.requests.items()
+    }
+    assert {
+        "/IWishlistService/GetWishlist/v1": 5,
+        "/IStoreBrowseService/GetItems/v1": 0,
+    } == requests
+
+    # Reordering the wishlist doesn't request any store items either.
+    fake_steam_server.wishlists["123"] = [item["id"] for item in reversed(items)]
+    fake_steam_server.requested_ids.clear()
+    await coordinator.async_refresh()
+    assert [] == fake_steam_server.requested_ids
+    assert [item["id"] for item in reversed(items)] == list(coordinator.data)
+
+    # Store items are requested again once they went stale.
+    freezer.tick(sensor_manager.ITEM_TTL)
+    await coordinator.async_refresh()
+    assert 300 == len(fake_steam_server.requested_ids)
+    await coordinator.async_shutdown()
+
+
+async def test_coordinator_records_price_history(
+    hass, fake_steam_server, game_on_sale_response_item
+):
+    """Test refreshes append the prices that changed to the price history."""
+    items = make_store_items(game_on_sale_response_item, 10)
+    fake_steam_server.set_items(items)
+    coordinator = sensor_manager.SteamWishlistDataUpdateCoordinator(
+        hass, "key", "123", client=SteamApiClient(hass, batch_window=0)
+    )
+    await coordinator.async_refresh()
+    assert 10 == len(coordinator.price_history.apps)
+
+    # Every game is requested again, but only one changed price.
+    items[0]["best_purchase_option"]["final_price_in_cents"] = "299"
+    for item in items:
+        fake_steam_server.date_added[item["id"]] = 1800000000
+    fake_steam_server.set_items(items)
+    await coordinator.async_refresh()
+    assert [2] + [1] * 9 == [
+        len(coordinator.price_history.get(item["id"]).times) for item in items
+    ]
+    assert 299 == coordinator.price_history.get(items[0]["id"]).min_price
+    await coordinator.async_shutdown()
+
+
+async def test_coordinator_updates_listeners_of_moved_price_statistics(
+    hass, freezer, game_on_sale_response_item, game_response_item
+):
+    """Test games are updated when their time weighted price statistics move."""
+    freezer.move_to("2024-12-18 18:00:00+00:00")
+    coordinator = sensor_manager.SteamWishlistDataUpdateCoordinator(hass, "key", "123")
+    sale_id, full_id = game_on_sale_response_item["id"], game_response_item["id"]
+    data = {sale_id: game_on_sale_response_item, full_id: game_response_item}
+    game_listeners = {app_id: Mock() for app_id in data}
+    for app_id, listener in game_listeners.items():
+        coordinator.async_add_listener(listener, app_id)
+    sale_ended = copy.deepcopy(game_on_sale_response_item)
+    sale_ended["best_purchase_option"]["final_price_in_cents"] = "1999"
+    sale_ended["best_purchase_option"]["discount_pct"] = 0
+    now = dt_util.utcnow().timestamp()
+    await coordinator.price_history.async_record(hass, now - 3600, data)
+    await coordinator.price_history.async_record(hass, now, {sale_id: sale_ended})
+
+    coordinator.async_set_updated_data(copy.deepcopy(data))
+    assert (
+        100
+        == (coordinator.price_history.get_attributes(sale_id)["percent_time_on_sale"])
+    )
+    assert [1, 1] == [listener.call_count for listener in game_listeners.values()]
+
+    # The game that had a sale was on sale for half the time now.
+    freezer.tick(3600)
+    coordinator.async_set_updated_data(copy.deepcopy(data))
+    assert (
+        50
+        == (coordinator.price_history.get_attributes(sale_id)["percent_time_on_sale"])
+    )
+    assert [2, 1] == [listener.call_count for listener in game_listeners.values()]
+
+    # Nothing moved at the precision the attributes are rendered with.
+    freezer.tick(1)
+    coordinator.async_set_updated_data(copy.deepcopy(data))
+    assert [2, 1] == [listener.call_count for listener in game_listeners.values()]
+    await coordinator.async_shutdown()
+
+
+async def test_sensormanager_records_refresh_metrics(
+    hass, fake_steam_server, game_on_sale_response_item
+):
+    """Test the stages, batches and counts of each refresh are recorded."""
+    items = make_store_items(game_on_sale_response_item, 150)
+    fake_steam_server.set_items(items)
+    hass.data[DATA_CLIENT] = SteamApiClient(hass, batch_window=0)
+    manager = sensor_manager.SensorManager(
+        hass, True, "key", "123", refresh_metrics=True
+    )
+    manager.coordinator.config_entry = MockConfigEntry(
+        domain=DOMAIN, unique_id="steam_wishlist_123"
+    )
+    add_sensors, add_binary_sensors = Mock(), Mock()
+    await manager.async_register_component("sensor", add_sensors)
+    await manager.async_register_component("binary_sensor", add_binary_sensors)
+    assert manager.refresh_metrics_sensor in add_sensors.call_args[0][0]
+
+    stats = manager.coordinator.refresh_stats
+    refresh = stats.last
+    assert {
+        "wishlist",
+        "store_items",
+        "decode",
+        "price_history",
+        "parse",
+        "listeners",
+        "update_items",
+        "total",
+    } == refresh.stages.keys()
+    assert [(50, True), (100, True)] == sorted(
+        (apps, success) for apps, _, success in refresh.batches
+    )
+    assert refresh.bytes_received > 0
+    assert 150 == refresh.items_parsed
+
+    # Only the entity of the game whose price changed is written.
+    for entity in add_binary_sensors.call_args[0][0]:
+        entity.hass = hass
+        manager.coordinator.async_add_listener(
+            entity._handle_coordinator_update, entity.coordinator_context
+        )
+    items[0]["best_purchase_option"]["discount_pct"] = 50
+    for item in items:
+        fake_steam_server.date_added[item["id"]] = 1800000000
+    fake_steam_server.set_items(items)
+    with patch.object(SteamGameEntity, "async_write_ha_state"):
+        await manager.coordinator.async_refresh()
+    assert 2 == len(stats.history)
+    assert 1 == stats.last.entities_written
+    assert stats.current is None
+    await manager.coordinator.async_shutdown()
+
+
+async def test_coordinator_refresh_metrics_disabled(
+    hass, fake_steam_server, game_on_sale_response_item
+):
+    """Test no refresh is recorded by default."""
+    fake_steam_server.set_items(make_store_items(game_on_sale_response_item, 10))
+    coordinator = sensor_manager.SteamWishlistDataUpdateCoordinator(
+        hass, "key", "123", client=SteamApiClient(hass, batch_window=0)
+    )
+    with patch.object(coordinator.refresh_stats, "finish") as finish:
+        await coordinator.async_refresh()
+    finish.assert_called_once()
+    assert 10 == len(coordinator.data)
+    assert coordinator.refresh_stats.current is None
+    assert 0 == len(coordinator.refresh_stats.history)
+    await coordinator.async_shutdown()
+
+
+def test_get_game_slugs():
+    """Test games whose titles slugify the same get unique, stable slugs."""
+    games = {
+        30: {"title": "Doom"},
+        10: {"title": "DOOM"},
+        20: {"title": "Doom!"},
+        40: {"title": "Portal"},
+    }
+    assert {
+        10: "doom",
+        20: "doom_20",
+        30: "doom_30",
+        40: "portal",
+    } == sensor_manager.get_game_slugs(games, {}, set())
+    # The game with an existing entity keeps the plain slug.
+    assert {
+        10: "doom_10",
+        20: "doom_20",
+        30: "doom_30",
+        40: "portal",
+    } == sensor_manager.get_game_slugs(games, {"doom": 50}, set())
+    # So does the lowest app id that wasn't registered with its own.
+    assert {
+        10: "doom_10",
+        20: "doom",
+        30: "doom_30",
+        40: "portal",
+    } == sensor_manager.get_game_slugs(games, {}, {"doom_10"})
+
+
+async def test_sensormanager_cold_start_adds_all_entities(
+    hass, fake_steam_server, game_on_sale_response_item
+):
+    """Test a cold start adds every game entity to the state machine."""
+    items = make_store_items(game_on_sale_response_item, 50)
+    # Games sharing a title, which would share an entity id by their title.
+    items[1]["name"] = items[0]["name"]
+    fake_steam_server.set_items(items)
+    hass.data[DATA_CLIENT] = SteamApiClient(
+        hass, rate_limit=1000, rate_limit_burst=1000, batch_window=0
+    )
+    config_entry = MockConfigEntry(domain=DOMAIN, unique_id="steam_wishlist_123")
+    config_entry.add_to_hass(hass)
+
+    async def async_start() -> tuple[sensor_manager.SensorManager, MockEntityPlatform]:
+        manager = sensor_manager.SensorManager(hass, True, "key", "123")
+        manager.coordinator.config_entry = config_entry
+        platform = MockEntityPlatform(
+            hass, domain="binary_sensor", platform_name=DOMAIN
+        )
+        platform.config_entry = config_entry
+        await manager.async_register_component("sensor", Mock())
+        await manager.async_register_component(
+            "binary_sensor", platform._async_schedule_add_entities_for_entry
+        )
+        await hass.async_block_till_done()
+        return manager, platform
+
+    with patch.object(
+        sensor_manager, "DeviceInfo", wraps=sensor_manager.DeviceInfo
+    ) as device_info:
+        manager, platform = await async_start()
+
+    assert 50 == len(hass.states.async_entity_ids("binary_sensor"))
+    assert 1 == device_info.call_count
+    first, second = (manager.current_wishlist[item["id"]] for item in items[:2])
+    assert "binary_sensor.steam_wishlist_123_game_0" == first.entity_id
+    assert f"binary_sensor.steam_wishlist_123_game_0_{items[1]['id']}" == (
+        second.entity_id
+    )
+
+    # Restart with a renamed entity and the games in another order.
+    registry = er.async_get(hass)
+    registry.async_update_entity(first.entity_id, new_entity_id="binary_sensor.renamed")
+    await platform.async_reset()
+    await manager.coordinator.async_shutdown()
+    fake_steam_server.set_items(items[::-1])
+    manager, platform = await async_start()
+
+    assert 50 == len(hass.states.async_entity_ids("binary_sensor"))
+    first, second = (manager.current_wishlist[item["id"]] for item in items[:2])
+    assert "binary_sensor.renamed" == first.entity_id
+    assert f"binary_sensor.steam_wishlist_123_game_0_{items[1]['id']}" == (
+        second.entity_id
+    )
+    await platform.async_reset()
+    await manager.coordinator.async_shutdown()
+
+
+async def test_coordinator_failed_refresh_retries_soon(
+    hass, freezer, fake_steam_server, game_response_item
+):
+    """Test a failed refresh doesn't wait for the long adaptive interval."""
+    # No sale starts or ends for days, so the longest interval is picked.
+    freezer.move_to("2024-12-20 06:00:00+00:00")
+    fake_steam_server.set_items(make_store_items(game_response_item, 10))
+    coordinator = sensor_manager.SteamWishlistDataUpdateCoordinator(
+        hass,
+        "key",
+        "123",
+        client=SteamApiClient(hass, batch_window=0, retry_backoff=0),
+    )
+    coordinator.async_add_listener(Mock())
+    await coordinator.async_refresh()
+    assert coordinator.last_update_success is True
+    assert MAX_SCAN_INTERVAL == coordinator.update_interval
+
+    # GetWishlist keeps failing after its retries, which don't wait since
+    # the clock is frozen.
+    fake_steam_server.wishlist_failures = 100
+    await coordinator.async_refresh()
+    assert coordinator.last_update_success is False
+    assert MIN_SCAN_INTERVAL == coordinator.update_interval
+
+    # The next attempt is scheduled after the short interval.
+    fake_steam_server.wishlist_failures = 0
+    freezer.tick(MIN_SCAN_INTERVAL)
+    async_fire_time_changed(hass)
+    await hass.async_block_till_done(wait_background_tasks=True)
+    assert coordinator.last_update_success is True
+
+    # A wishlist response without items goes back to the adaptive interval.
+    fake_steam_server.wishlist_failures = 100
+    await coordinator.async_refresh()
+    assert MIN_SCAN_INTERVAL == coordinator.update_interval
+    with patch.object(
+        coordinator.client,
+        "async_get_wishlist",
+        AsyncMock(return_value={"response": {}}),
+    ):
+        await coordinator.async_refresh()
+    assert {} == coordinator.data
+    assert MAX_SCAN_INTERVAL == coordinator.update_interval
+    await coordinator.async_shutdown()
+
+
+async def test_coordinator_unload_stops_writes(
+    hass, hass_storage, monkeypatch, fake_steam_server, game_on_sale_response_item
+):
+    """Test nothing writes the data of an entry again once it unloaded."""
+    items = make_store_items(game_on_sale_response_item, 10)
+    fake_steam_server.set_items(items)
+    entry = MockConfigEntry(domain=DOMAIN, data={"steam_id": "123", "key": "key"})
+    coordinator = sensor_manager.SteamWishlistDataUpdateCoordinator(
+        hass, "key", "123", client=SteamApiClient(hass, batch_window=0)
+    )
+    coordinator.async_set_updated_data(await coordinator._async_fetch_data())
+    price_history_path = coordinator.price_history.path
+    monkeypatch.setattr(
+        steam_wishlist, "get_price_history_path", lambda *_: price_history_path
+    )
+
+    # A refresh is waiting on Steam when the entry unloads.
+    for item in items:
+        fake_steam_server.date_added[item["id"]] = 1800000000
+    fake_steam_server.hold = asyncio.Event()
+    refresh = hass.async_create_task(coordinator._async_fetch_data())
+    while not fake_steam_server.in_flight:
+        await asyncio.sleep(0.01)
+    await coordinator.async_unload()
+    # The delayed save was written right away.
+    assert 10 == len(hass_storage["steam_wishlist.123"]["data"]["items"])
+
+    fake_steam_server.hold.set()
+    assert 10 == len(await refresh)
+    await steam_wishlist.async_remove_entry(hass, entry)
+    hass.bus.async_fire(EVENT_HOMEASSISTANT_FINAL_WRITE)
+    async_fire_time_changed(hass, dt_util.utcnow() + timedelta(minutes=5))
+    await hass.async_block_till_done()
+    assert "steam_wishlist.123" not in hass_storage
+    assert not os.path.exists(price_history_path)
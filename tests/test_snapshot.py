@@ -0,0 +1,161 @@
+"""Tests for the wishlist snapshots."""
+
+from bisect import insort
+import copy
+from unittest.mock import patch
+
+from custom_components.steam_wishlist.snapshot import (
+    WishlistIndexes,
+    WishlistSnapshot,
+    diff_games,
+)
+from custom_components.steam_wishlist.util import get_steam_game
+from tests.common import make_store_items
+
+
+def test_wishlistsnapshot_first_version_adds_all_games(
+    game_on_sale_response_item, game_response_item
+) -> None:
+    """Verify every game is added in the first snapshot."""
+    data = {
+        game_on_sale_response_item["id"]: game_on_sale_response_item,
+        game_response_item["id"]: game_response_item,
+    }
+    snapshot = WishlistSnapshot(1, data)
+    assert [1220150, 2215430] == snapshot.diff.added
+    assert [] == snapshot.diff.removed
+    assert {} == snapshot.diff.changed
+
+
+def test_wishlistsnapshot_diff_against_previous(
+    game_on_sale_response_item, game_response_item
+) -> None:
+    """Verify the diff between two snapshots."""
+    previous = WishlistSnapshot(
+        1, {game_on_sale_response_item["id"]: game_on_sale_response_item}
+    )
+    snapshot = WishlistSnapshot(
+        2, {game_response_item["id"]: game_response_item}, previous
+    )
+    assert [2215430] == snapshot.diff.added
+    assert [1220150] == snapshot.diff.removed
+    assert {} == snapshot.diff.changed
+
+
+def test_diff_games_no_changes(game_on_sale_response_item) -> None:
+    """Verify an identical snapshot has an empty diff."""
+    games = {1220150: get_steam_game(1220150, game_on_sale_response_item)}
+    diff = diff_games(games, copy.deepcopy(games))
+    assert not diff
+
+
+def test_diff_games_changed_fields(game_on_sale_response_item) -> None:
+    """Verify the kinds of change are reported per game."""
+    old = {1220150: get_steam_game(1220150, game_on_sale_response_item)}
+    item = copy.deepcopy(game_on_sale_response_item)
+    item["best_purchase_option"]["discount_pct"] = 50
+    item["best_purchase_option"]["formatted_final_price"] = "$9.99"
+    item["reviews"]["summary_filtered"]["review_count"] = 1700
+    new = {1220150: get_steam_game(1220150, item)}
+    diff = diff_games(old, new)
+    assert {1220150: frozenset({"price", "discount", "reviews"})} == diff.changed
+    assert [] == diff.added
+    assert [] == diff.removed
+
+
+def make_games(template, count, seed=0):
+    """Return `count` store items with varied discounts, prices and reviews."""
+    items = make_store_items(template, count)
+    for index, item in enumerate(items):
+        pricing = item["best_purchase_option"]
+        discount = (index * 7 + seed) % 5 * 20
+        pricing["discount_pct"] = discount
+        pricing["final_price_in_cents"] = str(1999 * (100 - discount) // 100)
+        pricing["formatted_final_price"] = f"${pricing['final_price_in_cents']}"
+        reviews = item["reviews"]["summary_filtered"]
+        reviews["review_score_label"] = ("Positive", "Mixed")[(index + seed) % 2]
+    return {item["id"]: item for item in items}
+
+
+def assert_indexes_equal(expected: WishlistIndexes, actual: WishlistIndexes):
+    assert expected.on_sale == actual.on_sale
+    assert expected.by_discount == actual.by_discount
+    assert expected.by_price == actual.by_price
+    assert expected.review_buckets == actual.review_buckets
+
+
+def test_wishlistsnapshot_indexes(game_on_sale_response_item) -> None:
+    """Verify the indexes sort and group the games."""
+    data = make_games(game_on_sale_response_item, 5)
+    # A game without a price.
+    del data[100004]["best_purchase_option"]
+    indexes = WishlistSnapshot(1, data).indexes
+    # The discounts are 0, 40, 80, 20 and 0 percent.
+    assert {100001, 100002, 100003} == indexes.on_sale
+    assert [100002, 100001, 100003, 100000, 100004] == [
+        key[-1] for key in indexes.by_discount
+    ]
+    assert [100002, 100001, 100003, 100000, 100004] == [
+        key[-1] for key in indexes.by_price
+    ]
+    assert {
+        "Positive": {100000, 100002, 100004},
+        "Mixed": {100001, 100003},
+    } == indexes.review_buckets
+
+
+def test_wishlistsnapshot_indexes_update_incrementally(
+    game_on_sale_response_item,
+) -> None:
+    """Verify indexes updated from a diff equal indexes built from scratch."""
+    data = make_games(game_on_sale_response_item, 200)
+    previous = WishlistSnapshot(1, data)
+    previous_by_discount = list(previous.indexes.by_discount)
+
+    changed = make_games(game_on_sale_response_item, 220, seed=1)
+    data = dict(data)
+    for game_id in list(data)[:10]:
+        data[game_id] = changed[game_id]
+    for game_id in list(data)[100:110]:
+        del data[game_id]
+    for game_id in list(changed)[200:]:
+        data[game_id] = changed[game_id]
+
+    with patch.object(WishlistIndexes, "build", wraps=WishlistIndexes.build) as build:
+        snapshot = WishlistSnapshot(2, data, previous)
+    build.assert_not_called()
+    assert 10 == len(snapshot.diff.changed)
+    assert_indexes_equal(WishlistIndexes.build(snapshot.games), snapshot.indexes)
+    # The indexes of the previous snapshot are left as they were.
+    assert previous_by_discount == previous.indexes.by_discount
+
+    # Indexes are built again when most games changed.
+    with patch.object(WishlistIndexes, "build", wraps=WishlistIndexes.build) as build:
+        WishlistSnapshot(3, changed, snapshot)
+    build.assert_called_once()
+
+
+def test_wishlistsnapshot_indexes_update_moves_changed_games(
+    game_on_sale_response_item,
+) -> None:
+    """Test updating the indexes of 10,000 games only moves the changed ones."""
+    data = make_games(game_on_sale_response_item, 10000)
+    old = WishlistSnapshot(1, data)
+    new = WishlistSnapshot(2, data, old)
+    changed = make_games(game_on_sale_response_item, 50, seed=1)
+    for game_id, item in changed.items():
+        new.games[game_id] = get_steam_game(game_id, item)
+    diff = diff_games(old.games, new.games)
+    assert diff.changed
+
+    with (
+        patch.object(WishlistIndexes, "build", wraps=WishlistIndexes.build) as build,
+        patch(
+            "custom_components.steam_wishlist.snapshot.insort", wraps=insort
+        ) as moved,
+    ):
+        updated = old.indexes.update(old.games, new.games, diff)
+    build.assert_not_called()
+    # Each changed game is moved in the discount and the price index.
+    assert 2 * len(diff.changed) == moved.call_count
+    assert_indexes_equal(WishlistIndexes.build(new.games), updated)
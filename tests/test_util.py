@@ -1,6 +1,19 @@
 """Util tests."""
 
-from custom_components.steam_wishlist.util import get_steam_game
+import copy
+import json
+import sys
+import tracemalloc
+
+import pytest
+
+from custom_components.steam_wishlist.util import (
+    decode_store_items,
+    get_discount_end,
+    get_steam_game,
+    project_store_item,
+)
+from tests.common import make_store_items
 
 
 def test_get_steam_game_on_sale(game_on_sale_response_item) -> None:
@@ -53,3 +66,138 @@ def test_get_steam_game_not_on_sale(game_response_item) -> None:
         "title": "Ghost of Tsushima DIRECTOR'S CUT",
     }
     assert expected == actual
+
+
+def test_get_discount_end(game_on_sale_response_item, game_response_item) -> None:
+    """Verify the earliest discount end date is returned."""
+    assert 1734544800 == get_discount_end(game_on_sale_response_item)
+    assert get_discount_end(game_response_item) is None
+    assert get_discount_end({}) is None
+
+
+def test_project_store_item_keeps_parsed_game(
+    game_on_sale_response_item, game_response_item
+) -> None:
+    """Verify a projected store item parses to the same game."""
+    for item in (game_on_sale_response_item, game_response_item):
+        compact = project_store_item(item)
+        assert "basic_info" not in compact
+        assert "categories" not in compact
+        assert get_steam_game(item["id"], item) == get_steam_game(item["id"], compact)
+        assert get_discount_end(item) == get_discount_end(compact)
+
+
+def test_project_store_item_memory(game_on_sale_response_item) -> None:
+    """Benchmark the memory used per 1,000 games before and after projection."""
+    body = json.dumps(make_store_items(game_on_sale_response_item, 1000))
+
+    tracemalloc.start()
+    raw_items = json.loads(body)
+    raw_size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    compact_items = [project_store_item(item) for item in json.loads(body)]
+    compact_size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    assert len(raw_items) == len(compact_items)
+    assert compact_size < raw_size / 2
+
+
+@pytest.mark.parametrize("indent", [None, 2])
+def test_decode_store_items(game_on_sale_response_item, indent) -> None:
+    """Verify store items are decoded and projected however they're laid out."""
+    items = make_store_items(game_on_sale_response_item, 3)
+    expected = {item["id"]: project_store_item(item) for item in items}
+    body = json.dumps({"response": {"store_items": items}}, indent=indent).encode()
+    assert expected == decode_store_items(body)
+    body = json.dumps({"response": {"store_items": []}}, indent=indent).encode()
+    assert {} == decode_store_items(body)
+    # Other keys before the store items.
+    body = json.dumps({"response": {"other": 1, "store_items": items}}).encode()
+    assert expected == decode_store_items(body)
+
+
+def test_decode_store_items_truncated_body(game_on_sale_response_item) -> None:
+    """Verify a body that was cut short raises a ValueError."""
+    items = make_store_items(game_on_sale_response_item, 2)
+    body = json.dumps({"response": {"store_items": items}}).encode()
+    # Cut after the opening bracket, within an item and after a comma.
+    for end in (body.index(b"[") + 1, len(body) // 2, body.index(b"}, {") + 2):
+        with pytest.raises(ValueError):
+            decode_store_items(body[:end])
+
+
+def test_decode_store_items_peak_memory(game_on_sale_response_item) -> None:
+    """Benchmark peak memory decoding a 100 item response."""
+    items = make_store_items(game_on_sale_response_item, 100)
+    for item in items:
+        # Steam sends plenty of fields the integration never uses.
+        item["basic_info"]["short_description"] = "A game. " * 2000
+    body = json.dumps({"response": {"store_items": items}}).encode()
+
+    tracemalloc.start()
+    full = {
+        item["id"]: project_store_item(item)
+        for item in json.loads(body)["response"]["store_items"]
+    }
+    full_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    streamed = decode_store_items(body)
+    streamed_peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    assert full == streamed
+    # Both hold the decoded text of the body, only the full decode also holds
+    # every store item at once.
+    assert streamed_peak < (full_peak - len(body)) / 2 + len(body)
+
+
+def test_get_steam_game_record_is_immutable(game_on_sale_response_item) -> None:
+    """Verify parsed games can't be modified."""
+    game = get_steam_game(1220150, game_on_sale_response_item)
+    with pytest.raises(AttributeError):
+        game.percent_off = 0
+    with pytest.raises(TypeError):
+        game["percent_off"] = 0
+    assert game == copy.deepcopy(game)
+
+
+def test_get_steam_game_memory_per_game(game_on_sale_response_item) -> None:
+    """Benchmark the memory held by parsed games compared to rendered dicts."""
+    items = make_store_items(game_on_sale_response_item, 1000)
+
+    tracemalloc.start()
+    records = [get_steam_game(item["id"], item) for item in items]
+    record_size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    rendered = [get_steam_game(item["id"], item).as_dict() for item in items]
+    rendered_size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    assert len(records) == len(rendered)
+    assert record_size < rendered_size / 2
+
+
+def test_get_steam_game_allocations_per_refresh(game_on_sale_response_item) -> None:
+    """Benchmark the allocations kept alive by parsing a refresh of 1,000 games."""
+    items = make_store_items(game_on_sale_response_item, 1000)
+    get_steam_game(items[0]["id"], items[0])
+
+    blocks = sys.getallocatedblocks()
+    records = [get_steam_game(item["id"], item) for item in items]
+    record_blocks = sys.getallocatedblocks() - blocks
+
+    blocks = sys.getallocatedblocks()
+    rendered = [get_steam_game(item["id"], item).as_dict() for item in items]
+    rendered_blocks = sys.getallocatedblocks() - blocks
+
+    assert len(records) == len(rendered)
+    # A record, its title and image url, while a rendered game also holds a
+    # dict, its steam id and deep link.
+    assert record_blocks < rendered_blocks